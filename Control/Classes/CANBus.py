@@ -24,6 +24,9 @@ import threading
 import asyncio 
 import time
 
+# Local Imports
+from .Threads import start_thread
+
 class CANBus: 
     """ class for recieving data from RFIDs"""
 
@@ -84,9 +87,7 @@ class CANBus:
         """
         # Creates notifier on its own thread and returns immediately so rfidListener can continue running
         self.active = True 
-        notiThread = threading.Thread(target=self.__listen)
-        notiThread.name = 'CANBus.__listen'
-        notiThread.start()
+        notiThread = start_thread(self.__listen, subsystem = 'canbus', owner = self, purpose = 'listen', daemon = self.isSimulation, clocked = False) # simulated listener only sleeps, so it should not hold the program open once everything else has finished
     
     def stop_listen(self): 
         """ Causes the __listen thread to break out of its loop. Stops the Bus Notifier object so data will not be recieved. """
@@ -0,0 +1,524 @@
+"""
+Description: Class definitions for the clocks that the EventManager, Modes, Interactables and Simulated Voles use to read the current time and to sleep.
+            The module level CLOCK is shared by the whole package. It defaults to the SystemClock ( wall clock time ), and the Simulation package can swap in a ScaledClock
+            to run faster than real time, or a VirtualClock so that an experiment runs in simulated time rather than in real time.
+
+Property of Donaldson Lab at the University of Colorado at Boulder
+"""
+
+# Standard Lib Imports
+import time
+import heapq
+import queue
+import weakref
+import itertools
+import threading
+import concurrent.futures
+from collections import deque
+
+
+class SystemClock:
+    ''' [Description] wall clock time. time() and sleep() behave exactly like time.time() and time.sleep(), and the wait methods block on the thread primitives directly '''
+
+    poll_interval = 0.005 # seconds of real time between each check in wait_until()
+
+    def __str__(self):
+        return 'SystemClock'
+
+    def time(self):
+        ''' [summary] returns the current time in seconds since the epoch '''
+        return time.time()
+
+    def monotonic(self):
+        ''' [summary] returns a clock value that never goes backwards. Use for measuring durations. '''
+        return time.monotonic()
+
+    def sleep(self, seconds):
+        ''' [summary] pauses the calling thread for <seconds> '''
+        if seconds > 0:
+            time.sleep(seconds)
+
+    def idle(self):
+        ''' [summary] called on each pass of a loop that spins while waiting for an attribute to change ( e.g. the threshold event watchers ). The wall clock lets these loops spin as usual. '''
+        return
+
+    def real(self, seconds):
+        ''' [summary] converts <seconds> of experiment time into seconds of real time. None ( no timeout ) stays None. '''
+        return seconds
+
+    #
+    # Threads ( only the VirtualClock keeps track of the threads that use it )
+    #
+    def spawn(self, thread):
+        ''' [summary] called by start_thread() right before <thread> gets started. Returns the handle that the new thread passes to enter(). '''
+        return None
+
+    def enter(self, task):
+        ''' [summary] called by a thread from start_thread() before it runs its target '''
+        return
+
+    def leave(self):
+        ''' [summary] called by a thread from start_thread() once its target returns '''
+        return
+
+    def changed(self):
+        ''' [summary] called after a thread changes something that other threads may be polling for ( e.g. it adds a threshold event ) '''
+        return
+
+    #
+    # Waiting ( use these rather than waiting on the thread primitives directly, so that the VirtualClock can tell when a thread is blocked )
+    #
+    def wait_until(self, predicate, timeout = None):
+        '''
+        [summary] blocks until predicate() returns True
+        Args:
+            predicate (function) : returns True once the thing being waited on has happened
+            timeout (float, optional) : max seconds to wait
+        Returns:
+            (Boolean) : True if predicate() returned True, False if the timeout passed first
+        '''
+        deadline = None if timeout is None else self.monotonic() + timeout
+        while not predicate():
+            if deadline is not None and self.monotonic() >= deadline:
+                return False
+            time.sleep(self.poll_interval)
+        return True
+
+    def wait(self, event, timeout = None):
+        ''' [summary] threading.Event.wait(). Returns True if the event was set, False if the timeout passed first. '''
+        return event.wait(self.real(timeout))
+
+    def wait_for(self, condition, predicate, timeout = None):
+        ''' [summary] threading.Condition.wait_for(). <condition> gets acquired for the wait, so the caller must not already hold it. '''
+        with condition:
+            return condition.wait_for(predicate, self.real(timeout))
+
+    def get(self, q, timeout = None):
+        ''' [summary] queue.Queue.get(). Raises queue.Empty if the timeout passes first. '''
+        return q.get(timeout = self.real(timeout))
+
+    def result(self, future, timeout = None):
+        ''' [summary] concurrent.futures.Future.result(). Raises concurrent.futures.TimeoutError if the timeout passes first. '''
+        return future.result(self.real(timeout))
+
+    def wait_futures(self, futures, timeout = None):
+        ''' [summary] concurrent.futures.wait(), for every future to finish. Returns the (done, not_done) sets. '''
+        return concurrent.futures.wait(futures, self.real(timeout))
+
+    def join(self, thread, timeout = None):
+        ''' [summary] threading.Thread.join(). Returns True if the thread finished, False if the timeout passed first. '''
+        thread.join(self.real(timeout))
+        return not thread.is_alive()
+
+    def acquire(self, lock, timeout = None):
+        ''' [summary] threading.Lock.acquire(). Returns True if the lock was acquired, False if the timeout passed first. '''
+        return lock.acquire(timeout = -1 if timeout is None else self.real(timeout))
+
+
+class ScaledClock(SystemClock):
+    ''' [Description]
+    wall clock that runs <scale> times faster than real time, for simulations where some of the interactables are still real hardware and so cannot run in virtual time.
+    Every second of real time counts as <scale> seconds of experiment time, so mode timeouts, ITIs, countdowns and simulated vole delays all finish <scale> times sooner, and timestamps are reported in experiment time.
+    Hardware movements ( e.g. a door opening ) do not use the clock, so they still take the same amount of real time.
+    '''
+
+    def __init__(self, scale, start_time = None):
+        """
+        [summary] creates a ScaledClock
+        Args:
+            scale (float) : how many seconds of experiment time pass for every second of real time ( e.g. 10 runs the experiment 10x faster )
+            start_time (float, optional) : the experiment time that the clock starts at. Defaults to the current wall clock time.
+        """
+        if scale <= 0:
+            raise Exception(f'(Clock.py, ScaledClock) time scale must be a positive number, but was passed {scale}')
+        if start_time is None: start_time = time.time()
+        self.scale = scale
+        self.start_time = start_time
+        self.real_start = time.monotonic()
+
+    def __str__(self):
+        return f'ScaledClock(x{self.scale})'
+
+    def time(self):
+        ''' [summary] returns the current experiment time '''
+        return self.start_time + self.monotonic()
+
+    def monotonic(self):
+        ''' [summary] returns the seconds of experiment time that have passed since the clock was created '''
+        return ( time.monotonic() - self.real_start ) * self.scale
+
+    def sleep(self, seconds):
+        ''' [summary] pauses the calling thread for <seconds> of experiment time '''
+        if seconds > 0:
+            time.sleep(seconds / self.scale)
+
+    def real(self, seconds):
+        ''' [summary] converts <seconds> of experiment time into seconds of real time '''
+        return None if seconds is None else seconds / self.scale
+
+
+class Task:
+    ''' [Description] a thread that is scheduled by a VirtualClock. Gets created when start_thread() starts the thread, or the first time that a thread which was started some other way uses the clock. '''
+
+    STATES = ('ready', 'running', 'sleeping', 'polling', 'detached', 'done')
+
+    def __init__(self, id, name, clocked = True):
+        self.id = id # tasks are numbered in the order that they were created, which is the order that they get polled in
+        self.name = name
+        self.clocked = clocked # False for threads that run in real time ( e.g. hardware timers ). These never hold the clock, and only use it to sleep.
+        self.state = 'ready' # one of Task.STATES
+        self.wakeup = threading.Event() # set when it is the task's turn to run
+        self.generation = 0 # incremented each time the task blocks, so a wakeup left over from an earlier sleep or wait can be told apart
+        self.started = 0 # real time (monotonic) that the task last started running
+
+    def __str__(self):
+        return f'Task({self.name}, {self.state})'
+
+
+class VirtualClock(SystemClock):
+    ''' [Description]
+    discrete-event clock for running the Simulation package faster than real time, with the same results every time that a run is repeated with the same seed.
+    Threads that use the clock take turns rather than running at the same time. Only one thread holds the clock at a time, and it keeps running until it sleeps, waits ( with one of the clock's wait methods ), spins with idle(), or finishes.
+    The clock then hands over to the next thread, in a fixed order:
+        (1) threads that are ready to run ( e.g. just started, or just woken ), in the order that they became ready
+        (2) threads that are polling ( idle() and the wait methods ), which each get one more check, oldest thread first. This repeats for as long as the checks keep changing something.
+        (3) once every thread is sleeping or has nothing left to check, the clock jumps straight to the earliest wakeup time and wakes the threads that were sleeping until then, in the order that they went to sleep.
+
+    (NOTE) the clock can only see a thread block if it blocks through the clock. Threads must wait with CLOCK.wait_until(), wait(), get(), result(), join() etc. rather than on a lock, queue, Event or Future directly.
+           A thread that holds the clock for more than <max_settle> seconds of real time is assumed to be blocked on something else and gets detached, so that the other threads can carry on. Each time this happens the run may no longer be repeatable, so the thread's name gets recorded in self.detached.
+           Threads started with start_thread(..., clocked = False) ( e.g. the hardware scheduler and the terminal printer ) run in real time and are never waited on.
+    '''
+
+    def __init__(self, start_time = None, max_settle = 2.0, idle_interval = 0.001):
+        """
+        [summary] creates a VirtualClock. The scheduler thread gets started as soon as the first thread is registered.
+        Args:
+            start_time (float, optional) : the time that the virtual clock starts at. Defaults to the current wall clock time, so timestamps still look like real times.
+            max_settle (float, optional) : max seconds of real time that a thread can hold the clock for before it gets detached.
+            idle_interval (float, optional) : seconds of real time that an unclocked thread pauses for on each call to idle(), and that the scheduler waits for before polling again when nothing can run ( e.g. while a detached thread is still busy ).
+        """
+        if start_time is None: start_time = time.time()
+        self.start_time = start_time
+        self.now = start_time
+        self.max_settle = max_settle
+        self.idle_interval = idle_interval
+
+        self.cond = threading.Condition()
+        self.local = threading.local() # .task is the calling thread's Task
+        self.ids = itertools.count()
+        self.sequence = itertools.count() # tie breaker so sleepers with the same wake time get woken in the order that they went to sleep
+        self.tasks = weakref.WeakKeyDictionary() # { thread : Task }
+        self.running = None # the Task that holds the clock
+        self.ready = deque() # Tasks waiting for their turn to run
+        self.sleepers = [] # heap of (wake time, sequence num, Task, Task.generation) for sleeping tasks and for polling tasks that have a timeout
+        self.pollers = {} # { Task.id : Task } tasks that are polling
+        self.round = deque() # pollers that have not been checked yet in the current round of polling
+        self.busy = True # True if something ran since the current round of polling started
+        self.detached = [] # names of the tasks that held the clock for more than <max_settle>
+        self.scheduler = None
+
+    def __str__(self):
+        return 'VirtualClock'
+
+    def time(self):
+        ''' [summary] returns the current virtual time '''
+        return self.now
+
+    def monotonic(self):
+        ''' [summary] virtual time never goes backwards, so the monotonic value is just seconds since the clock was created '''
+        return self.now - self.start_time
+
+    #
+    # Threads
+    #
+    def current(self):
+        ''' [summary] returns the calling thread's Task. A thread that was not started with start_thread() gets registered the first time that it uses the clock, and holds the clock right away if no other thread does. '''
+        task = getattr(self.local, 'task', None)
+        if task is None:
+            with self.cond:
+                task = self.register(threading.current_thread())
+                if self.running is None:
+                    self.run(task)
+                    self.busy = True
+                else:
+                    task.state = 'detached' # already running alongside the thread that holds the clock
+            self.local.task = task
+        return task
+
+    def register(self, thread, clocked = True):
+        ''' (caller holds self.cond) creates the Task for <thread> '''
+        task = Task(next(self.ids), thread.name, clocked)
+        self.tasks[thread] = task
+        if self.scheduler is None:
+            from .Threads import start_thread # (imported here, as Threads.py imports the CLOCK)
+            self.scheduler = start_thread(self.run_scheduler, subsystem = 'clock', owner = self, purpose = 'virtual_clock_scheduler', clocked = False)
+        return task
+
+    def spawn(self, thread):
+        ''' [summary] registers <thread> before it starts, and queues it to run once the thread that started it lets go of the clock '''
+        self.current()
+        with self.cond:
+            task = self.register(thread)
+            self.ready.append(task)
+            self.cond.notify_all()
+        return task
+
+    def enter(self, task):
+        ''' [summary] the new thread waits here for its turn to run. A thread that was started without a task is unclocked. '''
+        if task is None:
+            with self.cond:
+                self.local.task = self.register(threading.current_thread(), clocked = False)
+            return
+        self.local.task = task
+        self.wait_turn(task)
+
+    def leave(self):
+        ''' [summary] the thread has finished, so it lets go of the clock for good '''
+        task = getattr(self.local, 'task', None)
+        if task is None or not task.clocked:
+            return
+        with self.cond:
+            self.block(task, 'done')
+            self.busy = True
+
+    def changed(self):
+        ''' [summary] makes sure that every polling thread gets another check before the clock moves on '''
+        with self.cond:
+            self.busy = True
+
+    def run(self, task):
+        ''' (caller holds self.cond) hands the clock to <task> '''
+        task.state = 'running'
+        task.started = time.monotonic()
+        self.running = task
+
+    def block(self, task, state):
+        ''' (caller holds self.cond) <task> stops running and moves to <state>, and the clock goes to the next task '''
+        task.state = state
+        task.generation += 1
+        if self.running is task:
+            self.running = None
+        self.cond.notify_all()
+
+    def wait_turn(self, task):
+        ''' [summary] blocks the calling thread until the scheduler hands it the clock '''
+        task.wakeup.wait()
+        task.wakeup.clear()
+
+    #
+    # Sleeping and Waiting
+    #
+    def sleep(self, seconds):
+        ''' [summary] blocks the calling thread until the virtual time has advanced by <seconds> '''
+        task = self.current()
+        with self.cond:
+            self.block(task, 'sleeping')
+            heapq.heappush(self.sleepers, (self.now + max(seconds, 0), next(self.sequence), task, task.generation))
+            self.busy = True
+        self.wait_turn(task)
+
+    def idle(self):
+        ''' [summary] the calling thread is spinning while it waits for something to change, so it lets go of the clock until the next round of polling '''
+        task = self.current()
+        if not task.clocked:
+            time.sleep(self.idle_interval)
+            return
+        self.poll(task)
+
+    def poll(self, task, deadline = None):
+        ''' [summary] <task> lets go of the clock until the next round of polling, or until the virtual time reaches <deadline> '''
+        with self.cond:
+            self.block(task, 'polling')
+            self.pollers[task.id] = task
+            if deadline is not None:
+                heapq.heappush(self.sleepers, (deadline, next(self.sequence), task, task.generation))
+        self.wait_turn(task)
+
+    def wait_until(self, predicate, timeout = None):
+        ''' [summary] checks predicate() once in every round of polling until it returns True. Returns False if <timeout> seconds of virtual time pass first. '''
+        deadline = None if timeout is None else self.now + max(timeout, 0)
+        task = self.current()
+        waited = False
+        while not predicate():
+            if deadline is not None and self.now >= deadline:
+                return False
+            if task.clocked: self.poll(task, deadline)
+            else: time.sleep(self.idle_interval)
+            waited = True
+        if waited:
+            self.changed() # the thread is about to act on whatever it was waiting for
+        return True
+
+    def wait(self, event, timeout = None):
+        return self.wait_until(event.is_set, timeout)
+
+    def wait_for(self, condition, predicate, timeout = None):
+        return self.wait_until(predicate, timeout)
+
+    def get(self, q, timeout = None):
+        item = []
+        def take():
+            try: item.append(q.get_nowait())
+            except queue.Empty: return False
+            return True
+        if not self.wait_until(take, timeout):
+            raise queue.Empty
+        return item[0]
+
+    def result(self, future, timeout = None):
+        if not self.wait_until(future.done, timeout):
+            raise concurrent.futures.TimeoutError
+        return future.result()
+
+    def wait_futures(self, futures, timeout = None):
+        futures = list(futures)
+        self.wait_until(lambda: all( f.done() for f in futures ), timeout)
+        return concurrent.futures.wait(futures, 0)
+
+    def join(self, thread, timeout = None):
+        task = self.tasks.get(thread)
+        if task is None or not task.clocked:
+            return self.wait_until(lambda: not thread.is_alive(), timeout) # thread that the clock does not schedule, so its timing can vary
+        return self.wait_until(lambda: task.state == 'done', timeout)
+
+    def acquire(self, lock, timeout = None):
+        return self.wait_until(lambda: lock.acquire(blocking = False), timeout)
+
+    #
+    # Scheduler
+    #
+    def next_task(self):
+        ''' (caller holds self.cond) returns the next task to run, advancing the virtual time if nothing else can run first. Returns None if every task is blocked on something outside of the clock. '''
+        while True:
+            if len(self.ready) > 0:
+                self.busy = True
+                return self.ready.popleft()
+
+            while len(self.round) > 0:
+                task = self.round.popleft()
+                if task.state == 'polling': # ( may have timed out since the round started )
+                    del self.pollers[task.id]
+                    return task
+
+            if self.busy and len(self.pollers) > 0:
+                # something ran since the pollers were last checked, so check them all again
+                self.busy = False
+                self.round = deque(sorted(self.pollers.values(), key = lambda t: t.id))
+                continue
+
+            if len(self.sleepers) == 0:
+                return None
+
+            # Every Task is Idle: advance to the next Wakeup Time and wake all of the tasks that were waiting for it
+            self.now = max(self.now, self.sleepers[0][0])
+            while len(self.sleepers) > 0 and self.sleepers[0][0] <= self.now:
+                (_, _, task, generation) = heapq.heappop(self.sleepers)
+                if task.generation != generation:
+                    continue # task already woke up some other way
+                if not task.clocked:
+                    task.wakeup.set()
+                elif task.state == 'sleeping':
+                    self.ready.append(task)
+                elif task.state == 'polling':
+                    del self.pollers[task.id] # timed out
+                    self.ready.append(task)
+
+    def run_scheduler(self):
+        ''' [summary] daemon thread that hands the clock to the next task each time that the running task lets go of it '''
+        with self.cond:
+            while True:
+                if self.running is not None:
+                    task = self.running
+                    remaining = task.started + self.max_settle - time.monotonic()
+                    if remaining > 0:
+                        self.cond.wait(remaining)
+                        continue
+                    # task has not come back to the clock, so it is blocked on something that the clock cannot see
+                    task.state = 'detached'
+                    self.running = None
+                    self.busy = True
+                    self.detached.append(task.name)
+                    continue
+
+                task = self.next_task()
+                if task is None:
+                    self.cond.wait(self.idle_interval) # every task is waiting on something outside of the clock ( e.g. a detached thread )
+                    self.busy = True
+                    continue
+                self.run(task)
+                task.wakeup.set()
+
+
+class Clock:
+    ''' [Description]
+    the clock that is shared by the Control and Simulation packages. Forwards time(), monotonic(), sleep() and the thread and wait methods to the clock that is currently in use.
+    Defaults to the SystemClock. Call CLOCK.use( <clock> ) before the modes start running to switch clocks.
+    '''
+
+    def __init__(self, source = None):
+        if source is None: source = SystemClock()
+        self.source = source
+
+    def __str__(self):
+        return str(self.source)
+
+    def use(self, source):
+        ''' [summary] switches the clock that time(), monotonic() and sleep() use. Returns the clock that was previously in use. '''
+        prev = self.source
+        self.source = source
+        return prev
+
+    @property
+    def isVirtual(self):
+        return isinstance(self.source, VirtualClock)
+
+    def time(self):
+        return self.source.time()
+
+    def monotonic(self):
+        return self.source.monotonic()
+
+    def sleep(self, seconds):
+        return self.source.sleep(seconds)
+
+    def idle(self):
+        return self.source.idle()
+
+    def spawn(self, thread):
+        return self.source.spawn(thread)
+
+    def enter(self, task):
+        return self.source.enter(task)
+
+    def leave(self):
+        return self.source.leave()
+
+    def changed(self):
+        return self.source.changed()
+
+    def wait_until(self, predicate, timeout = None):
+        return self.source.wait_until(predicate, timeout)
+
+    def wait(self, event, timeout = None):
+        return self.source.wait(event, timeout)
+
+    def wait_for(self, condition, predicate, timeout = None):
+        return self.source.wait_for(condition, predicate, timeout)
+
+    def get(self, q, timeout = None):
+        return self.source.get(q, timeout)
+
+    def result(self, future, timeout = None):
+        return self.source.result(future, timeout)
+
+    def wait_futures(self, futures, timeout = None):
+        return self.source.wait_futures(futures, timeout)
+
+    def join(self, thread, timeout = None):
+        return self.source.join(thread, timeout)
+
+    def acquire(self, lock, timeout = None):
+        return self.source.acquire(lock, timeout)
+
+
+CLOCK = Clock()
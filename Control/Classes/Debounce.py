@@ -0,0 +1,111 @@
+"""
+Description: Class definition for EdgeDebouncer, which turns the noisy stream of edges from a GPIO sensor into a clean, confirmed state.
+            Each edge is fed in as it happens ( e.g. from a GPIO.BOTH callback ), and a new level only becomes the confirmed state once it has held for its confirm window without the sensor bouncing back.
+            Threads that need to know about a state change wait on a threading.Event rather than reading the pin in a loop.
+
+Property of Donaldson Lab at the University of Colorado at Boulder
+"""
+
+# Standard Lib Imports
+import threading
+
+# Local Imports
+from .Clock import CLOCK
+from .Scheduler import Scheduler
+
+
+class EdgeDebouncer:
+    ''' [Description]
+    debounced boolean sensor state. feed() gets called with the sensor's level on every edge, and the scheduler confirms the new level once it has held for <confirm_true> seconds ( if it went True ) or <confirm_false> seconds ( if it went False ).
+    If the level changes again before then, the pending confirmation gets cancelled and the edge counts as a bounce.
+    '''
+
+    def __init__(self, initial, confirm_true = 0.015, confirm_false = 0.015, on_change = None, scheduler = None):
+        """
+        Args:
+            initial (Boolean) : the sensor's state when the debouncer is created
+            confirm_true (float, optional) : seconds that the level must stay True before the state changes to True
+            confirm_false (float, optional) : seconds that the level must stay False before the state changes to False
+            on_change (function, optional) : called with (new state, time of the edge that started it) each time the confirmed state changes. Runs on the scheduler's thread, so it must not block.
+            scheduler (Scheduler, optional) : runs the confirm timers. Defaults to the shared scheduler.
+        """
+        self.state = bool(initial) # the confirmed state
+        self.level = self.state # the sensor's most recent level, which may still be bouncing
+        self.level_since = None # CLOCK.time() of the edge that set the current level
+        self.changed_at = None # CLOCK.time() of the edge that started the current confirmed state
+        self.confirm_windows = { True: confirm_true, False: confirm_false }
+        self.on_change = on_change
+        self.scheduler = scheduler if scheduler is not None else Scheduler.shared()
+        self.pending = None # Timer that will confirm the current level
+        self.lock = threading.Lock()
+
+        self.events = { True: threading.Event(), False: threading.Event() } # the event for the confirmed state is set, and the other is clear
+        self.events[self.state].set()
+
+        self.edges = 0 # number of edges that were fed in
+        self.bounces = 0 # number of levels that did not hold for their confirm window
+
+    def __str__(self):
+        return f'EdgeDebouncer({self.state}, {self.edges} edges, {self.bounces} bounces)'
+
+    def feed(self, level, t = None):
+        '''
+        [summary] records an edge from the sensor
+        Args:
+            level (Boolean) : the sensor's level after the edge
+            t (float, optional) : CLOCK.time() of the edge. Defaults to now.
+        '''
+        if t is None: t = CLOCK.time()
+        level = bool(level)
+        with self.lock:
+            self.edges += 1
+            if level == self.level:
+                return # no change ( e.g. an edge that we already read the level of )
+            self.level = level
+            self.level_since = t
+            if self.pending is not None:
+                # level changed again before it was confirmed
+                self.pending.cancel()
+                self.pending = None
+                self.bounces += 1
+            if level == self.state:
+                return # bounced back to the state that was already confirmed
+            window = self.confirm_windows[level]
+            if window > 0:
+                self.pending = self.scheduler.call_later(window, self._confirm, level, t)
+                return
+        self._confirm(level, t)
+
+    def _confirm(self, level, t):
+        ''' [summary] scheduler callback for once <level> has held for its confirm window '''
+        with self.lock:
+            if self.level != level or self.level_since != t:
+                return # sensor changed since this confirmation was scheduled
+            self.pending = None
+            self.state = level
+            self.changed_at = t
+            self.events[not level].clear()
+            self.events[level].set()
+        if self.on_change is not None:
+            self.on_change(level, t)
+
+    def reset(self, state):
+        ''' [summary] sets the confirmed state directly ( e.g. from a single read of the pin ), dropping any confirmation that was pending '''
+        with self.lock:
+            if self.pending is not None:
+                self.pending.cancel()
+                self.pending = None
+            self.state = self.level = bool(state)
+            self.events[not self.state].clear()
+            self.events[self.state].set()
+
+    def wait_for(self, state, timeout = None):
+        '''
+        [summary] blocks until the confirmed state is <state>, without reading the pin
+        Args:
+            state (Boolean) : the state to wait for
+            timeout (float, optional) : max seconds to wait
+        Returns:
+            (Boolean) : True if the state was reached, False if the timeout was reached first
+        '''
+        return CLOCK.wait(self.events[bool(state)], timeout)
@@ -0,0 +1,105 @@
+"""
+Description: Class definition for DependencyGraph, a directed graph of which interactables can control other interactables.
+            Built once by the Map after all of the interactables' parents have been set, so the control relationships never have to be rediscovered by scanning the parents lists at runtime.
+
+Property of Donaldson Lab at the University of Colorado at Boulder
+"""
+
+
+class DependencyGraph:
+    ''' [Description]
+    graph of the control relationships between interactables. Following the map configuration files, an interactable controls each of the interactables in its parents list
+    (e.g. lever_door1 has door1 as a parent, so lever_door1 is a controller of door1).
+    Stores the adjacency in both directions, raises an Exception if the relationships contain a cycle, and computes a topological order where every controller comes before the interactables that it controls.
+    '''
+
+    def __init__(self, interactables):
+        """
+        [summary] builds the graph from the interactables' parents lists and checks it for cycles
+        Args:
+            interactables (dict) : { interactable name : interactable object }, as stored by Map.instantiated_interactables
+        """
+
+        self.interactables = list(interactables.values()) # preserves the order that interactables were added in the map config file
+
+        self.parents = {} # { interactable : tuple of the interactables it controls }
+
+        self.controllers = {} # { interactable : tuple of the interactables that control it }
+
+        controllers = { i:[] for i in self.interactables }
+        for i in self.interactables:
+            self.parents[i] = tuple(i.parents)
+            for p in i.parents:
+                if p not in controllers:
+                    raise Exception(f'(DependencyGraph.py, __init__) {i.name} has the parent {p.name}, but {p.name} was never added to the map.')
+                controllers[p].append(i)
+        for (i, c) in controllers.items():
+            self.controllers[i] = tuple(c)
+
+        self.levels = self._topological_levels() # [[interactables]] each level only contains interactables whose controllers are all in an earlier level
+
+        self.activation_order = [ i for level in self.levels for i in level ] # flattened topological order: controllers before the interactables they control
+
+    def _topological_levels(self):
+        """
+        [summary] sorts the interactables into levels (Kahn's algorithm), where level 0 contains the interactables that nothing controls, and every other level only contains interactables whose controllers have all appeared in an earlier level.
+        Args:
+            None
+        Returns:
+            ([[Interactable]]) : the interactables grouped by level
+        """
+        remaining = { i:len(self.controllers[i]) for i in self.interactables } # number of controllers that have not been placed yet
+        level = [ i for i in self.interactables if remaining[i] == 0 ]
+        levels = []
+        placed = 0
+        while len(level) > 0:
+            levels.append(level)
+            placed += len(level)
+            nxt_level = []
+            for i in level:
+                for p in self.parents[i]:
+                    remaining[p] -= 1
+                    if remaining[p] == 0:
+                        nxt_level.append(p)
+            level = nxt_level
+
+        if placed != len(self.interactables):
+            cycle = [ i.name for i in self.interactables if remaining[i] > 0 ]
+            raise Exception(f'(DependencyGraph.py, _topological_levels) the parent relationships between the following interactables contain a cycle: {cycle}. Please check the "parents" values in the interactable configuration files.')
+        return levels
+
+    def parents_of(self, interactable):
+        """
+        [summary] returns the interactables that <interactable> controls
+        Args:
+            interactable (Interactable)
+        Returns:
+            (tuple) : the parent interactables
+        """
+        return self.parents.get(interactable, ())
+
+    def controllers_of(self, interactable, type = None):
+        """
+        [summary] returns the interactables that control <interactable> (e.g. which levers control door1)
+        Args:
+            interactable (Interactable)
+            type (string, optional) : if provided, only returns controllers of this interactable type (e.g. 'lever')
+        Returns:
+            (tuple) : the interactables that have <interactable> as a parent
+        """
+        controllers = self.controllers.get(interactable, ())
+        if type is None:
+            return controllers
+        return tuple( c for c in controllers if c.type == type )
+
+    def is_controller(self, interactable):
+        """
+        [summary] returns True if <interactable> controls at least one other interactable
+        """
+        return len(self.parents.get(interactable, ())) > 0
+
+    def is_controlled(self, interactable):
+        """
+        [summary] returns True if at least one interactable controls <interactable>
+        """
+        return len(self.controllers.get(interactable, ())) > 0
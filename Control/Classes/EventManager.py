@@ -15,6 +15,13 @@ import sys
 import threading
 import queue 
 import csv
+import os
+import json
+
+# Local Imports
+from .Clock import CLOCK
+from . import Instrumentation
+from . import Threads
 
 # Global
 PRINTING_MUTEX = threading.Lock()
@@ -31,6 +38,12 @@ class EventManager:
         self.write_queue = queue.Queue() # items get added here to be written to output csv file 
         self.print_queue = queue.Queue()
         self.stop_messages = False # gets set to True to finish printing and exit thread. should only happen once
+        self.run_metadata = {} # { name : value } details about the run ( e.g. the random seed ) that get written at the top of the output file, see set_run_metadata() 
+        self.subscribers = [] # LifecycleSubscriptions that get notified each time a mode changes state, see publish() 
+        self.subscriber_lock = threading.Lock() 
+        self.metrics = Instrumentation.Metrics('EventManager') # timestamp counts, queue depths and csv write times, see dump_metrics() 
+        self.writer = None # thread running watch_write_queue 
+        self.writer_fp = None # output file that self.writer is writing to 
         self.watch_print_queue()      
         if mode is not None: 
             self.output_fp = self.mode.output_fp
@@ -50,11 +63,16 @@ class EventManager:
         if new_mode is not None: 
             self.update_for_new_mode(new_mode, initial_enter) 
         self.active = True 
-        self.watch_write_queue()
+        if self.writer is None or not self.writer.is_alive() or self.writer_fp != self.output_fp: 
+            # only one writer per output file; a writer for an earlier file exits once it sees that the file changed 
+            self.writer_fp = self.output_fp 
+            self.writer = self.watch_write_queue()
         return 
     def deactivate(self): 
         self.active = False 
         self.mode = None
+        if self.writer is not None and self.writer is not threading.current_thread(): 
+            CLOCK.join(self.writer) # writer finishes writing whatever is left in the queue before it exits, so nothing spills into the next mode's output file 
     def isActive(self): 
         return self.active 
     @property
@@ -62,7 +80,7 @@ class EventManager:
         return self.mode.active
     def interrupt(self): 
         ''' called if an interrupt signal is sent by user '''
-        self.new_timestamp(event_description='Early_Interrupt_Caused_Exit', time=time.time())
+        self.new_timestamp(event_description='Early_Interrupt_Caused_Exit', time=CLOCK.time())
         self.stop_messages = True 
         self.deactivate()
         self.finish() # finishes writing remaining events to the csv file 
@@ -80,16 +98,13 @@ class EventManager:
             header = ['Round', 'Event', 'Modal Time', 'Time', 'Duration', 'In Timeout?', 'Mode Name']
             csv_writer = csv.writer(file, delimiter = ',')
             csv_writer.writerow(spacer)
+            if len(self.run_metadata) > 0: 
+                csv_writer.writerow(['Run Metadata'] + [f'{k}={v}' for (k,v) in self.run_metadata.items()])
             csv_writer.writerow(header)
             return 
-    def run_in_thread(func): 
-        ''' decorator function to run function on its own daemon thread '''
-        def run(*k, **kw): 
-            t = threading.Thread(target = func, args = k, kwargs=kw, daemon=True)
-            t.name = func.__name__
-            t.start() 
-            return t
-        return run    
+    def set_run_metadata(self, name, value): 
+        ''' records a detail about the run ( e.g. the simulation's random seed ) in the header of every output file that gets created after this call '''
+        self.run_metadata[name] = value 
     def finish(self): 
         '''finishes writing anything in the queue to the output csv file '''
         ''' finishes printing anything in the print queue '''
@@ -105,18 +120,22 @@ class EventManager:
         if len(self.write_queue.queue) > 19: 
             print(f'Skipping the finish() writing to write_queue due to there being {len(self.write_queue.queue)} present in the queue. Q Contents: {list(self.write_queue.queue)}')
         return  
-    @run_in_thread
+    @Threads.threaded('event_manager', 'csv_writer')
     def watch_write_queue(self): 
         ''' manages writing to an output csv file so multiple threads will not interfere with one another '''
-        with open(self.output_fp, 'a') as file: # a-mode appends to the file so will not overwrite existing contents of a file if file already existed
+        output_fp = self.output_fp 
+        with open(output_fp, 'a') as file: # a-mode appends to the file so will not overwrite existing contents of a file if file already existed
             csv_writer = csv.writer(file, delimiter=',')
-            while self.active: 
+            while self.output_fp == output_fp: 
                 item = None 
-                while self.active and item is None: 
+                while self.output_fp == output_fp and item is None: 
                     try: item = self.write_queue.get_nowait()
-                    except queue.Empty: pass 
-                
-                if item is not None: 
+                    except queue.Empty: 
+                        if not self.active: break # deactivated, and nothing left to write 
+                        CLOCK.idle() 
+                if item is None: 
+                    break 
+                else: 
                     # write to csv file 
                     item_round = item.round 
                     item_event = item.event
@@ -125,12 +144,13 @@ class EventManager:
                     item_duration = item.duration
                     item_in_timeout = item.inTimeout
                     item_mode = item.mode
-                    csv_writer.writerow([item_round, item_event, item_mode_time, item_raw_time, item_duration, item_in_timeout, item_mode])
-                    file.flush() 
+                    with self.metrics.timer('csv_write'): 
+                        csv_writer.writerow([item_round, item_event, item_mode_time, item_raw_time, item_duration, item_in_timeout, item_mode])
+                        file.flush() 
             
             file.close() 
         return     
-    @run_in_thread
+    @Threads.threaded('event_manager', 'printer', clocked = False)
     def watch_print_queue(self): 
         ''' grabs from print queue and prints to terminal at a time where it won't conflict with other statements '''
         
@@ -178,10 +198,87 @@ class EventManager:
             ts.print_timestamp()
         # Add to Queue so timestamp is written to output csv file 
         self.write_queue.put(ts)
+        self.metrics.count('timestamps')
+        self.metrics.gauge('write_queue_depth', self.write_queue.qsize())
         return ts    
+
+    #
+    # Instrumentation 
+    #
+    def dump_metrics(self, filepath = None): 
+        ''' writes the counters and latency histograms of every interactable ( and of the EventManager and ServoBus ) to a json file, along with the thread inventory ( live threads and CPU time per subsystem, see Threads.py ). Called each time a mode exits. 
+        Args: 
+            filepath (string, optional) : where to write the metrics. Defaults to the output csv file's path, ending in _metrics.json rather than .csv 
+        Returns: 
+            (string | None) : the filepath that was written, or None if there is nowhere to write to 
+        '''
+        if filepath is None: 
+            if getattr(self, 'output_fp', None) is None: 
+                return None 
+            filepath = os.path.splitext(self.output_fp)[0] + '_metrics.json'
+        try: 
+            with open(filepath, 'w') as file: 
+                metrics = Instrumentation.snapshot() 
+                metrics['threads'] = { 'by_subsystem': Threads.by_subsystem(), 'live': Threads.snapshot() }
+                json.dump(metrics, file, indent = 4)
+        except OSError as e: 
+            print(f'(EventManager.py, dump_metrics) could not write metrics to {filepath}: {e}')
+            return None 
+        return filepath 
     def new_countdown(self, event_description, duration, primary_countdown = False, create_start_and_end_timestamps = True): 
         # creates a new Countdown object and adds to priority queue, where the event that will finish the soonest has the highest priority/will be printed to the screen.
         return self.Countdown(event_description, duration, mode = self.mode, new_timestamp = self.new_timestamp, checkEventManagerActive = self.isActive, start_time = None, primary_countdown = primary_countdown, create_timestamps=create_start_and_end_timestamps)
+
+    #
+    # Mode Lifecycle Events 
+    #
+    LIFECYCLE_EVENTS = ('entered', 'setup_done', 'timeout_started', 'exiting', 'exited') 
+
+    def subscribe(self): 
+        ''' returns a LifecycleSubscription that will recieve every mode lifecycle event published after this call '''
+        subscription = self.LifecycleSubscription() 
+        with self.subscriber_lock: 
+            self.subscribers.append(subscription)
+        return subscription 
+    def unsubscribe(self, subscription): 
+        with self.subscriber_lock: 
+            if subscription in self.subscribers: self.subscribers.remove(subscription)
+    def publish(self, mode, event): 
+        ''' called by modeABC each time that a mode changes state. Notifies every subscriber that <mode> has just reached <event> ( one of LIFECYCLE_EVENTS ) '''
+        if event not in self.LIFECYCLE_EVENTS: 
+            raise Exception(f'(EventManager.py, publish) {event} is not a lifecycle event. Options are: {self.LIFECYCLE_EVENTS}')
+        t = CLOCK.time() 
+        with self.subscriber_lock: 
+            subscribers = list(self.subscribers)
+        for s in subscribers: 
+            s.put(mode, event, t)
+    class LifecycleSubscription: 
+        ''' queue of the lifecycle events ( mode, event, time ) that were published after subscribing. Lets a thread block until a mode changes state, rather than polling the mode's attributes '''
+        def __init__(self): 
+            self.events = queue.Queue() 
+        def put(self, mode, event, time = None): 
+            self.events.put( (mode, event, time) )
+        def get(self, timeout = None): 
+            ''' returns the next (mode, event, time), or None if <timeout> seconds pass first '''
+            try: return CLOCK.get(self.events, timeout)
+            except queue.Empty: return None 
+        def wait_until(self, condition, timeout = None, poll = 1): 
+            ''' 
+            blocks until condition() returns True. condition() is rechecked each time that an event arrives. 
+            Args: 
+                condition (function) : returns True once the state that the caller is waiting on has been reached ( e.g. lambda: mode.inTimeout ) 
+                timeout (float, optional) : max seconds to wait 
+                poll (float, optional) : condition() also gets rechecked after <poll> seconds with no events, in case a mode's state was changed without publishing 
+            Returns: 
+                (Boolean) : True if the condition was reached, False if the timeout passed first 
+            '''
+            deadline = None if timeout is None else CLOCK.monotonic() + timeout 
+            while not condition(): 
+                wait = poll if deadline is None else min(poll, deadline - CLOCK.monotonic())
+                if wait <= 0: 
+                    return False 
+                self.get(timeout = wait)
+            return True 
     class Timestamp:
         ''' Specific/Instantaneous Event Occurrence'''
         def __init__( self, mode, round_num, event_description, mode_start_time, inTimeout, time = time.time(), duration = None): 
@@ -196,20 +293,12 @@ class EventManager:
         def __str__(self): 
             return f'{self.event} : {self.modal_time}'
         
-        def run_in_thread(func): 
-            ''' decorator function to run function on its own daemon thread '''
-            def run(*k, **kw): 
-                t = threading.Thread(target = func, args = k, kwargs=kw, daemon=True)
-                t.name = func.__name__
-                t.start() 
-                return t
-            return run 
-
-        @run_in_thread
+        @Threads.threaded('event_manager', 'print_timestamp', clocked = False)
         def print_timestamp(self): 
             # wait to ensure that the printing mutex is not in use ( meaning a map is getting printed )
             while PRINTING_MUTEX.locked(): 
                 ''' wait here until printing mutex is not in use'''
+                CLOCK.idle()
             
             # Grab the timestamp mutex and print 
             with TIMESTAMP_EVENT_MUTEX: 
@@ -227,14 +316,14 @@ class EventManager:
 
             # Start and End Time # 
             if start_time is not None: self.start_time = start_time 
-            else: self.start_time = time.time()
+            else: self.start_time = CLOCK.time()
             self.end_time = self.start_time + duration 
 
             # Create Start and Finish Countdowns
-            if create_timestamps: ts1 = new_timestamp(event_description = self.event+'_Start', time = time.time()) # Timestamp Countdown Start
+            if create_timestamps: ts1 = new_timestamp(event_description = self.event+'_Start', time = CLOCK.time()) # Timestamp Countdown Start
             cd_completed = self.print_countdown() 
             if create_timestamps and cd_completed: 
-                t = time.time()
+                t = CLOCK.time()
                 new_timestamp(event_description = self.event+'_Finish', time = t, duration = t - ts1.time) # Timestamp Countdown End
 
         @property
@@ -247,37 +336,38 @@ class EventManager:
                 return False     
             if self.primary_countdown: 
                 # ROUND COUTNDOWN: sent to background if needed # 
-                while self.end_time > time.time() and self.active: 
+                while self.end_time > CLOCK.time() and self.active: 
                     ## Primary countdown is usually the Round Countdown, and therefore has the lowest priority so will only print if all mutexes are free. 
                     if not COUNTDOWN_MUTEX.locked(): 
-                        timeinterval = int(round(self.end_time,2) - round(time.time(),2)) # calculate time remaining
+                        timeinterval = int(round(self.end_time,2) - round(CLOCK.time(),2)) # calculate time remaining
                         mins, secs = divmod(timeinterval, 60) # Format Time for displaying 
                         timer = '{:02d}:{:02d}'.format(mins, secs) 
                         if not TIMESTAMP_EVENT_MUTEX.locked() and not PRINTING_MUTEX.locked(): 
                             if self.active: 
                                 sys.stdout.write(f'\r{timer} {self.event}   |')    
-                    time.sleep(1)
+                    CLOCK.sleep(1)
                 if not self.active: return False 
                 else: return True
 
             if not self.primary_countdown: 
-                while self.end_time > time.time() and self.active:
+                while self.end_time > CLOCK.time() and self.active:
                     if not COUNTDOWN_MUTEX.locked(): # gives terminal printing priority to specific events that need to print to terminal
                         COUNTDOWN_MUTEX.acquire() # Aquires the Countdown Mutex, which will prevent the primary countdown from printing while this countdown prints. 
                         try: 
-                            while self.end_time > time.time() and self.active: 
-                                timeinterval = int(self.end_time - time.time()) # calculate time remaining
+                            while self.end_time > CLOCK.time() and self.active: 
+                                timeinterval = int(self.end_time - CLOCK.time()) # calculate time remaining
                                 mins, secs = divmod(timeinterval, 60) # Format Time for displaying 
                                 timer = '{:02d}:{:02d}'.format(mins, secs) 
                                 if not TIMESTAMP_EVENT_MUTEX.locked() and not PRINTING_MUTEX.locked(): 
                                     if self.active: 
                                         sys.stdout.write(f'\r{timer} {self.event}   |')
-                                time.sleep(1)
+                                CLOCK.sleep(1)
                         finally: 
                             COUNTDOWN_MUTEX.release()  
                             if not self.active: 
                                 return False 
                             return True
+                    CLOCK.idle() # another countdown is printing
             return False 
 
     #
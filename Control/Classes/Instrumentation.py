@@ -0,0 +1,219 @@
+"""
+Description: Class definitions for lightweight instrumentation that can be left on during real experiments.
+            Each interactable ( and the EventManager and ServoBus ) owns a Metrics object, which keeps counters and latency histograms for its hot paths ( e.g. how long each threshold check takes, or how long after a hardware edge its threshold event gets put on the queue ).
+            Samples are stored in fixed-size ring buffers and histograms, so memory use does not grow over an experiment. Every Metrics object is kept in the module level REGISTRY, and the EventManager dumps all of them to a json file each time a mode exits ( see EventManager.dump_metrics ).
+
+Property of Donaldson Lab at the University of Colorado at Boulder
+"""
+
+# Standard Lib Imports
+import time
+import queue
+import bisect
+import itertools
+import threading
+from array import array
+from collections import deque
+
+# Local Imports
+from .Clock import CLOCK
+
+
+ENABLED = True # set to False to turn off recording everywhere ( e.g. to compare against an experiment without instrumentation )
+REGISTRY = {} # { name : Metrics } every Metrics object that has been created, so they can all be dumped together
+REGISTRY_LOCK = threading.Lock()
+
+
+class RingBuffer:
+    ''' [Description]
+    fixed-size buffer of the most recent <size> float samples. Appending never takes a lock; each writer claims the next slot from an itertools.count, which is atomic in CPython.
+    '''
+
+    def __init__(self, size = 1024):
+        self.size = size
+        self.data = array('d', bytes(8 * size)) # zero filled
+        self.counter = itertools.count()
+        self.written = 0 # number of samples appended so far ( may lag a concurrent append by one )
+
+    def __len__(self):
+        return min(self.written, self.size)
+
+    def append(self, value):
+        i = next(self.counter)
+        self.data[i % self.size] = value
+        if i >= self.written: self.written = i + 1
+
+    def values(self):
+        ''' [summary] returns a copy of the samples that are in the buffer, oldest first '''
+        n = self.written
+        if n <= self.size:
+            return list(self.data[:n])
+        start = n % self.size
+        return list(self.data[start:]) + list(self.data[:start])
+
+
+class LatencyHistogram:
+    ''' [Description]
+    histogram of durations ( in seconds ) with power-of-two buckets from 1 microsecond up to ~2 minutes, plus a RingBuffer of the most recent samples for percentiles.
+    '''
+
+    BOUNDS = [ 1e-6 * 2 ** i for i in range(28) ] # upper bound of each bucket. Anything larger goes in the last ( overflow ) bucket.
+
+    def __init__(self, recent = 1024):
+        self.counts = [0] * ( len(self.BOUNDS) + 1 )
+        self.count = 0
+        self.total = 0.0
+        self.min = None
+        self.max = None
+        self.recent = RingBuffer(recent)
+        self.lock = threading.Lock() # only ever held for a few increments, so it is almost never contended
+
+    def record(self, seconds):
+        ''' [summary] adds a single duration to the histogram '''
+        if not ENABLED:
+            return
+        idx = bisect.bisect_left(self.BOUNDS, seconds)
+        with self.lock:
+            self.counts[idx] += 1
+            self.count += 1
+            self.total += seconds
+            if self.min is None or seconds < self.min: self.min = seconds
+            if self.max is None or seconds > self.max: self.max = seconds
+        self.recent.append(seconds)
+
+    def percentile(self, p):
+        ''' [summary] returns the <p>th percentile (0-100) of the recent samples, or None if there are none '''
+        values = sorted(self.recent.values())
+        if len(values) == 0:
+            return None
+        return values[ min(len(values) - 1, int(len(values) * p / 100)) ]
+
+    def snapshot(self):
+        ''' [summary] returns the histogram as a dict that can be written to json '''
+        with self.lock:
+            buckets = { f'<={b:g}': c for (b, c) in zip(self.BOUNDS, self.counts) if c > 0 }
+            if self.counts[-1] > 0: buckets['overflow'] = self.counts[-1]
+            summary = { 'count': self.count, 'mean': self.total / self.count if self.count else None, 'min': self.min, 'max': self.max }
+        summary.update({ 'p50': self.percentile(50), 'p90': self.percentile(90), 'p99': self.percentile(99), 'buckets': buckets })
+        return summary
+
+
+class Metrics:
+    ''' [Description]
+    the counters, gauges and latency histograms for a single component ( an interactable, the EventManager, the ServoBus ... ). Each is created the first time it is used, so call sites only need a name.
+    '''
+
+    def __init__(self, name):
+        """
+        Args:
+            name (string) : name that the metrics get dumped under. Replaces any earlier Metrics with the same name in the REGISTRY ( e.g. from a previous Map ).
+        """
+        self.name = name
+        self.counters = {} # { name : int }
+        self.gauges = {} # { name : (latest value, max value) }
+        self.histograms = {} # { name : LatencyHistogram }
+        with REGISTRY_LOCK:
+            REGISTRY[name] = self
+
+    def __str__(self):
+        return f'Metrics({self.name})'
+
+    def count(self, name, n = 1):
+        ''' [summary] adds <n> to a counter '''
+        if ENABLED:
+            self.counters[name] = self.counters.get(name, 0) + n
+
+    def gauge(self, name, value):
+        ''' [summary] records the current value of something that goes up and down ( e.g. a queue depth ), keeping track of the largest value seen '''
+        if ENABLED:
+            (_, peak) = self.gauges.get(name, (value, value))
+            self.gauges[name] = (value, max(peak, value))
+
+    def histogram(self, name):
+        ''' [summary] returns the LatencyHistogram called <name>, creating it on first use '''
+        h = self.histograms.get(name)
+        if h is None:
+            h = self.histograms.setdefault(name, LatencyHistogram())
+        return h
+
+    def record(self, name, seconds):
+        ''' [summary] adds a duration to the histogram called <name> '''
+        if ENABLED:
+            self.histogram(name).record(seconds)
+
+    def timer(self, name):
+        ''' [summary] context manager that records how long its body takes, e.g. with metrics.timer('callback'): ... '''
+        return _Timer(self, name)
+
+    def snapshot(self):
+        ''' [summary] returns every counter, gauge and histogram as a dict that can be written to json '''
+        return {
+            'counters': dict(self.counters),
+            'gauges': { k: { 'value': v, 'max': peak } for (k, (v, peak)) in list(self.gauges.items()) },
+            'histograms': { k: h.snapshot() for (k, h) in list(self.histograms.items()) }
+        }
+
+
+class _Timer:
+    ''' context manager returned by Metrics.timer() '''
+    __slots__ = ('metrics', 'name', 'start')
+
+    def __init__(self, metrics, name):
+        self.metrics = metrics
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.metrics.record(self.name, time.perf_counter() - self.start)
+        return False
+
+
+class InstrumentedQueue(queue.Queue):
+    ''' [Description]
+    queue.Queue that records its depth, how long each item waited in the queue, and ( if the owner reports when its state changed ) how long after the state change each item was put on the queue.
+    The items themselves are stored exactly as they would be in a queue.Queue, so code that looks at q.queue directly still works.
+    '''
+
+    def __init__(self, metrics, owner = None, maxsize = 0):
+        """
+        Args:
+            metrics (Metrics) : where the queue records its measurements
+            owner (interactableABC, optional) : if provided, each put records the time since owner.state_changed_at as 'edge_to_queue'
+        """
+        super().__init__(maxsize)
+        self.metrics = metrics
+        self.owner = owner
+        self.put_times = deque() # CLOCK.monotonic() that each item in the queue was put
+        self.last_edge = None # the owner's state_changed_at that the last 'edge_to_queue' sample was for
+
+    def _put(self, item):
+        super()._put(item)
+        self.put_times.append(CLOCK.monotonic())
+        if not ENABLED:
+            return
+        self.metrics.count('queue_puts')
+        self.metrics.gauge('queue_depth', len(self.queue))
+        edge = getattr(self.owner, 'state_changed_at', None)
+        if edge is not None and edge != self.last_edge:
+            self.last_edge = edge
+            self.metrics.record('edge_to_queue', max(CLOCK.time() - edge, 0))
+
+    def _get(self):
+        item = super()._get()
+        while len(self.put_times) > len(self.queue) + 1:
+            self.put_times.popleft() # items were removed from self.queue directly ( e.g. q.queue.clear() )
+        if len(self.put_times) > 0:
+            put = self.put_times.popleft()
+            if ENABLED:
+                self.metrics.record('queue_wait', max(CLOCK.monotonic() - put, 0))
+        return item
+
+
+def snapshot():
+    ''' [summary] returns { name : snapshot } for every Metrics in the REGISTRY '''
+    with REGISTRY_LOCK:
+        registered = list(REGISTRY.items())
+    return { name: m.snapshot() for (name, m) in registered }
@@ -12,6 +12,9 @@ Property of Donaldson Lab at the University of Colorado at Boulder
 
 # Standard Lib Imports 
 import time, random, sys, queue, threading
+import concurrent.futures
+import atexit
+from array import array
 
 # Third Party Imports 
 from abc import abstractmethod, ABCMeta
@@ -19,6 +22,12 @@ from abc import abstractmethod, ABCMeta
 
 # Local Imports 
 from Logging.logging_specs import control_log
+from .Clock import CLOCK
+from .Scheduler import Scheduler, completed_future
+from .ServoBus import ServoBus
+from .Debounce import EdgeDebouncer
+from .Instrumentation import Metrics, InstrumentedQueue
+from .Threads import threaded
 
 try: 
     import RPi.GPIO as GPIO 
@@ -38,8 +47,16 @@ except Exception as e:
     print(e)
     SERVO_KIT = None
 
+# every servo write goes through the bus, so only one thread ever talks to the servo board 
+SERVO_BUS = ServoBus(SERVO_KIT) if SERVO_KIT is not None else None 
+if SERVO_BUS is not None: 
+    atexit.register(SERVO_BUS.flush, 1) # let any last stop commands reach the servos before exiting
+
 class interactableABC(metaclass = ABCMeta):
 
+    transition_events = False # derived classes set this to True to get a single threshold event each time the threshold condition goes from unmet to met, rather than threshold events for as long as the condition stays met 
+    threshold_check_sample = 64 # watch_for_threshold_event only times one out of every this many threshold checks ( along with the first check after each event ), so that timing does not slow down every spin of the watcher 
+
     def __init__(self, ID, threshold_condition, name, event_manager, type):
 
         ## Shared Among Interactables ## 
@@ -52,6 +69,7 @@ class interactableABC(metaclass = ABCMeta):
         self.type = type # string representation of type of interactable
         self.isSimulation = False # simulation feature: set to True if interactable is being simulated 
         self.messagesReturnedFromSetup = '' # append to with any messages that we want to display after setup, but before activating an interactable
+        self.random = random # simulation feature: random number generator used when simulating this interactable. The Simulation package replaces this with a seeded stream so runs can be reproduced 
 
         ## Location Information ## 
         self.edge_or_chamber = None # string to represent if this interactable sits along an edge or in a chamber
@@ -59,8 +77,14 @@ class interactableABC(metaclass = ABCMeta):
 
         ## Threshold Tracking ## 
         self.threshold = False
+        self.threshold_event_count = 0 # number of threshold events that the watcher has handled. Only goes up, so ( unlike self.threshold ) it cannot be missed by a thread that checks it late 
         self.threshold_condition = threshold_condition  # {attribute, initial_value, goal_value} dict to specify what the attribute/value goal of the interactable is. 
-        self.threshold_event_queue = queue.Queue() # queue for tracking anytime a threshold condition is met 
+        self.metrics = Metrics(name) # counters and latency histograms for this interactable's hot paths, see Instrumentation.py 
+        self.threshold_event_queue = InstrumentedQueue(self.metrics, owner = self) # queue for tracking anytime a threshold condition is met 
+        self.threshold_met = None # (transition events only) if the threshold condition was met the last time that it was checked. None until the first check after activating. 
+        self.state_changed_at = None # CLOCK.time() of the most recent state change reported by mark_state_change() 
+        self.transition_time = None # CLOCK.time() of the transition that the most recent threshold event is for 
+        self.state_callbacks = [] # functions that get called with this interactable anytime the state shown in its string changes ( e.g. door1(Open:True) ), see state_changed() 
 
         ## Dependency Chain Information ## 
         self.parents = [] # if an interactable is a dependent for another, then the object that it is a dependent for is placed in this list. 
@@ -78,7 +102,7 @@ class interactableABC(metaclass = ABCMeta):
         return self.name
 
     # ---------------------------------------------------------------------------------------------------------------------------------------------------------
-    #         InteractableABC Inner Classes Servo, PosServo(Servo), ContServo(Servo), and Button ( uses Rpi.GPIO and adafruit_servokit.ServoKit )
+    #         InteractableABC Inner Classes Servo, PosServo(Servo), ContServo(Servo), and Button ( uses Rpi.GPIO and adafruit_servokit.ServoKit, through the SERVO_BUS )
     # ---------------------------------------------------------------------------------------------------------------------------------------------------------
 
     class Button:
@@ -145,27 +169,21 @@ class interactableABC(metaclass = ABCMeta):
                 self.isSimulation = True
                 return -1
 
-        def run_in_thread(func): 
-            ''' decorator function to run function on its own daemon thread '''
-            def run(*k, **kw): 
-                t = threading.Thread(target = func, args = k, kwargs=kw, daemon=True)
-                t.name = func.__name__
-                t.start() 
-                return t
-            return run 
-
-        @run_in_thread
-        def listen_for_event(self, timeout=None, edge=None): # detects the current pin for the occurence of some event
+        @threaded('interactable', 'button_listener', clocked = False)
+        def listen_for_event(self, timeout=None, edge=None, callback=None, bouncetime=400): # detects the current pin for the occurence of some event
             ''' 
             [summary] event detection for button. On event (aka a button press), incrememts the button's num_pressed value 
             ( note this does not update/check isPressed, as this is handled by the property function isPressed )
             Args: 
                 timeout (int, optional): amount of time we should wait for event. If timeout is None, waits indefinetely for an event to occur. 
                 edge (string, optional): arg to designate if we should look for event on the FALLING or RISING edge. 
+                callback (function, optional): if provided, gets called with the pin number on every detected edge instead of incrementing the press count ( e.g. for listening on GPIO.BOTH edges )
+                bouncetime (int, optional): milliseconds that further edges get ignored for after an edge is detected
             Returns: 
                 None 
             '''
             def increment_presses(pin): 
+                self.parent.mark_state_change() 
                 self.num_pressed += 1 
                 self.buttonQ.put(f'press#{self.num_pressed}') # add press to parents buttonQ
                 # print(f'(InteractableABC, Button.listen_for_event) {self.parent} Button Object was Pressed. num_pressed = {self.num_pressed}, buttonQ = {list(self.buttonQ.queue)}')
@@ -184,11 +202,13 @@ class interactableABC(metaclass = ABCMeta):
             #
             # Wait For Event
             #
+            if callback is None: 
+                callback = increment_presses
             if edge is None: 
                 # default to the falling edge 
-                GPIO.add_event_detect( self.pin_num, GPIO.FALLING, bouncetime = 400, callback = increment_presses )
+                GPIO.add_event_detect( self.pin_num, GPIO.FALLING, bouncetime = bouncetime, callback = callback )
             else: 
-                GPIO.add_event_detect(self.pin_num, edge, bouncetime = 400, callback = increment_presses )
+                GPIO.add_event_detect(self.pin_num, edge, bouncetime = bouncetime, callback = callback )
             
 
             if timeout is None: # monitor pin all while its parent interactable is active 
@@ -254,18 +274,16 @@ class interactableABC(metaclass = ABCMeta):
             [summary] Sets up the initial connection with adafruit library for servo controls. 
             Args: None 
             Returns: 
-                (SERVO_KIT.servo) : on a successful adafruit connection, returns a servo object provided by the adafruit_servokit.ServoKit library. On unsuccessful connection, returns False. 
+                (ServoChannel) : on a successful adafruit connection, returns the channel's proxy on the SERVO_BUS, which can be used just like the servo object provided by the adafruit_servokit.ServoKit library. On unsuccessful connection, returns False. 
             """
-            if SERVO_KIT is None: 
+            if SERVO_BUS is None: 
                 # simulating servo kit
                 self.parent.messagesReturnedFromSetup += f' simulating servo.'
                 return False 
             
             try: 
-                if self.servo_type == 'positional':
-                    return SERVO_KIT.servo[self.pin_num]
-                elif self.servo_type == 'continuous':
-                    return SERVO_KIT.continuous_servo[self.pin_num]
+                if self.servo_type in ServoBus.SERVO_TYPES:
+                    return SERVO_BUS.channel(self.servo_type, self.pin_num)
                 else: 
                     raise KeyError(f'(InteractableABC.py, Servo) {self.parent.name}: servo type was passed as {self.servo_type}, must be either "positional" or "continuous"')
 
@@ -358,6 +376,7 @@ class interactableABC(metaclass = ABCMeta):
         # control_log(f"(InteractableABC.py, activate) {self.name} has been activated. starting contents of the threshold_event_queue are: {list(self.threshold_event_queue.queue)}")
         
         self.threshold = False # "resets" the interactable's threshold value so it'll check for a new threshold occurence
+        self.threshold_met = None # the first check after activating counts as a transition if the condition is already met 
         self.active = True 
         self.watch_for_threshold_event() # begins continuous thread for monitoring for a threshold event
         
@@ -380,14 +399,38 @@ class interactableABC(metaclass = ABCMeta):
         '''[summary] empties the interactable's threshold event queue '''
         self.threshold_event_queue.queue.clear() # empty the threshold_event_queue
     
-    def run_in_thread(func): 
-        ''' decorator function to run function on its own daemon thread '''
-        def run(*k, **kw): 
-            t = threading.Thread(target = func, args = k, kwargs=kw, daemon=True)
-            t.name = func.__name__
-            t.start() 
-            return t
-        return run 
+    def mark_state_change(self, t = None): 
+        ''' 
+        [summary] called at the moment that the interactable's state changes ( e.g. from a GPIO callback ), so the threshold event for the transition gets timestamped with when the change happened rather than with when the watcher noticed it 
+        Args: 
+            t (float, optional) : CLOCK.time() of the change. Defaults to now. 
+        '''
+        self.state_changed_at = CLOCK.time() if t is None else t 
+
+    def state_changed(self): 
+        ''' [summary] called anytime the state shown in the interactable's string changes ( e.g. a door opening ), so that the Map knows to redraw the interactable's location '''
+        for fn in self.state_callbacks: 
+            fn(self)
+
+    def detect_transition(self, met): 
+        ''' 
+        [summary] (transition events only) compares the threshold condition against the last time it was checked. 
+        Returns True exactly once for each transition from unmet to met, no matter how long the condition then stays met or whether a mode empties the threshold event queue in the meantime. 
+        On a transition, sets self.transition_time to the time of the change. 
+        Args: 
+            met (Boolean) : if the threshold condition is currently met 
+        Returns: 
+            (Boolean) : True if the condition just went from unmet to met 
+        '''
+        prev = self.threshold_met 
+        self.threshold_met = met 
+        if not met or prev is True: 
+            return False 
+        t = self.state_changed_at 
+        if prev is None or t is None or ( self.transition_time is not None and t <= self.transition_time ): 
+            t = CLOCK.time() # no change was reported for this transition ( or it was already met when activated ), so it happened as of now 
+        self.transition_time = t 
+        return True 
 
     @abstractmethod
     def add_new_threshold_event(self): 
@@ -401,7 +444,7 @@ class interactableABC(metaclass = ABCMeta):
         raise Exception(f'must override add_new_threshold_event in class definition for {self.name}')
         self.threshold_event_queue.put()
 
-    @run_in_thread
+    @threaded('interactable', 'threshold_watcher')
     def watch_for_threshold_event(self): 
         """
         [summary] 
@@ -413,11 +456,15 @@ class interactableABC(metaclass = ABCMeta):
         Returns: None 
         """
 
+        checks = 0 # threshold checks since the last threshold event. Added to the threshold_checks counter once per event, rather than on every check 
         while self.active: 
 
             # using the attribute/value pairing specified by the threshold_condition dictionary
             # if at any time the given attribute == value, append to the threshold_event_queue.
 
+            timed = checks % self.threshold_check_sample == 0 
+            if timed: check_start = time.perf_counter() 
+            checks += 1 
             threshold_attr_name = self.threshold_condition["attribute"]
             attribute = getattr(self, threshold_attr_name) # get object specified by the attribute name
 
@@ -429,10 +476,16 @@ class interactableABC(metaclass = ABCMeta):
             
             
             # Check for a Threshold Event by comparing the current threshold value with the goal value 
-            if attribute == self.threshold_condition['goal_value']: # Threshold Event: interactable has met its threshold condition
+            met = attribute == self.threshold_condition['goal_value']
+            if timed: self.metrics.record('threshold_check', time.perf_counter() - check_start)
+            if self.transition_events: 
+                event_bool = self.detect_transition(met) # only the check where the condition first becomes met counts as an event 
+            else: 
+                event_bool = met 
+
+            if met: # Threshold Event: interactable has met its threshold condition
                 
                 # control_log(f'(InteractableABC.py, watch_for_threshold_event) {self} Threshold Event Detected!')
-                event_bool = True 
 
 
                 #
@@ -443,6 +496,10 @@ class interactableABC(metaclass = ABCMeta):
 
                     # Handle Event 
                     self.threshold = True
+                    self.threshold_event_count += 1
+                    self.metrics.count('threshold_events')
+                    self.metrics.count('threshold_checks', checks)
+                    checks = 0 
 
                     self.add_new_threshold_event()
                     
@@ -456,17 +513,23 @@ class interactableABC(metaclass = ABCMeta):
                                 # print(f'(InteractableABC, watch_for_threshold_event) calling onThreshold_callback_fn for {self.name}: ', "parents:[", *(p.name+' ' for p in self.parents) , "]  callbackfn: ", callbackfn)
                                 parent_names = {*(p.name+' ' for p in self.parents)}
                                 # control_log(f' (InteractableABC, watch_for_threshold_event) calling onThreshold_callback_fn for {self.name}: parents:[ {parent_names}  ]  callbackfn: , {callbackfn} ')
-                                callbackfn = eval(callbackfn)
+                                with self.metrics.timer('callback'): 
+                                    callbackfn = eval(callbackfn)
 
                     self.event_manager.print_to_terminal(f"(InteractableABC.py, watch_for_threshold_event) Threshold Event for {self.name}. Event queue: {list(self.threshold_event_queue.queue)}")
                     # control_log(f"(InteractableABC.py, watch_for_threshold_event) Threshold Event for {self.name}. Event queue: {list(self.threshold_event_queue.queue)}")
+                    CLOCK.changed() # threads that are polling for this event get another check before the clock moves on
                 else: 
-                    # not active, don't record the threshold event 
+                    # not active ( or not a new transition ), don't record the threshold event 
                     pass 
             else: 
                 # no threshold event, ensure that threshold is False 
                 self.threshold = False 
 
+            CLOCK.idle()
+
+        self.metrics.count('threshold_checks', checks)
+
 class template(interactableABC): 
     def __init__(self, ID, threshold_condition, hardware_specs, name, event_manager, type):
         # Initialize the parent class
@@ -482,6 +545,9 @@ class template(interactableABC):
         setattr(self, self.threshold_condition['attribute'], self.threshold_condition['initial_value']) 
 
 class lever(interactableABC):
+
+    transition_events = True # one threshold event each time the press count reaches its goal 
+
     def __init__(self, ID, threshold_condition, hardware_specs, name, event_manager, type):
         # Initialize the parent class
         super().__init__(ID, threshold_condition, name, event_manager, type)
@@ -504,6 +570,15 @@ class lever(interactableABC):
     def __str__(self): 
         return f'{self.name}(isExtended:{self.isExtended})'
 
+    @property 
+    def isExtended(self): 
+        return self._isExtended 
+
+    @isExtended.setter 
+    def isExtended(self, extended): 
+        self._isExtended = extended 
+        self.state_changed() 
+
     @property 
     def isPressed(self): 
         '''[summary] True if the button object is in a pressed state, false otherwise'''
@@ -520,6 +595,7 @@ class lever(interactableABC):
 
     def set_press_count(self, count): 
         ''' [summary] sets self.buttonObj.num_pressed to specified value '''
+        self.mark_state_change() 
         self.buttonObj.num_pressed = count 
         
     def activate(self, initial_activation = True ): 
@@ -559,8 +635,8 @@ class lever(interactableABC):
         # add threshold event to queue 
         self.threshold_event_queue.put(event)
 
-        # add timestamp 
-        self.event_manager.new_timestamp(event, time=time.time())
+        # add timestamp ( of when the press count reached its goal ) 
+        self.event_manager.new_timestamp(event, time=self.transition_time)
 
     #@threader
     def extend(self):
@@ -598,7 +674,7 @@ class lever(interactableABC):
             
             self.isExtended = True 
 
-        return self.event_manager.new_timestamp(f'{self}_Extend', time.time())
+        return self.event_manager.new_timestamp(f'{self}_Extend', CLOCK.time())
                 
     #@threader
     def retract(self):
@@ -607,14 +683,14 @@ class lever(interactableABC):
 
         if not self.isExtended: 
             self.event_manager.print_to_terminal(f'(InteractableABC, Lever.retract) {self.name} already retracted.')
-            self.event_manager.new_timestamp(f'{self}_Already_Retracted', time.time())
+            self.event_manager.new_timestamp(f'{self}_Already_Retracted', CLOCK.time())
             self.deactivate()
             return 
 
         #  This Function Accesses Hardware => Perform Sim Check First
         if self.isSimulation: 
             self.isExtended = False 
-            self.event_manager.new_timestamp(f'{self}_Retract', time.time())
+            self.event_manager.new_timestamp(f'{self}_Retract', CLOCK.time())
             self.deactivate()
             return 
         
@@ -637,6 +713,8 @@ class lever(interactableABC):
 class door(interactableABC):
     """[Description] This class is the unique door type class for interactable objects to be added to the Map configuration."""
 
+    transition_events = True # one threshold event each time the door reaches its goal state ( e.g. closed -> open ) 
+
     def __init__(self, ID, threshold_condition, hardware_specs, name, event_manager, type):
         
         super().__init__(ID, threshold_condition, name, event_manager, type) # init the parent class 
@@ -653,6 +731,15 @@ class door(interactableABC):
         # Door Controls: Requires Continuous Servo and Button (aka switch) # 
         self.servoObj = self.ContServo(hardware_specs['servo_specs'], parentObj = self) # continuous servo to control speed of opening and closing door
         self.buttonObj = self.Button(hardware_specs['button_specs'], parentObj = self) 
+
+        # Motion State Machine # 
+        self.scheduler = Scheduler.shared() # runs the timers that end each door movement 
+        self.motion_lock = threading.Lock() 
+        self.state = 'open' if self.isOpen else 'closed' # one of door.STATES 
+        self.motion = None # Future for the movement that is in progress, or None if the door is not moving 
+        self.motion_timer = None # Timer that ends the movement that is in progress 
+        self.motion_start = None # CLOCK.time() that the movement in progress began 
+        self.switch_poll_interval = 0.005 # while the door is inactive its switch edges aren't being listened for, so closing falls back on checking the switch this often 
         
         ## Dependency Chain Information ## 
         self.barrier = True # set to True if the interactable acts like a barrier to a vole, meaning we require a vole interaction of somesort everytime a vole passes by this interactable. 
@@ -660,26 +747,44 @@ class door(interactableABC):
 
         # (NOTE) do not call self.activate() from here, as the "check_for_threshold_fn", if present, gets dynamically added, and we need to ensure that this happens before we call watch_for_threshold_event()  
     
+    STATES = ('opening', 'open', 'closing', 'closed', 'fault') 
+
     def __str__(self):
         return self.name+f'(Open:{self.isOpen})'
 
+    @property 
+    def state(self): 
+        ''' one of door.STATES ''' 
+        return self._state 
+
+    @state.setter 
+    def state(self, state): 
+        self._state = state 
+        self.state_changed() 
+
     @property
     def isOpen(self): 
         '''[summary] accesses Button object to check if the state switch is in a pressed state 
             Returns: (Boolean) : True if door is open, False otherwise. '''
-        return self.buttonObj.isPressed 
+        if self.buttonObj.isSimulation: 
+            return self.buttonObj.isPressed 
+        return self.buttonObj.isPressedProperty # read the switch itself, as the value stored in isPressed is only the switch state from when the door was created 
     
     def sim_open(self): 
         '''[summary] simulates a door opening by changing attributes and starting countdown to designate when door starts and ends the opening process'''
         if self.isSimulation: 
+            self.mark_state_change() 
             self.buttonObj.isPressed = True 
+            self.state = 'open' 
             self.event_manager.new_countdown(f'sim_{self.name}_open', self.open_timeout)
     
     def sim_close(self): 
         '''[summary] simulates a door closing by changing attributes and starting countdown to designate when door starts and ends the closing process '''
         if self.isSimulation: 
             self.event_manager.new_countdown(f'sim_{self.name}_close', self.close_timeout)
+            self.mark_state_change() 
             self.buttonObj.isPressed = False 
+            self.state = 'closed' 
 
     def override(self, open_or_close): 
         ''' 
@@ -687,7 +792,9 @@ class door(interactableABC):
         Args: 
             open_or_close (String) : string that designates which override button was pressed (i.e. the button to open the door or close the door)
         '''
-        # immediately stop door movement 
+        # immediately stop door movement, and end any movement in progress so that open() and close() start a new one rather than returning it 
+        with self.motion_lock: 
+            self._end_motion('open' if self.isOpen else 'closed', False)
         self.stop() 
         # reset door to stop execution of current door actions
         self.deactivate()
@@ -715,119 +822,179 @@ class door(interactableABC):
                 raise Exception(f'(Door, validate_hardware_setup) {self.name} failed to setup {errorMsg} correctly. If you would like to be simulating any hardware components, please run the Simulation package instead, and ensure that simulation.json has {self} simulate set to True.')
             return """
 
-    def run_in_thread(func): 
-        ''' decorator function to run function on its own daemon thread '''
-        def run(*k, **kw): 
-            t = threading.Thread(target = func, args = k, kwargs=kw, daemon=True)
-            t.name = func.__name__
-            t.start() 
-            return t
-        return run 
-
     def add_new_threshold_event(self): 
-        """[summary] adds to the threshold_event_queue, then sleeps until the door's state changes to prevent an overload of threshold events while the door sits in this state. 
-                will also break out of sleep if the event_queue is emptied (meaning a mode script 'used' the the threshold event in its logic, so we should check again to see what the door state is) """
+        """[summary] adds to the threshold_event_queue. Doors use transition events, so this only gets called once each time the door reaches its goal state, and the event is timestamped with when the state changed. """
 
         # appends to the threshold event queue 
-        state = self.isOpen
         if self.isOpen: event = f'{self.name}_Open'
         else: event = f'{self.name}_Close'
 
         self.threshold_event_queue.put(event)
-        self.event_manager.new_timestamp(event, time=time.time())
+        self.event_manager.new_timestamp(event, time=self.transition_time)
 
         # Uncomment to print detailed door threshold messages: 
         # self.event_manager.print_to_terminal(f"{self.name} Threshold:  {self.threshold} Threshold Condition: {self.threshold_condition}")
         # self.event_manager.print_to_terminal(f'(Door(InteractableABC.py, add_new_threshold_event) {self.name} event queue: {list(self.threshold_event_queue.queue)}')
-
-        # To avoid overloading a door with threshold events, we can sleep here until a state change occurs 
-        while self.isOpen == state and self.active: 
-            if len(self.threshold_event_queue.queue) == 0: # isEmpty!
-                # control side "used" the added threshold event, so even if there hasn't been a state change, break out of while loop so we can add another threshold event 
-                return  
-            time.sleep(.5)
         return 
-               
-    #@threader
+
+    def activate(self): 
+        ''' [summary] activates as usual, and once it is active the door's switch gets listened to on both edges so that a closing door gets stopped as soon as the switch changes '''
+        interactableABC.activate(self)
+        if not self.buttonObj.isSimulation: 
+            self.buttonObj.listen_for_event(edge = GPIO.BOTH, callback = self.switch_edge, bouncetime = 10)
+
+    def deactivate(self): 
+        ''' [summary] deactivates as usual, except that a door which is still closing keeps closing. Its switch edges stop being listened for once it is inactive, so the switch gets checked on a schedule instead ( see _check_closed ) '''
+        with self.motion_lock: 
+            closing = self.motion if self.state == 'closing' else None 
+        if closing is None: 
+            interactableABC.deactivate(self)
+            return 
+        # same as interactableABC.deactivate, but without stopping the servo 
+        self.threshold = False 
+        self.active = False 
+        self.event_manager.print_to_terminal(f"(InteractableABC.py, deactivate) {self.name} has been deactivated while closing. Final contents of the threshold_event_queue are: {list(self.threshold_event_queue.queue)}")
+        self._check_closed(closing)
+
+    # 
+    # Motion State Machine 
+    # 
+    def _begin_motion(self, state, speed, timeout, on_timeout): 
+        ''' (caller holds self.motion_lock) interrupts any movement already in progress, sets the servo to <speed>, and schedules <on_timeout> to end the new movement after <timeout> seconds '''
+        self._end_motion(self.state, False) # a new movement interrupts the old one 
+        future = concurrent.futures.Future() 
+        self.state = state 
+        self.motion = future 
+        self.motion_start = CLOCK.time() 
+        self.servoObj.servo.throttle = speed 
+        self.motion_timer = self.scheduler.call_later(timeout, on_timeout, future)
+        return future 
+
+    def _end_motion(self, state, result): 
+        ''' (caller holds self.motion_lock) stops the servo, moves to <state>, and resolves the movement that was in progress with <result> '''
+        (future, self.motion) = (self.motion, None)
+        if self.motion_timer is not None: 
+            self.motion_timer.cancel() 
+            self.motion_timer = None 
+        if future is None: 
+            return 
+        self.stop() 
+        moving = self.state 
+        self.state = state 
+        self.metrics.record('door_open' if moving == 'opening' else 'door_close', CLOCK.time() - self.motion_start)
+        if state == 'fault': self.metrics.count('faults')
+        future.set_result(result)
+
+    def _open_timeout(self, future): 
+        ''' [summary] scheduler callback for once a door has had <open_time> to open. We have no switch to tell us when the door is fully open, so we have to assume that this always takes the same amount of time, and then check the switch. '''
+        with self.motion_lock: 
+            if self.motion is not future: 
+                return # movement was already interrupted 
+            if self.isOpen: 
+                self._end_motion('open', True)
+                return 
+            self._end_motion('fault', False)
+        # control_log(f'(Door(InteractableABC), open() ) There was a problem opening {self.name}')
+        self.event_manager.print_to_terminal(f'(Door(InteractableABC), open() ) There was a problem opening {self.name}')
+
+    def _close_timeout(self, future): 
+        ''' [summary] scheduler callback for once a closing door has reached its <close_timeout> without the switch showing it as closed '''
+        with self.motion_lock: 
+            if self.motion is not future: 
+                return # door already closed, or movement was interrupted 
+            self._end_motion('fault', False)
+        t = CLOCK.time()
+        self.event_manager.new_timestamp(f'{self}_close_Failure', time=t, duration = t - self.motion_start)
+        # control_log(f'(Door(InteractableABC), close() ) There was a problem closing {self.name}')
+        self.event_manager.print_to_terminal(f'(Door(InteractableABC), close() ) There was a problem closing {self.name}')
+
+    def _check_closed(self, future): 
+        ''' [summary] while a closing door is inactive, its switch edges aren't being listened for, so this gets scheduled to check the switch instead '''
+        if self.motion is not future: 
+            return 
+        if self.isOpen: 
+            self.scheduler.call_later(self.switch_poll_interval, self._check_closed, future)
+        else: 
+            self.switch_edge(self.buttonObj.pin_num)
+
+    def switch_edge(self, pin): 
+        ''' [summary] GPIO callback for both edges of the door's switch. Finishes a closing door as soon as its switch shows it as closed, and otherwise keeps the door's state in line with the switch. '''
+        t = CLOCK.time() 
+        self.mark_state_change(t) 
+        self.state_changed() # the switch is what isOpen reads 
+        is_open = self.isOpen 
+        with self.motion_lock: 
+            if self.state == 'closing': 
+                if is_open: 
+                    return 
+                start = self.motion_start 
+                self._end_motion('closed', True)
+            else: 
+                if self.state != 'opening': 
+                    self.state = 'open' if is_open else 'closed' # door was moved by hand, or recovered from a fault 
+                return 
+        self.event_manager.new_timestamp(f'{self}_close_Finish', time=t, duration = t - start)
+
     def close(self):
-        """[summary] this function closes the doors fully"""
+        """
+        [summary] begins closing the door, and returns without waiting for the door to finish moving. The door's servo gets stopped as soon as its switch shows it as closed, or once <close_timeout> has passed. 
+        Returns: 
+            (Future) : resolves to True once the door has closed, or to False if it failed to close ( or was told to open again before it finished closing ). Call .result() on it to block until the door is done moving. 
+        """
 
         # check if the door is already closed 
-        if self.isOpen is False: 
+        if self.isOpen is False and self.state != 'opening': 
             # door is already closed 
             # control_log('(Door(InteractableABC)) {self.name} was already Closed')
             self.event_manager.print_to_terminal(f'(Door(InteractableABC)) {self.name} was already Closed')
-            return 
+            return completed_future(True) 
 
         #  This Function Accesses Hardware => Perform Sim Check First
         if self.isSimulation: 
             # self.event_manager.print_to_terminal(f'(Door(InteractableABC), close()) {self.name} is being simulated. setting state to Closed and returning.')
             self.sim_close() 
-            return 
+            return completed_future(True) 
 
         # 
         # Direct Rpi to Close Door
         # 
-        ts_start = self.event_manager.new_timestamp(f'{self}_close_Start', time = time.time())
-        self.servoObj.servo.throttle = self.close_speed 
-
-        start = time.time() 
-        while time.time() < ( start + self.close_timeout ): 
-            # wait for door to close or bail if we timeout 
-            if self.isOpen is False: 
-                # door successfully closed 
-                self.stop() # stop door movement 
-                t = time.time()
-                self.event_manager.new_timestamp(f'{self}_close_Finish', time=t, duration = t - ts_start.time)
-                return 
-            else:
-                time.sleep(0.005)
-        
-        # Close Unsuccessful 
-        self.stop() # stop door movement 
-        t = time.time()
-        self.event_manager.new_timestamp(f'{self}_close_Failure', time=t, duration = t - ts_start.time)
-        # control_log(f'(Door(InteractableABC), close() ) There was a problem closing {self.name}')
-        self.event_manager.print_to_terminal(f'(Door(InteractableABC), close() ) There was a problem closing {self.name}')
-        return 
-        # raise Exception(f'(Door(InteractableABC), close() ) There was a problem closing {self.name}')
+        with self.motion_lock: 
+            if self.state == 'closing': 
+                return self.motion # already closing 
+            future = self._begin_motion('closing', self.close_speed, self.close_timeout, self._close_timeout)
+        self.event_manager.new_timestamp(f'{self}_close_Start', time = self.motion_start)
+        if not self.isOpen or not self.active: 
+            # switch may have changed before we started listening for it 
+            self._check_closed(future)
+        return future 
 
-    #@threader
     def open(self):
-        """[summary] this function opens the doors fully"""
+        """
+        [summary] begins opening the door, and returns without waiting for the door to finish moving. The door's servo gets stopped once <open_time> has passed. 
+        Returns: 
+            (Future) : resolves to True once the door has opened, or to False if it failed to open ( or was told to close again before it finished opening ). Call .result() on it to block until the door is done moving. 
+        """
         
         #  This Function Accesses Hardware => Perform Sim Check First
         if self.isSimulation: 
             # If door is being simulated, then rather than actually opening a door we can just set the state to True (representing an Open state)
             # self.event_manager.print_to_terminal(f'(Door(InteractableABC), open()) {self.name} is being simulated. Setting switch val to Open (True) and returning.')
             self.sim_open()
-            return 
+            return completed_future(True) 
         
         # check if door is already open
-        if self.isOpen is True: 
+        if self.isOpen is True and self.state != 'closing': 
             # control_log('(Door(InteractableABC)) {self.name} was already Open')
             self.event_manager.print_to_terminal(f'(Door(InteractableABC)) {self.name} was already Open')
-            return 
+            return completed_future(True) 
   
         # 
         # Direct RPI to Open Door 
         #
-        self.servoObj.servo.throttle = self.open_speed 
-
-        start = time.time() 
-        while time.time() < ( start + self.open_timeout ): 
-            #wait for the door to open -- we just have to assume this will take the exact same time of <open_time> each time, since we don't have a switch to monitor for if it opens all the way or not. 
-            time.sleep(0.005) 
-        
-        self.stop() # stop door movemnt 
-
-        # check if successful by checking the switch (button) val 
-        if self.isOpen: 
-            # successful 
-            return 
-        else:
-            # control_log(f'(Door(InteractableABC), open() ) There was a problem opening {self.name}')
-            self.event_manager.print_to_terminal(f'(Door(InteractableABC), open() ) There was a problem opening {self.name}')
+        with self.motion_lock: 
+            if self.state == 'opening': 
+                return self.motion # already opening 
+            return self._begin_motion('opening', self.open_speed, self.open_timeout, self._open_timeout)
             
     def stop(self): 
         ''' [summary] HARDWARE STOP: sets servo speed to stop speed '''
@@ -870,7 +1037,7 @@ class rfid(interactableABC):
 
     def sim_ping(self, vole): 
         ''' [summary] simulates an RFID ping by adding to the shared rfidQ. Only called for a simulated rfid!!'''
-        [self.shared_rfidQ.put((vole, self.ID, (time.time() + ( i - random.random() )))) for i in range (1,3)]
+        [self.shared_rfidQ.put((vole, self.ID, (CLOCK.time() + ( i - self.random.random() )))) for i in range (1,3)]
 
     class Ping: 
         ''' [Description] class for packaging rfid pings into pairs in order to represent the time that a vole first scanned an the rfid reader, 
@@ -986,26 +1153,24 @@ class dispenser(interactableABC):
         self.stop_speed = hardware_specs['servo_specs']['stop_speed']
         self.dispense_speed = hardware_specs['servo_specs']['dispense_speed']
         self.dispense_time = hardware_specs['dispense_time']
+
+        ## Trough Sensor ## 
+        # the sensor's edges are debounced; a pellet only counts as present (or retrieved) once the sensor has held that state for its confirm window 
+        if self.buttonObj.isSimulation: initial = self.buttonObj.isPressed 
+        else: initial = self.buttonObj.isPressedProperty 
+        self.trough = EdgeDebouncer(initial, confirm_true = hardware_specs.get('confirm_dispense_window', 0.015), confirm_false = hardware_specs.get('confirm_retrieval_window', 0.015), on_change = self.trough_changed)
+        self.sim_sensor = None # SimTroughSensor that stands in for the trough's GPIO pin, if one has been attached ( see Simulation/Classes/TroughSensor.py )
+        self.pellet_present_time = None # CLOCK.time() that the pellet currently in the trough was first detected 
+        self.pellet_retrieved_time = None # CLOCK.time() that the most recent retrieval was first detected 
             
         ## Use the Threshold Attribute to set if we should immediately monitor_for_retrieval ## 
-        if self.buttonObj.isPressed: # pellet is already present
-            initial = True 
-        else: initial = False 
-        self.monitor_for_retrieval = initial # gets set to True only once we first confirm that a pellet is present in the trough. When we set this True, then we will start recording threshold events ( i.e. waiting for the pellet state to get set back to false, due to a vole retrieval ) If trough is initially empty, this prevents watch_for_threshold_event from recording this empty state as the occurrence of a pellet retrieval.
+        self.retrieval_cond = threading.Condition() # notified whenever monitor_for_retrieval changes, or the dispenser gets deactivated 
+        self._monitor_for_retrieval = initial # gets set to True only once we first confirm that a pellet is present in the trough. When we set this True, then we will start recording threshold events ( i.e. waiting for the pellet state to get set back to false, due to a vole retrieval ) If trough is initially empty, this prevents watch_for_threshold_event from recording this empty state as the occurrence of a pellet retrieval.
 
         ## Dependency Chain ## 
         self.barrier = False # does not block a voles movement 
         self.autonomous = False # is dependent on a lever press in order to trigger a dispense
 
-    def run_in_thread(func): 
-        ''' decorator function to run function on its own daemon thread '''
-        def run(*k, **kw): 
-            t = threading.Thread(target = func, args = k, kwargs=kw, daemon=True)
-            t.name = func.__name__
-            t.start() 
-            return t
-        return run    
-
     """def validate_hardware_setup(self): 
         '''[summary] ensures that dispener's Button and Servo object were successfully setup if the dispenser is not being simulated '''
         if self.isSimulation: 
@@ -1023,11 +1188,50 @@ class dispenser(interactableABC):
                 raise Exception(f'(Dispenser, validate_hardware_setup) {self} failed to setup {errorMsg} correctly. If you would like to be simulating any hardware components, please run the Simulation package instead, and ensure that simulation.json has {self} simulate set to True.')
             return """
 
+    @property 
+    def monitor_for_retrieval(self): 
+        return self._monitor_for_retrieval 
+
+    @monitor_for_retrieval.setter 
+    def monitor_for_retrieval(self, monitor): 
+        with self.retrieval_cond: 
+            self._monitor_for_retrieval = monitor 
+            self.retrieval_cond.notify_all() 
+
+    def activate(self): 
+        ''' [summary] activates as usual, and once it is active the trough sensor's edges get fed to the debouncer '''
+        interactableABC.activate(self)
+        if not self.buttonObj.isSimulation: 
+            self.trough.reset(self.buttonObj.isPressedProperty) # edges that happened while inactive were missed, so start from a fresh read of the pin 
+            self.buttonObj.listen_for_event(edge = GPIO.BOTH, callback = self.trough_edge, bouncetime = 1) # debouncing is handled by self.trough rather than the GPIO bouncetime 
+
+    def deactivate(self): 
+        ''' [summary] deactivates as usual, and wakes the threshold watcher if it is waiting for a dispense '''
+        interactableABC.deactivate(self)
+        with self.retrieval_cond: 
+            self.retrieval_cond.notify_all() 
+
     @property 
     def isPressed(self): 
-        ''' [summary] accesses the gpio pin stored in the button object to check the pressed or unpressed state 
+        ''' [summary] returns the debounced state of the trough sensor ( or the simulated button value, if the button is simulated and there is no simulated trough sensor ) 
         Returns: (Boolean) : True represents a pressed state, meaning there is at least one Pellet present in the dispenser's trough '''
-        return self.buttonObj.isPressed 
+        if self.buttonObj.isSimulation and self.sim_sensor is None: 
+            return self.buttonObj.isPressed 
+        return self.trough.state 
+
+    def trough_edge(self, pin): 
+        ''' [summary] GPIO callback for both edges of the trough sensor. Timestamps the edge and passes it to the debouncer '''
+        t = CLOCK.time() 
+        self.trough.feed(GPIO.input(pin) == self.buttonObj.pressed_val, t)
+
+    def trough_changed(self, present, t): 
+        ''' [summary] called by the debouncer once the trough sensor has held a new state for its confirm window 
+        Args: 
+            present (Boolean) : True if a pellet is now in the trough, False if the trough is now empty 
+            t (float) : CLOCK.time() of the edge that the change began with 
+        '''
+        if present: self.pellet_present_time = t 
+        else: self.pellet_retrieved_time = t 
     
     @property
     def isPelletRetrieved(self): 
@@ -1053,11 +1257,14 @@ class dispenser(interactableABC):
         return 
     
     def sim_vole_retrieval(self): 
-        ''' [summary] Simulation Use Only: simulates a pellet being retrieved from the trough by calling sim_unpress '''
+        ''' [summary] Simulation Use Only: simulates a pellet being retrieved from the trough by calling sim_unpress ( or by taking the pellet from the simulated trough sensor, if there is one ) '''
         if self.isPelletRetrieved: 
             return # No Pellet in trough to retrieve!
         self.event_manager.print_to_terminal('(InteractableABC, dispenser.sim_vole_retrieval) Pellet Retrieved!')
         # control_log(f'(InteractableABC, dispenser.sim_vole_retrieval) Pellet Retrieved! Stopped monitoring for a pellet retrieval.')
+        if self.sim_sensor is not None: 
+            self.sim_sensor.pellet_taken() 
+            return 
         self.sim_unpress() # simulates a retrieval by setting button object to an unpressed state 
         return 
 
@@ -1069,20 +1276,28 @@ class dispenser(interactableABC):
         """
         if self.monitor_for_retrieval: 
             self.threshold_event_queue.put(f'Pellet Retrieval')
-            self.event_manager.new_timestamp(f'{self.name}_pellet_retrieved', time = time.time())
+            # retrieval latency: time from when the pellet was first detected in the trough to when it was first detected as gone 
+            (present, retrieved) = (self.pellet_present_time, self.pellet_retrieved_time)
+            if present is not None and retrieved is not None and retrieved >= present: 
+                self.event_manager.new_timestamp(f'{self.name}_pellet_retrieved', time = retrieved, duration = retrieved - present)
+            else: 
+                self.event_manager.new_timestamp(f'{self.name}_pellet_retrieved', time = CLOCK.time())
+            self.pellet_present_time = None 
             self.monitor_for_retrieval = False # reset since we recorded a single pellet retrieval.
         else: 
             pass 
             # control_log(f'(InteratableABC.py, {self}, add_new_threshold_event) not monitoring for retrieval at the moment')
             # self.event_manager.print_to_terminal(f'(InteratableABC.py, {self}, add_new_threshold_event) not monitoring for retrieval at the moment')
 
-        # To avoid overloading a food trough sensor with threshold events for when the food trough is empty, we can sleep here until a state change occurs 
-        while not self.monitor_for_retrieval and self.active: 
-            ''' wait for monitor for retrieval to get set to True! '''
-            time.sleep(.5)
+        # To avoid overloading a food trough sensor with threshold events for when the food trough is empty, we wait here until a pellet gets dispensed 
+        CLOCK.wait_for(self.retrieval_cond, lambda: self.monitor_for_retrieval or not self.active)
         
     def start(self): 
         '''[summary] turns the dispener's servo on in order to dispense a pellet '''
+        if self.sim_sensor is not None: 
+            self.sim_sensor.servo_started() # simulated trough sensor drops a pellet into the trough 
+        if self.isSimulation: 
+            return 
         self.servoObj.servo.throttle = self.dispense_speed 
 
     def stop(self): 
@@ -1091,7 +1306,7 @@ class dispenser(interactableABC):
             return 
         self.servoObj.servo.throttle = self.stop_speed
     
-    @run_in_thread
+    @threaded('interactable', 'dispense')
     def dispense(self): 
         ''' [summary] goes thru series of error checks and then procedes with dispensing a pellet. Runs on its own thread. '''
         # Edge Case: if there is already a pellet in the trough, we don't want to dispense again ( this likely means vole did not take pellet on a previous dispense )
@@ -1103,32 +1318,29 @@ class dispenser(interactableABC):
             return 
 
         # Simulation Check
-        if self.isSimulation: 
+        if self.isSimulation and self.sim_sensor is None: 
             self.sim_dispense()
             self.monitor_for_retrieval = True 
             return 
         
         # Dispense a Pellet using Servos 
+        start = CLOCK.time() 
         self.start() # starts servo moving at dispense speed 
 
-        # wait for the dispense timeout period. Check to see if pellet dispense was successful during this time. 
-        dispenses_read = 0 
-        start = time.time() 
-        while time.time() < ( start + self.dispense_time ): 
-            # Accuracy Check: check that we read isPressed as True at least twice in a row before confirming that there was a pellet dispensed. 
-            if self.isPressed: 
-                dispenses_read += 1 
-            if dispenses_read > 2: 
-                # Pellet was dispensed! 
-                self.stop() 
-                self.monitor_for_retrieval = True 
-                self.event_manager.print_to_terminal(f'(InteractableABC, Dispenser) {self}: Pellet Dispensed!')
-                # control_log(f'(InteractableABC, Dispenser) {self}: Pellet Dispensed!')
-                return  
-            time.sleep(0.005) 
+        # wait for the dispense timeout period, or until the trough sensor confirms that a pellet is present. The debouncer's confirm window replaces reading the pin several times in a row. 
+        dispensed = self.trough.wait_for(True, timeout = self.dispense_time)
+        self.stop() 
+
+        if dispensed: 
+            # Pellet was dispensed! 
+            self.monitor_for_retrieval = True 
+            present = self.pellet_present_time if self.pellet_present_time is not None else CLOCK.time() 
+            self.event_manager.new_timestamp(f'{self.name}_pellet_dispensed', time = present, duration = present - start)
+            self.event_manager.print_to_terminal(f'(InteractableABC, Dispenser) {self}: Pellet Dispensed!')
+            # control_log(f'(InteractableABC, Dispenser) {self}: Pellet Dispensed!')
+            return  
         
         # On Failure: Stop dispenser and notify user.
-        self.stop()
         self.event_manager.print_to_terminal(f'(InteractableABC, Dispenser) {self}: A problem was encountered -- Pellet Dispensing Unsuccessful')
         # control_log(f'(InteractableABC, Dispenser) {self}: A problem was encountered -- Pellet Dispensing Unsuccessful')
         return 
@@ -1140,6 +1352,8 @@ class buttonInteractable(interactableABC):
         this is pretty much just a Button object itself, except it must derive from interactableABC in order to have threshold checks that will trigger a threshold callback event ( to override a door movement )
     '''
 
+    transition_events = True # one threshold event each time the press count reaches its goal. The onThreshold_callback_fn resets the count, so every press is a new transition 
+
     def __init__(self, ID, threshold_condition, hardware_specs, name, event_manager, type ): 
          # Initialize the parent class
         super().__init__(ID, threshold_condition, name, event_manager, type)
@@ -1150,6 +1364,20 @@ class buttonInteractable(interactableABC):
         self.barrier = False 
         self.autonomous = False 
 
+    @property
+    def num_pressed(self): 
+        '''[summary] returns the current number of presses that button object has detected'''
+        return self.buttonObj.num_pressed
+
+    def reset_press_count(self): 
+        ''' [summary] sets self.buttonObj.num_pressed to start from the initial value '''
+        self.buttonObj.num_pressed = self.threshold_condition['initial_value'] 
+
+    def set_press_count(self, count): 
+        ''' [summary] sets self.buttonObj.num_pressed to specified value ( e.g. to simulate a press ) '''
+        self.mark_state_change() 
+        self.buttonObj.num_pressed = count 
+
     def activate(self): 
         ''' [summary] activate button as usual, and once it is active we can begin the button object listening '''
         interactableABC.activate(self)
@@ -1175,15 +1403,13 @@ class buttonInteractable(interactableABC):
             return """ 
     
     def add_new_threshold_event(self):
-        '''[summary] New <button press> was added to the buttonQ. Retrieve its value and append to the threshold event queue '''
-        try: 
-            press = self.buttonObj.buttonQ.get() 
-        except queue.Empty as e: 
-            raise Exception(f'(InteractableABC.py, add_new_threshold_event) Nothing in the buttonQ for {self.name}')
+        '''[summary] adds the press to the threshold event queue. Buttons use transition events, so this only gets called once each time the press count reaches its goal, and the event is timestamped with when the button was pressed '''
+
+        event = f'{self.name}_pressed'
 
         # append to event queue 
-        self.threshold_event_queue.put(press)
-        self.event_manager.new_timestamp(f'{self.name}_pressed', time = time.time())
+        self.threshold_event_queue.put(event)
+        self.event_manager.new_timestamp(event, time = self.transition_time)
 
 class beam(interactableABC): 
 
@@ -1195,10 +1421,11 @@ class beam(interactableABC):
 
         ## Threshold Condition Tracking ## 
         if self.buttonObj.pressed_val < 0: 
-            self.isBroken = threshold_condition['initial_value'] # if simulating gpio connection, then we want to leave isPressed as an attribute value that we can manually set
-        else: # if not simulating gpio connection, then isPressed should be a function call that checks the GPIO input/output value each call
-            self.isBroken = self.buttonObj.isPressed # True if button is in a pressed state --> represents beam being broken 
-        self.break_history = [] # exhaustive list of all the timestamps of the beam breaks that have occurred for this beam 
+            self._isBroken = threshold_condition['initial_value'] # if simulating gpio connection, then the beam state only changes when a simulation sets isBroken
+        else: # if not simulating gpio connection, then start from the pin's current state and let the GPIO edges update it from here on
+            self._isBroken = self.buttonObj.isPressedProperty # True if button is in a pressed state --> represents beam being broken 
+        self.break_start = None # (CLOCK.time(), CLOCK.monotonic()) of the edge that started the current break, or None while the beam is unbroken
+        self.break_history = array('d') # duration (in seconds) of every completed beam break, in the order they occurred 
         
         self.barrier = False # if beam doesnt reach threshold, it wont prevent a voles movement
         self.autonomous = True # operates independent of direct interaction with a vole or other interactales. This will ensure that vole interacts with beams on every pass. 
@@ -1214,6 +1441,60 @@ class beam(interactableABC):
         ''' [summary] used as a callback function set by the beam config file '''
         self.buttonObj.num_pressed = self.threshold_condition['initial_value']
 
+    # # Beam State # # 
+    @property 
+    def isBroken(self): 
+        return self._isBroken 
+
+    @isBroken.setter 
+    def isBroken(self, broken): 
+        self.edge(broken)
+
+    @property 
+    def last_break_duration(self): 
+        ''' [summary] returns the duration (in seconds) of the most recent completed beam break, or None if the beam has not been broken yet '''
+        return self.break_history[-1] if len(self.break_history) > 0 else None
+
+    def edge(self, broken, t = None, mono = None): 
+        '''
+        [summary] records a change in the beam's state. Called from the GPIO callback on both the FALLING and RISING edges, or by setting isBroken from a simulation. 
+        The break is timed from the edge that started it to the edge that ended it, so the recorded duration doesn't depend on how quickly the control side gets around to checking the beam. 
+        Args: 
+            broken (Boolean) : True if the beam was just broken, False if it was just unbroken 
+            t (float, optional) : CLOCK.time() of the edge. Defaults to now. 
+            mono (float, optional) : CLOCK.monotonic() of the edge. Defaults to now. 
+        '''
+        if t is None: t = CLOCK.time() 
+        if mono is None: mono = CLOCK.monotonic() 
+        broken = bool(broken)
+        if broken == self._isBroken: 
+            return # no state change ( e.g. a repeated edge that got through the bouncetime )
+        self._isBroken = broken 
+
+        if broken: 
+            self.mark_state_change(t) 
+            self.break_start = (t, mono)
+            if self.active: 
+                self.event_manager.new_timestamp(f'{self.name}_beam_break', time = t)
+        else: 
+            if self.break_start is None: 
+                return # beam was already broken when it got set up, so there is no break to time 
+            duration = mono - self.break_start[1]
+            self.break_start = None 
+            self.break_history.append(duration)
+            if self.active: 
+                self.event_manager.new_timestamp(f'{self.name}_beam_unbroken', time = t, duration = duration)
+
+    def gpio_edge(self, pin): 
+        ''' [summary] GPIO callback for both edges of the beam's pin. Captures the edge time before anything else, then reads the pin to tell a break (FALLING) apart from an unbreak (RISING) '''
+        t = CLOCK.time() 
+        mono = CLOCK.monotonic() 
+        broken = GPIO.input(pin) == self.buttonObj.pressed_val 
+        if broken and not self._isBroken: 
+            self.buttonObj.num_pressed += 1 
+            self.buttonObj.buttonQ.put(f'press#{self.buttonObj.num_pressed}')
+        self.edge(broken, t, mono)
+
     """def validate_hardware_setup(self):
         ''' [summary] ensures that the beam's Button object has been set up properly if the beam is not being simulated '''
         if self.isSimulation: 
@@ -1231,7 +1512,10 @@ class beam(interactableABC):
     def activate(self): 
         ''' [summary] activates as usual, and once it is active we can begin the button object listening '''
         interactableABC.activate(self)
-        self.buttonObj.listen_for_event()
+        if self.buttonObj.isSimulation: 
+            self.buttonObj.listen_for_event()
+        else: 
+            self.buttonObj.listen_for_event(edge = GPIO.BOTH, callback = self.gpio_edge, bouncetime = 10) # short bouncetime so that quick breaks still get both of their edges
     
     def add_new_threshold_event(self):
 
@@ -1240,15 +1524,7 @@ class beam(interactableABC):
         # append to event queue 
         self.threshold_event_queue.put(f'{self.name} beam broken {self.num_breaks} times')
 
-        # Timestamp Break
-        ts = self.event_manager.new_timestamp(f'{self.name}_beam_break', time = time.time())
-
-        # Wait for Beam to Unbreak and Timestamp
-        while self.isBroken: 
-            ''' wait for beam to be unbroken '''
-        t = time.time()
-        if ts is not None: 
-            self.event_manager.new_timestamp(f'{self.name}_beam_unbroken', time=t, duration = t - ts.time)
+        # (NOTE) the break and unbreak get timestamped by edge(), at the time each edge occurred 
 
         # To avoid overloading a beam with threshold events, we can sleep here until a state change occurs 
         ''' while (self.threshold_attribute == self.threshold_goal_value) and self.active: 
@@ -1279,7 +1555,7 @@ class beam(interactableABC):
             # self.event_manager.print_to_terminal('simulating beam break')  
             self.isBroken = True 
             self.buttonObj.num_pressed += 1
-            time.sleep(n)
+            CLOCK.sleep(n)
             self.isBroken = False 
         return 
     
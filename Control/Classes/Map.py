@@ -12,40 +12,82 @@ Property of Donaldson Lab at the University of Colorado at Boulder
 
 
 # Standard Lib Imports 
-from collections import deque
+from collections import deque, OrderedDict
 import time
 import json 
 import os
 import threading
 import sys
+import concurrent.futures
+import itertools
 
 # Local Imports 
 from .EventManager import EventManager, PRINTING_MUTEX
+from .Clock import CLOCK
 from Logging.logging_specs import control_log, sim_log
 from .ModeABC import modeABC 
 from . import InteractableABC
 from .InteractableABC import lever, door, rfid, buttonInteractable, dispenser, beam, template
 from .EventManager import EventManager 
 from .CANBus import CANBus 
+from .DependencyGraph import DependencyGraph 
 
 class Map: 
-    def __init__(self, config_directory, map_file_name = None ): 
+    def __init__(self, config_directory, map_file_name = None, interactive = True, component_path_cache_size = None ): 
+
+        self.interactive = interactive # if False, the map never waits on user input ( e.g. for running headless batches of simulations ). Config problems that would have prompted the user are skipped over, or raise an Exception if they cannot be skipped. 
 
         self.graph = {} # { chamberid(int): chamber instance(self.Chamber) }
 
         self.edges = [] # list of all edge objects that have been created ( can also access thru each Chamber instance )
 
         self.instantiated_interactables = {} # dict of (interactable name: interactable object ) to represent every object of type interactableABC that has been created to avoid repeats
+
+        self.dependency_graph = None # DependencyGraph of which interactables control which other interactables. Built by configure_setup after the parent interactables are set. 
+
+        #
+        # Interactable Lifecycle ( Activation / Deactivation ) 
+        #
+        self.lifecycle_workers = 8 # max number of interactables that get activated/deactivated at the same time 
+        self.lifecycle_timeout = 5 # seconds to wait on a single interactable's activate()/deactivate() before reporting it as unresponsive and moving on 
+        self.slow_lifecycle_threshold = 0.5 # seconds. any interactable that takes longer than this to activate/deactivate is listed in the slow device report 
+        self.lifecycle_executor = None # worker pool shared by activate_interactables and deactivate_interactables ( created on first use ) 
+        self.lifecycle_report = None # report from the most recent activation/deactivation, see _run_lifecycle() 
         
         self.voles = [] # list of Vole objects to allow the map to perform basic vole location tracking
 
+        self.occupancy = {} # { Chamber|Edge|Component|ComponentSet : set(vole tags) } index of which voles are at each location, maintained by set_vole_position() 
+
+        self.vole_positions = {} # { vole tag : (Chamber|Edge, Component|ComponentSet|None) } the entries each vole currently has in the occupancy index 
+
+        self.occupancy_lock = threading.Lock() # ensures a vole is never in two places (or zero places) in the occupancy index while it is being moved 
+
         self.event_manager = EventManager()
 
         self.config_directory = config_directory # directory containing all of the configuration files 
 
+        #
+        # Component Path Caching
+        #
+        self.component_graph = None # { Component|ComponentSet : set(adjacent Components|ComponentSets) }. built on first use by build_component_graph(), and cleared anytime a chamber or edge changes its components 
+        self.component_path_cache = OrderedDict() # LRU cache of component paths, keyed by (start_component, goal_component)
+        self.component_path_cache_size = component_path_cache_size # max number of paths stored in the component_path_cache before the least recently used path gets dropped. If None, sized from the number of components, see component_path_capacity() 
+        self.component_path_cache_limit = 65536 # cap on the size of the component_path_cache when it is sized from the number of components 
+        self.component_path_cache_capacity = None # size of the component_path_cache for the current components, see component_path_capacity() 
+        self.component_cache_lock = threading.Lock() # voles move on their own threads, so guard the cache and the component graph 
+        self.render_cache = {} # { (Chamber|Edge, drawing style) : ((location version, vole tags), [lines]) } cached drawings of each location, see render_location() 
+        self.location_versions = {} # { Chamber|Edge : version } changes anytime a vole enters or leaves the location, or one of its interactables changes state, see location_changed() 
+        self.location_version_counter = itertools.count(1) # hands out the location versions, so a version is never reused 
+
+        #
+        # Action Table Caching ( Simulation Use Only )
+        #
+        self.action_tables = {} # { (Chamber|Edge, Component|ComponentSet|None) : (actions, weights) } the actions a simulated vole can take from each location, see get_action_table() 
+        self.action_table_version = 0 # incremented anytime the action tables get cleared, so voles know to drop any tables they built from the old ones 
+
         if map_file_name is not None: 
-            self.configure_setup(config_directory + f'/{map_file_name}') # optional arg pointing to map config file 
-        else: self.configure_setup(config_directory + '/map.json') # default map config file 
+            self.configure_setup(os.path.join(config_directory, map_file_name)) # optional arg pointing to map config file ( can also be an absolute filepath ) 
+        else: self.configure_setup(os.path.join(config_directory, 'map.json')) # default map config file 
 
         self.canbus = CANBus(isserial=False)
 
@@ -55,6 +97,8 @@ class Map:
     def draw_map(self, voles=[]): 
         """        
         [summary] parent function that calls other methods in order to print the chambers, edges, and components/voles within them to the terminal. 
+            the drawing of each chamber and edge is cached, and a location is only redrawn if the voles within it have moved since the last drawing (or if the map's components have changed). 
+            the entire map is then written to the terminal in a single write, so the printing mutex is only held for as long as that write takes. 
         
         Args:         
             voles ([Voles], optional) : If this is called from a Simulation, there is an option to pass the voles argument to also print the vole positions in the map. Otherwise uses voles that were assigned in Map.json (i.e. when a simulation is not running).
@@ -62,11 +106,15 @@ class Map:
             None : this method calls helper functions that will print its results to the terminal and does not return anything.
         """
         
-        print('\n')
-        # * note - do NOT aquire the printing mutex here because that would cause deadlock since both functions we call will also attempt to acquire the mutex
-        self.draw_chambers(voles)
-        self.draw_edges(voles)
-        print('\n')
+        if len(voles) == 0: 
+            voles = self.voles 
+        location_voles = self.group_voles_by_location(voles) 
+
+        lines = ['\n']
+        lines.extend(self.render_chambers(location_voles))
+        lines.extend(self.render_edges(location_voles))
+        lines.append('\n')
+        self.write_drawing(lines)
     
     def draw_helper(self, voles, interactables): 
         """        
@@ -197,79 +245,168 @@ class Map:
         # make list of string names rather than the objects 
         return vole_interactable_lst
     
-    def draw_chambers(self, voles=[]): 
+    def group_voles_by_location(self, voles): 
         """        
-        [summary] helper function to draw_map in charge of printing the chamber visualizations to the terminal.
-        Args:         
-            voles ([Voles], optional) : If this is called from a Simulation, there is an option to pass the voles argument to also print the vole positions in the map. Otherwise uses voles that were assigned in Map.json (i.e. when a simulation is not running).
-        Returns:
-            None : this method prints its results to the terminal and does not return anything.
+        [summary] sorts voles by their current location in a single pass, so the drawing functions do not have to rescan the list of voles for every chamber and edge. 
+        Args: 
+            voles ([Voles]) : list of voles to sort 
+        Returns: 
+            (dict) : { Chamber|Edge : [Voles at that location] } 
         """
-        if len(voles) == 0: 
-            voles = self.voles 
-
-
-        PRINTING_MUTEX.acquire() # # Aquire Lock for Active Printing Section # # 
-        for cid in self.graph.keys(): 
-            
-            chmbr = self.get_chamber(cid)
-            cvoles = []
+        location_voles = {} 
+        for v in voles: 
+            location_voles.setdefault(v.curr_loc, []).append(v)
+        return location_voles
 
-            # get chamber voles 
-            for v in voles: 
-                if v.curr_loc == chmbr: 
-                    cvoles.append(v)
+    def render_location(self, location, voles, style, render_fn): 
+        """        
+        [summary] returns the drawing (as a list of lines) for a single chamber or edge. Drawings are cached per location and style, and only get re-rendered once the location's version has changed ( see location_changed ), or a different set of voles is drawn there. 
+            The render cache is cleared with the component path cache anytime the map's components change. 
+        Args: 
+            location (Chamber|Edge) : the location to draw 
+            voles ([Voles]) : the voles that are currently at <location> 
+            style (string) : name of the drawing style, so the different drawing functions can keep separate cache entries for the same location
+            render_fn (function) : function that takes (location, voles) and returns the drawing as a list of lines. Only gets called on a cache miss. 
+        Returns: 
+            ([string]) : the lines of the drawing 
+        """
+        signature = ( self.location_versions.get(location, 0), tuple( v.tag for v in voles ) )
+        cached = self.render_cache.get((location, style))
+        if cached is not None and cached[0] == signature: 
+            return cached[1] 
+        lines = render_fn(location, voles)
+        self.render_cache[(location, style)] = (signature, lines)
+        return lines 
+
+    def location_changed(self, location): 
+        """        
+        [summary] gives <location> a new version, so that its cached drawings get re-rendered. Called anytime a vole moves into or out of the location, or one of its interactables changes state. 
+        Args: 
+            location (Chamber|Edge) : the location that changed 
+        Returns: 
+            None
+        """
+        self.location_versions[location] = next(self.location_version_counter)
 
-            
-            print(f'-------------------------------------------------------')
-            print(f'|                       (C{chmbr.id})                          |')
+    def interactable_state_changed(self, interactable): 
+        ''' [summary] added to every interactable's state_callbacks, so that the location an interactable is drawn in gets a new version whenever its state changes ( see interactableABC.state_changed ) '''
+        if interactable.edge_or_chamber is None: 
+            return # not placed in the map yet 
+        self.location_changed(self.get_location_object(interactable))
 
-            # get chamber interactables: Group off into Ordered Components -> [ single list of unordered interactables ] -> Ordered Components
-            beforeUnordered = [] 
-            afterUnordered = []
-            unorderedGroup = [] 
-            for idx in range(len(chmbr.allChamberInteractables)): 
+    def write_drawing(self, lines): 
+        """        
+        [summary] writes an already rendered drawing to the terminal in a single write while holding the printing mutex, so timestamps and countdowns are only blocked for the duration of the write. 
+        Args: 
+            lines ([string]) : the lines of the drawing 
+        Returns: 
+            None
+        """
+        drawing = '\n'.join(lines) + '\n'
+        with PRINTING_MUTEX: 
+            sys.stdout.write(drawing)
+            sys.stdout.flush() 
 
-                if chmbr.allChamberInteractables[idx] in chmbr.unorderedSet: 
-                    unorderedGroup.append(chmbr.allChamberInteractables[idx])
+    def _render_chamber(self, chmbr, cvoles): 
+        """        
+        [summary] helper function to render_chambers that builds the lines for drawing a single chamber. Called on a render cache miss. 
+        Args: 
+            chmbr (Chamber) : the chamber to draw 
+            cvoles ([Voles]) : the voles that are currently in the chamber 
+        Returns: 
+            ([string]) : the lines of the chamber drawing 
+        """
+        lines = [] 
+        lines.append(f'-------------------------------------------------------')
+        lines.append(f'|                       (C{chmbr.id})                          |')
+
+        # get chamber interactables: Group off into Ordered Components -> [ single list of unordered interactables ] -> Ordered Components
+        beforeUnordered = [] 
+        afterUnordered = []
+        unorderedGroup = [] 
+        for idx in range(len(chmbr.allChamberInteractables)): 
+
+            if chmbr.allChamberInteractables[idx] in chmbr.unorderedSet: 
+                unorderedGroup.append(chmbr.allChamberInteractables[idx])
+            else: 
+                if len(unorderedGroup) < 1: 
+                    beforeUnordered.append(chmbr.allChamberInteractables[idx])
                 else: 
-                    if len(unorderedGroup) < 1: 
-                        beforeUnordered.append(chmbr.allChamberInteractables[idx])
-                    else: 
-                        afterUnordered.append(chmbr.allChamberInteractables[idx])
-            interactables = []
-            if len(beforeUnordered) > 0: 
-                interactables.extend(beforeUnordered)
-            if len(unorderedGroup) > 0: 
-                interactables.append(unorderedGroup)
-            if len(afterUnordered) > 0: 
-                interactables.extend(afterUnordered)
-
+                    afterUnordered.append(chmbr.allChamberInteractables[idx])
+        interactables = []
+        if len(beforeUnordered) > 0: 
+            interactables.extend(beforeUnordered)
+        if len(unorderedGroup) > 0: 
+            interactables.append(unorderedGroup)
+        if len(afterUnordered) > 0: 
+            interactables.extend(afterUnordered)
+
+        # chamber interactable ordering is Unordered. Therefore if a vole stands at one of them, it can interact with any of them. 
+        # in drawing the vole, only need to worry about if it should come before all of the unordered interactables, or after all of the unordered interactables
+        
+        # if the voles location is of type Component, then we know that the vole is standing at an Ordered Chamber Interactable. 
+        # We should figure out which side of the Unordered (ComponentSet) that this Component exists on.
+        vole_interactable_list = self.draw_helper(cvoles, interactables)
+
+        for name in vole_interactable_list: 
+            if len(str(name)) > 50: 
+                name = name[:49] + '-'
+            space = 51 - len(str(name)) 
+            lines.append(f'|[{name}]' + f"{'':>{space}}" + '|')
+                
+        lines.append(f'-------------------------------------------------------')
+        return lines 
 
+    def _render_edge(self, e, evoles): 
+        """        
+        [summary] helper function to render_edges that builds the line for drawing a single edge. Called on a render cache miss. 
+        Args: 
+            e (Edge) : the edge to draw 
+            evoles ([Voles]) : the voles that are currently on the edge 
+        Returns: 
+            ([string]) : the lines of the edge drawing 
+        """
+        interactables = [c.interactable for c in e] # creates list of the interactable names 
+        vole_interactable_lst = self.draw_helper(evoles, interactables)
+        return [f'({e.v1}) <---{vole_interactable_lst}----> ({e.v2})']
 
-            # chamber interactable ordering is Unordered. Therefore if a vole stands at one of them, it can interact with any of them. 
-            # in drawing the vole, only need to worry about if it should come before all of the unordered interactables, or after all of the unordered interactables
-            
-            # if the voles location is of type Component, then we know that the vole is standing at an Ordered Chamber Interactable. 
-            # We should figure out which side of the Unordered (ComponentSet) that this Component exists on.
-            vole_interactable_list = self.draw_helper(cvoles, interactables)
+    def render_chambers(self, location_voles): 
+        """        
+        [summary] returns the lines for drawing every chamber in the map, reusing the cached drawing of any chamber whose voles have not moved. 
+        Args: 
+            location_voles (dict) : { Chamber|Edge : [Voles] }, as returned by group_voles_by_location 
+        Returns: 
+            ([string]) : the lines of the drawing 
+        """
+        lines = [] 
+        for chmbr in self.graph.values(): 
+            lines.extend(self.render_location(chmbr, location_voles.get(chmbr, []), 'map', self._render_chamber))
+        return lines 
 
-            
-            def draw_name(name): 
-                if len(str(name)) > 50: 
-                    name = name[:49] + '-'
-                space = 51 - len(str(name)) 
-                print(f'|[{name}]' + f"{'':>{space}}" + '|')
-            
-            
-            # Draw! 
-            for name in vole_interactable_list: 
-                draw_name(name)
-                    
-                        
-            print(f'-------------------------------------------------------')
+    def render_edges(self, location_voles): 
+        """        
+        [summary] returns the lines for drawing every edge in the map, reusing the cached drawing of any edge whose voles have not moved. 
+        Args: 
+            location_voles (dict) : { Chamber|Edge : [Voles] }, as returned by group_voles_by_location 
+        Returns: 
+            ([string]) : the lines of the drawing 
+        """
+        lines = [] 
+        for e in self.edges: 
+            lines.extend(self.render_location(e, location_voles.get(e, []), 'map', self._render_edge))
+        return lines 
 
-        PRINTING_MUTEX.release() # # End of Active Printing Section, Release Lock # # 
+    def draw_chambers(self, voles=[]): 
+        """        
+        [summary] helper function to draw_map in charge of printing the chamber visualizations to the terminal.
+        Args:         
+            voles ([Voles], optional) : If this is called from a Simulation, there is an option to pass the voles argument to also print the vole positions in the map. Otherwise uses voles that were assigned in Map.json (i.e. when a simulation is not running).
+        Returns:
+            None : this method prints its results to the terminal and does not return anything.
+        """
+        if len(voles) == 0: 
+            voles = self.voles 
+        self.write_drawing(self.render_chambers(self.group_voles_by_location(voles)))
     
     def draw_edges(self, voles=[]): 
         """        
@@ -281,26 +418,42 @@ class Map:
         """
         if len(voles) == 0: 
             voles = self.voles
+        self.write_drawing(self.render_edges(self.group_voles_by_location(voles)))
 
-        edges = self.edges
-
-        PRINTING_MUTEX.acquire() # GET PRINTING LOCK
-        for e in edges: 
-            
-            # Make List of Edge Voles
-            evoles = []
-            for v in voles: 
-                # get voles that are on edge e 
-                if v.curr_loc == e: 
-                    evoles.append(v)
-
-            # Make List of Edge Interactables        
-            interactables = [c.interactable for c in e] # creates list of the interactable names 
+    def _render_small_location(self, location, loc_voles): 
+        """        
+        [summary] helper function to draw_location that builds the lines for the compact drawing of a single chamber or edge. Called on a render cache miss. 
+        Args: 
+            location (Chamber|Edge) : the location to draw 
+            loc_voles ([Voles]) : the voles that are currently at <location>
+        Returns: 
+            ([string]) : the lines of the drawing 
+        """
+        # make list of interactables at location 
+        interactables = [] # creates list of the interactable names 
+        for c in location: 
+            if type(c) is self.Chamber.ComponentSet: 
+                # contains interactable list 
+                interactables.append(c.interactableSet)
+            else: 
+                # Component
+                interactables.append(c.interactable)
 
-            vole_interactable_lst = self.draw_helper(evoles, interactables)
+        vole_interactable_lst = self.draw_helper(loc_voles, interactables)
 
-            print(f'({e.v1}) <---{vole_interactable_lst}----> ({e.v2})')
-        PRINTING_MUTEX.release() # RELEASE PRINTING LOCK
+        if location.edge_or_chamber == 'edge': 
+            # draw edge 
+            return [f'({location.v1}) <---{vole_interactable_lst}----> ({location.v2})']
+        
+        # draw chamber
+        lines = ['_____________', f'|   (C{location.id})    |']
+        for name in vole_interactable_lst: 
+            if len(str(name)) > 8: 
+                name = name[:7] + '-'
+            space = 9 - len(str(name)) 
+            lines.append(f'|[{name}]' + f"{'':>{space}}" + '|')
+        lines.append(f'-------------')
+        return lines 
 
     def draw_location(self, location, voles=[]): 
         """        
@@ -312,52 +465,15 @@ class Map:
             string : returns a string that represents all of the things to print ( this way we can write the drawings to the logging files )
         """
         
-        drawing = '' # appends the drawing to this variable so we can return the drawing in a variable 
-
         if len(voles) == 0:
             voles = self.voles
 
         # get voles that are at location 
-        loc_voles = []
-        for v in voles: 
-            if v.curr_loc == location: 
-                loc_voles.append(v)
+        loc_voles = [v for v in voles if v.curr_loc == location]
         
-        # make list of interactables at location 
-        interactables = [] # creates list of the interactable names 
-        for c in location: 
-            if type(c) is self.Chamber.ComponentSet: 
-                # contains interactable list 
-                interactables.append(c.interactableSet)
-            else: 
-                # Component
-                interactables.append(c.interactable)
-        # interactables = [c.interactable for c in location] 
-
-        vole_interactable_lst = self.draw_helper(loc_voles, interactables)
-
-        PRINTING_MUTEX.acquire() # RETRIEVE PRINTING LOCK 
-        if location.edge_or_chamber == 'edge': 
-            # draw edge 
-            print(f'({location.v1}) <---{vole_interactable_lst}----> ({location.v2})')
-            drawing += (f'({location.v1}) <---{vole_interactable_lst}----> ({location.v2})')
-        else: 
-            # draw chamber
-            print(f'_____________\n|   (C{location.id})    |')
-            drawing += (f'_____________\n|   (C{location.id})    |')
-            def draw_name(name): 
-                if len(str(name)) > 8: 
-                    name = name[:7] + '-'
-                space = 9 - len(str(name)) 
-                print(f'|[{name}]' + f"{'':>{space}}" + '|')
-                return (f'\n|[{name}]' + f"{'':>{space}}" + '|')
-            for name in vole_interactable_lst: 
-                drawing += draw_name(name)          
-            print(f'-------------')
-            drawing += (f'\n-------------')
-
-        PRINTING_MUTEX.release() # RELEASE PRINTING LOCK
-        return drawing
+        lines = self.render_location(location, loc_voles, 'location', self._render_small_location)
+        self.write_drawing(lines)
+        return '\n'.join(lines) 
 
     #
     # Summary Tables
@@ -403,12 +519,12 @@ class Map:
             None
         """
 
-        row1 = ['Interactable', 'Can Control (Parent)']
+        row1 = ['Interactable', 'Can Control (Parent)', 'Controlled By']
         data = [row1]
-        for i_name in self.instantiated_interactables.keys(): 
-            # dnames = ','.join([d.name for d in self.instantiated_interactables[i_name].dependents]) # makes list of names and converts list to string 
-            pnames = ','.join([p.name for p in self.instantiated_interactables[i_name].parents]) 
-            data.append( [i_name, pnames] )
+        for i in self.dependency_graph.activation_order: 
+            pnames = ','.join([p.name for p in self.dependency_graph.parents_of(i)]) # makes list of names and converts list to string 
+            cnames = ','.join([c.name for c in self.dependency_graph.controllers_of(i)])
+            data.append( [i.name, pnames, cnames] )
         EventManager.draw_table(data, cellwidth=40)
         
 
@@ -518,6 +634,7 @@ class Map:
             setattr( new_obj, 'parent_names', objspec['parents']) # interactables can call functions to control their parent behavior (e.g. if we want lever1 to control door1, then add door1 as lever1's parent )
         
         self.instantiated_interactables[name] = new_obj  # add string identifier to list of instantiated interactables
+        new_obj.state_callbacks.append(self.interactable_state_changed) # redraw the interactable's location anytime its state changes 
         
         # activate the object so it begins watching for threshold events --> can potentially reposition this to save CPU energy since each interactable gets its own thread. 
         # be careful/don't add the activation statement to the interactable's __init__ statements, because then we get a race condition between this function which sets "check_threshold_with_fn" and the watch_for_threshold_event which gets the "check_threshold_with_fn" value.  
@@ -537,32 +654,96 @@ class Map:
         for (n,i) in self.instantiated_interactables.items() :
             i.reset() 
     
+    def _run_lifecycle(self, action, interactables): 
+        """        
+        [summary] helper function for activate_interactables and deactivate_interactables. Runs <action> on the interactables concurrently using a bounded worker pool ( or one at a time, when the CLOCK is virtual ). 
+            Works through the dependency graph one level at a time, so every controller has finished before the interactables it controls are started on. 
+            Waits at most self.lifecycle_timeout seconds on each level. An interactable that does not finish in time is reported as unresponsive, and the remaining interactables carry on without it. 
+            Anything raised by an interactable is recorded in the report rather than raised. The interactables controlled by an interactable that raised or timed out are skipped, along with anything they control in turn. 
+            Any interactable slower than self.slow_lifecycle_threshold is included in the report that gets stored in self.lifecycle_report and printed to the terminal. 
+        Args: 
+            action (function) : function that takes a single interactable (e.g. lambda i: i.activate()) 
+            interactables ([Interactable]) : the interactables to run <action> on. Anything not in this list is skipped. 
+        Returns:
+            (dict) : the report, { 'total': seconds, 'durations': { name: seconds }, 'slow': [(name, seconds)], 'timed_out': [names], 'errors': { name: exception }, 'skipped': [names] } 
+        """
+
+        if self.lifecycle_executor is None: 
+            self.lifecycle_executor = concurrent.futures.ThreadPoolExecutor(max_workers = self.lifecycle_workers, thread_name_prefix = 'interactable_lifecycle')
+        
+        include = set(interactables)
+        durations = {} 
+        timed_out = [] 
+        errors = {} 
+        skipped = [] 
+        failed = set() # interactables that raised, timed out or were skipped 
+
+        def timed_action(i): 
+            start = time.perf_counter() 
+            action(i)
+            durations[i.name] = time.perf_counter() - start 
+
+        start = time.perf_counter() 
+        for level in self.dependency_graph.levels: 
+            run = [] 
+            for i in level: 
+                if i not in include: 
+                    continue 
+                if any( c in failed for c in self.dependency_graph.controllers_of(i) ): 
+                    skipped.append(i.name)
+                    failed.add(i)
+                else: 
+                    run.append(i)
+            if CLOCK.isVirtual: 
+                # in virtual time, run the actions one at a time from the calling thread, so that the threads they start get scheduled in the same order on every run 
+                for i in run: 
+                    try: timed_action(i)
+                    except Exception as e: 
+                        errors[i.name] = e 
+                        failed.add(i)
+                continue 
+            futures = { self.lifecycle_executor.submit(timed_action, i): i for i in run }
+            not_done = concurrent.futures.wait(futures, timeout = self.lifecycle_timeout).not_done
+            for (f, i) in futures.items(): 
+                if f in not_done: 
+                    timed_out.append(i.name)
+                    failed.add(i)
+                elif f.exception() is not None: 
+                    errors[i.name] = f.exception()
+                    failed.add(i)
+        
+        slow = sorted( [ (n, d) for (n, d) in durations.items() if d > self.slow_lifecycle_threshold ], key = lambda nd: nd[1], reverse = True )
+        self.lifecycle_report = { 'total': time.perf_counter() - start, 'durations': durations, 'slow': slow, 'timed_out': timed_out, 'errors': errors, 'skipped': skipped }
+        if len(slow) > 0 or len(timed_out) > 0 or len(errors) > 0: 
+            self.event_manager.print_to_terminal(f'(Map.py, _run_lifecycle) slow interactables: {[ f"{n} ({round(d,2)}s)" for (n,d) in slow ]}, unresponsive after {self.lifecycle_timeout}s: {timed_out}, raised an exception: {[ f"{n} ({e!r})" for (n,e) in errors.items() ]}, skipped: {skipped}')
+        return self.lifecycle_report
+
     def activate_interactables(self): 
         """        
-        [summary] loops thru all instantiated interactables and ensures that all are actively running 
+        [summary] ensures that all instantiated interactables are actively running. 
+            interactables are activated concurrently (see _run_lifecycle), following the dependency graph's topological order so an interactable is always activated before the interactables that it controls. 
         Args: 
             None
         Returns:
-            None
+            (dict) : the lifecycle report, see _run_lifecycle 
         """
-        for (n,i) in self.instantiated_interactables.items(): 
-            if not i.active: 
-                i.activate()
+        inactive = [ i for i in self.dependency_graph.activation_order if not i.active ]
+        return self._run_lifecycle(lambda i: i.activate(), inactive)
     
     def deactivate_interactables(self, clear_threshold_queue = True): 
         """        
-        [summary] loops thru all instantiated interactables and sets each of them to be inactive. Called in between modes 
+        [summary] sets each of the instantiated interactables to be inactive. Called in between modes 
+            interactables are deactivated concurrently (see _run_lifecycle), in the same order as activation, so controllers stop before the interactables they control and can no longer call into an interactable that has already been deactivated 
         Args: 
             clear_threshold_queue (Bool, defaults to True) : default behavior is clearing the threshold_event_queue for each of the interactables. If set to false, this step is skipped.
         Returns:
-            None
+            (dict) : the lifecycle report, see _run_lifecycle 
         """
         
-        for (n,i) in self.instantiated_interactables.items(): 
-            i.deactivate()
+        report = self._run_lifecycle(lambda i: i.deactivate(), self.dependency_graph.activation_order)
         if clear_threshold_queue: 
             self.reset_interactables() # empties the interactables threshold queue
-        
+        return report 
 
     
     #
@@ -676,7 +857,7 @@ class Map:
         """        
         [summary] function to read/parse the maps configuration file and set up the map accordingly. 
         creates and adds chambers, edges, and interactables to the map. Assigns interactables to an ordered component(calls set_as_ordered) or to an unordered component set (calls _set_unordered_component)
-        calls set_parent_interactable to set the specified parent/child relationship between interactables ( where the state of a child interactable can control the state of a parent interatable )
+        calls set_parent_interactable to set the specified parent/child relationship between interactables ( where the state of a child interactable can control the state of a parent interatable ), and then builds the dependency graph from these relationships 
         calls _setup_voles to create Vole objects 
         Args: 
             config_filepath (String): filepath to the map's configuration file. Must be a json file. 
@@ -779,6 +960,7 @@ class Map:
 
         # Create relationships between what interactables can control other interactables
         self.set_parent_interactables() 
+        self.dependency_graph = DependencyGraph(self.instantiated_interactables) # raises an Exception if the parent relationships contain a cycle 
 
 
         # Finally, create Vole objects! 
@@ -793,7 +975,8 @@ class Map:
             print(f'{message}')
             input(f'press the enter key to continue!')
             return 
-        input_before_continue('\n')  
+        if self.interactive: 
+            input_before_continue('\n')  
           
     def set_parent_interactables(self): 
         """        
@@ -816,6 +999,7 @@ class Map:
                     except KeyError as e: 
                         print(e)
                         print(f' specified an unknown interactable {e} as a parent for {i.name}. Double check the config files for {e} and for {i.name} to ensure they are correct, and ensure that {e} was added in the map config file as well.')
+                        if not self.interactive: continue # carry on without adding the parent
                         ans = input(f' would you like to carry on the experiment without adding {e} as a parent for {i.name}? (y/n)')
                         if ans == 'n': exit()
                 delattr(i, 'parent_names')  # delete the dependent_names attribute since we don't need it anymore 
@@ -845,13 +1029,18 @@ class Map:
             # NOTE --> TESTME! ensure that this does not cause any problems. 
             # skip adding this chamber to graph, as it is just for storing override button components 
             newChamber = self.Chamber(id)
+            newChamber.on_components_changed = self.invalidate_component_paths
+            newChamber.on_action_probabilities_changed = self.invalidate_action_tables
             return newChamber
 
         if self.get_chamber(id) is not None: 
             raise Exception(f'chamber with id {id} already exists')
         
         newChamber = self.Chamber(id)
+        newChamber.on_components_changed = self.invalidate_component_paths
+        newChamber.on_action_probabilities_changed = self.invalidate_action_tables
         self.graph[id] = newChamber
+        self.invalidate_component_paths()
         return newChamber
 
     def new_shared_edge(self, id, v1, v2):
@@ -868,9 +1057,11 @@ class Map:
         if self.get_edge(id): raise Exception(f'An edge with the id {id} already exists, could not create edge.')
         
         newEdge = self.Edge(id, v1, v2,'shared')
+        newEdge.on_components_changed = self.invalidate_component_paths
         self.graph[v2].connections[v1] = newEdge 
         self.graph[v1].connections[v2] = newEdge
         self.edges.append(newEdge)
+        self.invalidate_component_paths()
         return newEdge
         
     def new_unidirectional_edges(self, id, v1, v2):
@@ -888,13 +1079,16 @@ class Map:
         if self.get_edge(id): raise Exception(f'An edge with the id {id} already exists, could not create edge.')
         
         edge1 = self.Edge(id,v1,v2,"unidirectional")
+        edge1.on_components_changed = self.invalidate_component_paths
         self.graph[v1].connections[v2] = edge1 # add edges to vertices' adjacency dict 
         
         rev_id = int(str(id)[::-1]) # reverse the id for the edge going the reverse direction 
         edge2 = self.Edge(rev_id, v2, v1, "unidirectional")
+        edge2.on_components_changed = self.invalidate_component_paths
         self.graph[v2].connections[v1] = edge2
         
         self.edges.extend([edge1, edge2]) # add new edges list of map edges
+        self.invalidate_component_paths()
         return (edge1, edge2)
 
     def get_edge(self, edgeid): 
@@ -1091,8 +1285,8 @@ class Map:
     def get_component_path(self, start_component, goal_component ): 
         ''' 
         [summary] gets an ordered list of interactables that a vole will pass when traveliing from start_component -> goal_component. arguments must be of component type. 
-                  function first gets list of sequential edge and chamber components that fall between the start location and the goal location. Then, removes any components that fall outside of start_component and goal_component and returns this list. 
-                  works out adding the correct components based on map configurations. ( Has to break ties between a chamber_interactable referenced by the edge and the same interactable referenced within a chamber. )
+                  paths are memoized in an LRU cache keyed on (start_component, goal_component), so repeated queries (e.g. from voles that move back and forth along the same edges) skip the path search. 
+                  the cache is cleared anytime a component gets added to or removed from the map. On a cache miss, the path is computed by _find_component_path. 
         Args: 
             start_component (Component) : the component that the path will start at  
             goal_component (Component) : the component that the path will finish at 
@@ -1110,6 +1304,33 @@ class Map:
             # control_log(f'(Map, get_component_path) arguments must be of type Component, but recieved start_component of type {type(start_component)} and goal_component of type {type(goal_component)}')
             raise Exception(f'(Map, get_component_path) arguments must be of type Component, but recieved start_component of type {type(start_component)} and goal_component of type {type(goal_component)}')
 
+        key = (start_component, goal_component)
+        with self.component_cache_lock: 
+            if key in self.component_path_cache: 
+                self.component_path_cache.move_to_end(key) # mark as most recently used 
+                return list(self.component_path_cache[key]) # return a copy so callers cannot edit the cached path 
+
+        component_path = self._find_component_path(start_component, goal_component)
+
+        with self.component_cache_lock: 
+            self.component_path_cache[key] = component_path 
+            if len(self.component_path_cache) > self.component_path_capacity(): 
+                self.component_path_cache.popitem(last = False) # evict the least recently used path 
+        
+        return list(component_path)
+
+    def _find_component_path(self, start_component, goal_component): 
+        ''' 
+        [summary] helper function to get_component_path that performs the actual path search whenever a path is not already in the cache. 
+                  function first gets list of sequential edge and chamber components that fall between the start location and the goal location. Then, removes any components that fall outside of start_component and goal_component and returns this list. 
+                  works out adding the correct components based on map configurations. ( Has to break ties between a chamber_interactable referenced by the edge and the same interactable referenced within a chamber. )
+        Args: 
+            start_component (Component) : the component that the path will start at  
+            goal_component (Component) : the component that the path will finish at 
+        Returns: 
+            ([Component]) : ordered list of components from start_component -> goal_component 
+        '''
+
 
         # convert components to their edge or chamber location objects (get_location_object requires interactable arguments rather than the component)
         if type(start_component) is self.Chamber.ComponentSet: 
@@ -1336,6 +1557,163 @@ class Map:
         
         return component_path[start_idx:goal_idx+1] 
 
+    def build_component_graph(self): 
+        ''' 
+        [summary] builds a component-level adjacency graph for the entire map, where two components are adjacent if a vole can step between them without passing any other component. 
+                  components that sit next to one another within a chamber or edge are adjacent, and the end components of an edge are adjacent to the unordered component of the chamber they lead into (unless the edge end is already a chamber interactable reference). 
+                  the graph is stored in self.component_graph and is only rebuilt after invalidate_component_paths() clears it. 
+        Args: 
+            None 
+        Returns: 
+            (dict) : { Component|ComponentSet : set of adjacent Components|ComponentSets }
+        '''
+        graph = {} 
+
+        def link(c1, c2): 
+            graph.setdefault(c1, set()).add(c2)
+            graph.setdefault(c2, set()).add(c1)
+
+        # neighbors within a single chamber or edge 
+        for loc in list(self.graph.values()) + self.edges: 
+            components = loc.get_component_list() 
+            for c in components: 
+                graph.setdefault(c, set())
+            for idx in range(len(components)-1): 
+                link(components[idx], components[idx+1])
+        
+        # neighbors across an edge/chamber boundary 
+        for e in self.edges: 
+            if e.v1 not in self.graph or e.v2 not in self.graph: 
+                continue 
+            components = e.get_component_list() 
+            if len(components) == 0: 
+                # empty edge, so a vole steps directly between the unordered components of the two chambers 
+                link(self.graph[e.v1].unorderedComponent, self.graph[e.v2].unorderedComponent)
+                continue 
+            for (end, cid) in [(components[0], e.v1), (components[-1], e.v2)]: 
+                if end.interactable.edge_or_chamber == 'chamber' and end.interactable.edge_or_chamber_id == cid: 
+                    continue # end of the edge is a chamber interactable reference, which is already linked w/in the chamber's component list 
+                link(end, self.graph[cid].unorderedComponent)
+
+        self.component_graph = graph 
+        return graph 
+
+    def components_are_adjacent(self, component1, component2): 
+        ''' 
+        [summary] constant time check for if a vole can step from component1 to component2 without passing any other component. Builds the component graph on first use. 
+        Args: 
+            component1 (Component | ComponentSet) : the component the vole is currently positioned at 
+            component2 (Component | ComponentSet) : the component the vole wants to move to
+        Returns: 
+            (Boolean) : True if the components are directly next to one another, False otherwise 
+        '''
+        with self.component_cache_lock: 
+            graph = self.component_graph 
+            if graph is None: 
+                graph = self.build_component_graph() 
+        return component2 in graph.get(component1, ())
+
+    def component_path_capacity(self): 
+        ''' 
+        [summary] returns the max number of paths that the component_path_cache holds. This is self.component_path_cache_size if it was set, and otherwise the number of component pairs ( capped at self.component_path_cache_limit ), so that a map has room for every path between its components. 
+                  Caller must be holding the component_cache_lock. 
+        Args: 
+            None 
+        Returns: 
+            (int) : max number of cached paths 
+        '''
+        if self.component_path_cache_size is not None: 
+            return self.component_path_cache_size 
+        if self.component_path_cache_capacity is None: 
+            components = sum( len(loc.get_component_list()) for loc in list(self.graph.values()) + self.edges )
+            self.component_path_cache_capacity = max(1, min(components ** 2, self.component_path_cache_limit))
+        return self.component_path_cache_capacity 
+
+    def invalidate_component_paths(self): 
+        ''' 
+        [summary] clears the component path cache, the component graph, and the cached map drawings. Chambers and Edges call this anytime one of their components gets added or removed, so cached paths never point to stale components. 
+        Args: 
+            None
+        Returns: 
+            None 
+        '''
+        with self.component_cache_lock: 
+            self.component_path_cache.clear() 
+            self.component_graph = None 
+            self.component_path_cache_capacity = None # the number of components may have changed 
+            self.render_cache.clear() # drawings include the components, so these are stale as well 
+            self.action_tables.clear() # a vole's possible actions depend on the components at its location 
+            self.action_table_version += 1 
+
+    def invalidate_action_tables(self): 
+        ''' 
+        [summary] clears the cached action tables. Chambers call this whenever their action probabilities change. 
+        Args: 
+            None
+        Returns: 
+            None 
+        '''
+        with self.component_cache_lock: 
+            self.action_tables.clear() 
+            self.action_table_version += 1 
+
+    def get_action_table(self, location, component): 
+        ''' 
+        [summary] FOR SIMULATION USE ONLY. returns every action that a simulated vole can take from <component> within <location>, along with any probabilities that the location assigned to those actions. 
+                  tables are built once per location and shared by every vole, and only get rebuilt after the location's components or action probabilities change. 
+        Args: 
+            location (Chamber | Edge) : the chamber or edge that the vole is in 
+            component (Component | ComponentSet | None) : the component that the vole is positioned at within the location 
+        Returns: 
+            (tuple) : (actions, weights) where actions is a tuple of (SimVole method name, argument) pairs, and weights is a tuple of the probability that the location assigned to each action ( None if it did not assign one ) 
+        '''
+        key = (location, component)
+        with self.component_cache_lock: 
+            table = self.action_tables.get(key)
+            if table is not None: 
+                return table 
+            version = self.action_table_version 
+
+        actions = [ ('sleep', 5) ] # option to do nothing is always available 
+
+        if component is not None: 
+            if hasattr(component, 'interactableSet'): 
+                # Unordered Set in a Chamber; option to interact w/ any of these interactables
+                for i in component.interactableSet: 
+                    actions.append( ('simulate_vole_interactable_interaction', i) )
+            else: 
+                # Ordered Component; option to interact w/ this interactable 
+                actions.append( ('simulate_vole_interactable_interaction', component.interactable) )
+
+        if location.edge_or_chamber == 'chamber': 
+            for i in location.allChamberInteractables: 
+                actions.append( ('move_to_interactable', i) )
+            for c_id in location.connections.keys(): 
+                actions.append( ('attempt_move', c_id) )
+        else: 
+            for c in location: 
+                actions.append( ('move_to_interactable', c.interactable) )
+            actions.append( ('attempt_move', location.v1) )
+            actions.append( ('attempt_move', location.v2) )
+
+        # Probabilities assigned by the location ( see Chamber.add_action_probabilities ) 
+        location_p = {} 
+        if location.action_probability_dist is not None: 
+            for (k, v) in location.action_probability_dist.items(): 
+                if k == 'sleep': 
+                    location_p[('sleep', 5)] = v 
+                elif getattr(k, 'edge_or_chamber', None) == 'chamber' and hasattr(k, 'connections'): # Chamber 
+                    location_p[('attempt_move', k.id)] = v 
+                else: # Interactable 
+                    location_p[('move_to_interactable', k)] = v 
+                    location_p[('simulate_vole_interactable_interaction', k)] = v 
+
+        table = ( tuple(actions), tuple( location_p.get(a) for a in actions ) )
+        with self.component_cache_lock: 
+            if version == self.action_table_version: # do not cache a table that was built while the location was changing 
+                self.action_tables[key] = table 
+        return table 
+
     # 
     # Chamber -- vertices in the graph
     #  
@@ -1369,6 +1747,10 @@ class Map:
             self.unorderedComponent = self.ComponentSet() # Contains the Unordered Components of a chamber! attribute set after map finishes setting up all chambers/edges and their interactables. 
             
             self.edgeReferences =  {} # Interactables referenced by an Edge! key: Edge that references the interactable, value: list of interactable objects that have a component object on that edge to specify ordering
+
+            self.on_components_changed = None # set by the Map so it can clear its cached component paths whenever this chamber's components change 
+
+            self.on_action_probabilities_changed = None # set by the Map so it can clear its cached action tables whenever this chamber's action probabilities change 
             
         class ComponentSet: 
             ''' 
@@ -1409,6 +1791,12 @@ class Map:
             '''
             self.unorderedComponent.set_interactables(self.unorderedSet)
             self.unorderedComponent_isSet = True 
+            self._components_changed() 
+
+        def _components_changed(self): 
+            ''' [summary] notifies the map (if it is listening) that the components in this chamber have changed '''
+            if self.on_components_changed is not None: 
+                self.on_components_changed() 
 
         def get_component_for_ordered_interactable(self, interactable): 
             ''' 
@@ -1521,6 +1909,8 @@ class Map:
                 self.edgeReferences[edge] += [interactable]
             else: 
                 self.edgeReferences[edge] = [interactable]
+            
+            self._components_changed() 
 
         def remove_interactable(self, interactable): 
             '''
@@ -1551,6 +1941,7 @@ class Map:
                         e.remove_component(interactable) # remove component from the edge 
                 self.orderedSet.remove(interactable)
             self.allChamberInteractables.remove(interactable)
+            self._components_changed() 
 
         def new_interactable(self, newinteractable): 
             '''
@@ -1576,11 +1967,11 @@ class Map:
             if self.unorderedComponent_isSet: 
                 # unordered component was already assigned the unordered set. manually add this new unordered component 
                 self.unorderedComponent.interactableSet.append(newinteractable)
+            self._components_changed() 
         
         def add_action_probabilities( self, actionobj_probability_dict ): 
             ''' 
-            [summary] (NOTE) THIS METHOD IS NOT IN USE, NEEDS TESTING BEFORE USE! 
-            FOR SIMULATION USE ONLY. Probability Tracking: tracking probabilties of some Action-Object getting chosen by a vole when a simulated vole is told to make random decisions. 
+            [summary] FOR SIMULATION USE ONLY. Probability Tracking: tracking probabilties of some Action-Object getting chosen by a vole when a simulated vole is told to make random decisions. 
             adds probabilites to certain actions, to decrease or increase the likelihood that a vole makes a certain move in a simulation. 
             provides extensvie error checking before assigning the probabilities to the possible actions from the current chamber. 
             Args: 
@@ -1590,7 +1981,7 @@ class Map:
             '''
 
             # Check that probabilities have been set for every value (the +1 is for the time.sleep() option)
-            if len(actionobj_probability_dict) != len(self.interactables) + len(self.connections) + 1: 
+            if len(actionobj_probability_dict) != len(self.allChamberInteractables) + len(self.connections) + 1: 
                 raise Exception(f'must set the probability value for all action objects (the connecting chambers and the interactables) within the chamber, as well as the "sleep" option (even if this means setting their probability to 0) ')
 
 
@@ -1600,21 +1991,23 @@ class Map:
                 if isinstance(k, type(self)): # type: Chamber 
                     if k.id not in self.connections.keys(): 
                         raise Exception(f'attempting to set the probability of moving to chamber{k.id}, which is not adjacent to chamber{self.id}, so cannot set its probability.') 
-                elif isinstance(k, type(self.interactables[0])): # type: Interactable 
-                    if k.id not in self.interactables: 
-                        raise Exception(f'attempting to set the probability of choosing interactable {k.id} which does not exist in chamber {self.id}, so cannot set its probability.')
+                elif isinstance(k, InteractableABC.interactableABC): # type: Interactable 
+                    if k not in self.allChamberInteractables: 
+                        raise Exception(f'attempting to set the probability of choosing interactable {k.name} which does not exist in chamber {self.id}, so cannot set its probability.')
                 elif k != 'sleep': # only remaining option is type=='sleep', throw error if it is not
                     raise Exception(f'{k} is an invalid object to set a probability for')
-                else: 
-                    p_sum += v
+                p_sum += v
 
 
             # check that the probability values sum to 1
-            if p_sum != 1: 
+            if abs(p_sum - 1) > 1e-9: 
                 raise Exception(f'the probabilities must sum to 1, but the given probabilities for chamber{self.id} summed to {p_sum}')
             
 
             self.action_probability_dist = actionobj_probability_dict
+
+            if self.on_action_probabilities_changed is not None: 
+                self.on_action_probabilities_changed() # voles rebuild their action tables for this chamber 
     
     #
     # EdgeComponents -- nodes within the linked list. Each node represents a Component, which contains an interactable object. 
@@ -1627,6 +2020,11 @@ class Map:
         Possible to add info on the "edges" that link two components. i.e. can assign values so we can identify where a vole sits relative to interactables w/in the linked list. 
         '''
 
+        def _components_changed(self): 
+            ''' [summary] notifies the map (if it is listening) that the components on this edge have changed '''
+            if getattr(self, 'on_components_changed', None) is not None: 
+                self.on_components_changed() 
+
         def component_exists(self, interactable): 
             '''
             [summary] beginning at the edge's headval, traverses the linked list to find the specified interactable. Returns True as soon as it locates the specified interactable.
@@ -1739,6 +2137,7 @@ class Map:
                     prevhead = self.headval 
                     self.headval = newComp
                     self.headval.nextval = prevhead
+                    self._components_changed() 
                     return self.headval
             
             else: 
@@ -1752,6 +2151,7 @@ class Map:
                 # update the components on either side of newComp to reflect changes
                 prevComp.nextval = newComp 
                 nxtComp.prevval = newComp 
+                self._components_changed() 
                 return newComp
         
         def remove_component(self, interactable): 
@@ -1780,6 +2180,7 @@ class Map:
                 nxtComp.prevval = prevComp 
 
             del remComp 
+            self._components_changed() 
             return 
         
         def reverse_components(self): 
@@ -1838,6 +2239,7 @@ class Map:
             self.type = type 
             self.edge_or_chamber = 'edge'
             self.headval = None # points to first component in linked list
+            self.on_components_changed = None # set by the Map so it can clear its cached component paths whenever this edge's components change 
             self.action_probability_dist = None # probabilities are optional; must be added after all interacables and chamber connections have been added. can be added thru function 'add_action_probabilities'
 
         def __str__(self): 
@@ -1881,6 +2283,7 @@ class Map:
 
             if self.headval is None: 
                 self.headval = newComp
+                self._components_changed() 
                 return newComp
             
             component = self.headval 
@@ -1893,6 +2296,7 @@ class Map:
             
             component.nextval = newComp # update list w/ new Component
             newComp.prevval = component # set new Component's previous component to allow for backwards traversal     
+            self._components_changed() 
             return newComp
 
     #
@@ -1941,8 +2345,97 @@ class Map:
             None 
         '''
         v = self.get_vole_by_rfid_id(tag)
-        v.prev_loc = v.curr_loc 
-        v.curr_loc = loc 
+        with self.occupancy_lock: 
+            v.prev_loc = v.curr_loc 
+            v.curr_loc = loc 
+            (indexed_loc, component) = self.vole_positions.get(v.tag, (None, None))
+            self._set_vole_position(v.tag, loc, component if indexed_loc == loc else None) # a ping only tells us the location, so keep a simulated vole's component if it is still in that location 
+
+    def move_vole(self, vole, loc, component): 
+        '''
+        [summary] moves a simulated vole to <component> within <loc>. The vole's location and component attributes and the occupancy index all get updated while holding the occupancy_lock, so no other thread ( e.g. the rfidListener ) sees one change without the other. 
+        Args: 
+            vole (SimVole) : the vole that moved 
+            loc (Chamber | Edge) : the chamber or edge the vole is now in 
+            component (Component | ComponentSet | None) : the component the vole is now positioned at 
+        Returns: 
+            (Chamber | Edge) : the vole's location before the move 
+        '''
+        with self.occupancy_lock: 
+            prev_loc = vole.curr_loc 
+            if prev_loc != loc: 
+                vole.prev_loc = prev_loc 
+            vole.curr_loc = loc 
+            vole.prev_component = vole.curr_component 
+            vole.curr_component = component 
+            self._set_vole_position(vole.tag, loc, component)
+        return prev_loc 
+
+    def set_vole_position(self, vole, loc, component = None): 
+        '''
+        [summary] updates the occupancy index so <vole> is only recorded at <loc> (and <component>, if provided). Called anytime a vole changes position. 
+        Args: 
+            vole (Vole | SimVole) : the vole that moved 
+            loc (Chamber | Edge) : the chamber or edge the vole is now in 
+            component (Component | ComponentSet, optional) : the component the vole is now positioned at. Only simulated voles track their component position. 
+        Returns: 
+            None 
+        '''
+        with self.occupancy_lock: 
+            self._set_vole_position(vole.tag, loc, component)
+    
+    def _set_vole_position(self, tag, loc, component = None): 
+        ''' [summary] helper function to set_vole_position, update_vole_location and move_vole. Caller must be holding the occupancy_lock. '''
+        prev = self.vole_positions.get(tag, ())
+        for key in prev: 
+            if key in self.occupancy: 
+                self.occupancy[key].discard(tag)
+        self.vole_positions[tag] = (loc, component)
+        if len(prev) > 0 and prev[0] is not None and prev[0] != loc: 
+            self.location_changed(prev[0])
+        if loc is not None: 
+            self.location_changed(loc)
+        for key in (loc, component): 
+            if key is not None: 
+                self.occupancy.setdefault(key, set()).add(tag)
+
+    def remove_vole_position(self, tag): 
+        '''
+        [summary] removes a vole from the occupancy index ( e.g. when the vole is removed from the experiment )
+        Args: 
+            tag (int) : the vole's identifier value 
+        Returns: 
+            None 
+        '''
+        with self.occupancy_lock: 
+            prev = self.vole_positions.pop(tag, ())
+            for key in prev: 
+                if key in self.occupancy: 
+                    self.occupancy[key].discard(tag)
+            if len(prev) > 0 and prev[0] is not None: 
+                self.location_changed(prev[0])
+
+    def voles_at(self, location): 
+        '''
+        [summary] returns the tags of all voles at a chamber, edge, or component. Looks up the occupancy index, so does not need to loop through all of the voles. 
+        Args: 
+            location (Chamber | Edge | Component | ComponentSet) : the location to check 
+        Returns: 
+            (frozenset) : tags of the voles currently at <location> 
+        '''
+        with self.occupancy_lock: 
+            return frozenset(self.occupancy.get(location, ()))
+    
+    def is_empty(self, location): 
+        '''
+        [summary] checks if there are any voles at a chamber, edge, or component 
+        Args: 
+            location (Chamber | Edge | Component | ComponentSet) : the location to check 
+        Returns: 
+            (Boolean) : True if no voles are at <location>, False otherwise 
+        '''
+        with self.occupancy_lock: 
+            return len(self.occupancy.get(location, ())) == 0
 
     def get_vole(self, tag): 
         '''
@@ -1984,6 +2477,7 @@ class Map:
         # ensure vole does not already exist 
         if self.get_vole(tag) is not None: 
             print(f'you are trying to create a vole with the tag {tag} twice')
+            if not self.interactive: return # skip creating this vole 
             inp = input(f'Would you like to skip the creating of this vole and continue running the experiment? If no, the experiment will stop running immediately. Please enter: "y" or "n". ')
             if inp is 'y': return 
             if inp is 'n': sys.exit(0)
@@ -1993,6 +2487,7 @@ class Map:
         if rfid_id is not None and self.get_vole_by_rfid_id(rfid_id) is not None: 
             # sim_log(f'vole with rfid_id {rfid_id} already exists')
             print(f'you are trying to create a vole with the rfid_id {rfid_id} twice')
+            if not self.interactive: return # skip creating this vole 
             inp = input(f'Would you like to skip the creating of this vole and continue running the simulation? If no, the simulation and experiment will stop running immediately. Please enter: "y" or "n". ')
             if inp == 'y': return 
             elif inp == 'n': sys.exit(0)
@@ -2003,6 +2498,8 @@ class Map:
             # control_log(f'trying to place vole {tag} in a nonexistent chamber #{start_chamber}.')
             print(f'trying to place vole {tag} in a nonexistent chamber #{start_chamber}.')
             print(f'existing chambers: ', self.graph.keys())
+            if not self.interactive: 
+                raise Exception(f'(Map.py, new_vole) trying to place vole {tag} in a nonexistent chamber #{start_chamber}. Existing chambers: {list(self.graph.keys())}')
             while chmbr is None: 
                 ans = input(f'enter "q" if you would like to exit the experiment, or enter the id of a different chamber to place this vole in.\n')
                 if ans == 'q': exit() 
@@ -2014,4 +2511,5 @@ class Map:
         # Create new Vole 
         newVole = self.Vole(tag, start_chamber, rfid_id, self)
         self.voles.append(newVole)
+        self.set_vole_position(newVole, newVole.curr_loc)
         return newVole
\ No newline at end of file
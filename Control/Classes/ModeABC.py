@@ -25,6 +25,9 @@ from abc import abstractmethod, ABCMeta
 
 # Local Imports
 from .InteractableABC import rfid
+from .Clock import CLOCK
+from .Threads import threaded, start_thread
+from .Profiler import SamplingProfiler
 from Logging.logging_specs import control_log
 
 
@@ -53,6 +56,7 @@ class modeABC(metaclass = ABCMeta):
         self.current_round = 0 
         self.ITI = ITI 
         self.inTimeout = False 
+        self.errors = [] # exceptions raised while the mode ( or any inner mode that it entered ) was running, so whoever entered the mode can tell that it did not run to completion 
         if output_fp is None: 
             self.output_fp = self.generate_output_file()
         else: self.output_fp = output_fp
@@ -74,15 +78,6 @@ class modeABC(metaclass = ABCMeta):
     def __str__(self): 
         return __name__
 
-    def threader(func):
-        ''' decorator function to run function on its own daemon thread '''
-        def run(*k, **kw): 
-            t = threading.Thread(target = func, args = k, kwargs=kw, daemon=True)
-            t.name = func.__name__
-            t.start() 
-            return t
-        return run 
-    
     def generate_output_file(self): 
         '''
         sets self.output_fp to a filepath generated by compiling the date/time of running and the name of the experiment 
@@ -113,7 +108,7 @@ class modeABC(metaclass = ABCMeta):
     #
     # Enter Method: hanldes mode setup and startup - This method ensures that any inner modes get run also.
     #
-    def enter(self, initial_enter = True):
+    def enter(self, initial_enter = True, profile = None, profile_rounds = False):
         """
         [summary] Enter Method: handles mode setup and startup. Modes can be entered from another mode (called inner modes) or directly from __main__ (called initial mode)
                     Ensures the mode will run for only its timeout interval, and that it exits cleanly. 
@@ -124,16 +119,25 @@ class modeABC(metaclass = ABCMeta):
             initial_enter (Boolean) : If mode enters directly from __main__, sets to True. If mode enters from another mode, sets to False. 
                                     If initial enter is True, executes extra logic to set attributes and activate the interactables and event manager. 
                                     On exiting, the mode with initial_enter set to True will execute extra logic to deactivate the interactables and event manager. 
+            profile (float, optional) : if provided, samples the stacks of every thread every <profile> seconds while the mode runs ( see Profiler.py ), and writes them to <output file>_profile.folded for building a flame graph. 
+                                    Inner modes get sampled as part of the mode that entered them. 
+            profile_rounds (Boolean, optional) : if True ( and profile is set ), writes the samples from each round to its own <output file>_round<n>_profile.folded instead. The first round's file includes the mode's setup, and the last round's file includes its exit. 
         Returns:
             None 
         """
+        profiler = None 
+        if profile is not None: 
+            profiler = SamplingProfiler(interval = profile) 
+            profiler.start() 
         try: 
+            self.event_manager.publish(self, 'entered')
+
             if initial_enter: 
 
                 ### Parent Mode (the mode that is created in __main__ rather than by another mode): Set attributes and activate interactables before runnning mode. 
 
                 # Set Start Time now that Mode has been entered and interactables activated 
-                self.startTime = time.time()
+                self.startTime = CLOCK.time()
 
                 print(f'\nnew mode entered: {self}') # print to console 
                 # control_log(f'New Mode Entered: {self}')
@@ -159,17 +163,22 @@ class modeABC(metaclass = ABCMeta):
 
             ## Mode Startup: Setup & Run 
 
-            self.event_manager.new_timestamp(event_description='Mode_Setup', time=time.time())
+            self.event_manager.new_timestamp(event_description='Mode_Setup', time=CLOCK.time())
             
             try: self.setup() # Mode Prep ( Runs in Separate Thread so we can still catch any Interrupts )
             except Exception as e: 
                 print('(ModeABC.py, enter()) Exception Thrown in call to mode setup()): ', e)
+                self.errors.append(f'{self} setup(): {e!r}')
             
             self.active = True # mark this mode as being active, triggering a simulation to start running, if a simulation exists
+            self.event_manager.publish(self, 'setup_done')
             self.rfidListener() # starts up listener that checks the shared_rfidQ ( if no rfids are present, returns immediately ) --> Relies on the mode being active! 
 
             for idx in range(1, rounds+1): # Initial mode of the round dictates how many rounds there will be. Any "inner" mode will run once each round. 
 
+                if profiler is not None and profile_rounds and idx > 1: 
+                    profiler.write(self.profile_filepath(idx-1), reset = True) # previous round's file includes its setup or inter-trial interval 
+
                 if initial_enter: 
                     # Parent Mode iterates its index, and will dictate the round number for all child modes. 
                     self.current_round = idx 
@@ -179,6 +188,7 @@ class modeABC(metaclass = ABCMeta):
 
                 # Starting Mode Timeout and Running the Start() Method of the Mode Script!
                 self.inTimeout = True 
+                self.event_manager.publish(self, 'timeout_started') # simulation starts running now 
                 try: 
                     if self.timeout is not None: 
                         self.countdown_to_exit() # if a timeout was provided, calls method that will exit after timeout finishes
@@ -187,12 +197,13 @@ class modeABC(metaclass = ABCMeta):
                     if self.timeout is not None: 
                         # sleep until countdown_to_exit calls the exit function
                         while self.inTimeout: 
-                            time.sleep(1)
+                            CLOCK.sleep(1)
                     else: self.exit() 
 
                 except Exception as e: 
                     print(e)
                     print(f'{str(self)} encountered an error during its run() or exit() function. Returning now.')
+                    self.errors.append(f'{self} run(): {e!r}')
                     return 
 
                 if next_mode is not None: # A mode object was returned. Start the inner mode. 
@@ -202,6 +213,7 @@ class modeABC(metaclass = ABCMeta):
                     # print(f'MODE W/IN A MODE: Transferring Control to {str(next_mode)} for round {idx}')
                     next_mode.current_round = idx # to keep round numbers consistent, manually set the round number. ( Otherwise round will be set back to 1 in the output file )
                     next_mode.enter(initial_enter=False) # Recursively call enter() on next mode! 
+                    self.errors.extend(next_mode.errors)
             
                 if initial_enter is False: 
                     # if Inner mode, only run once so break out of loop immediately. 
@@ -222,8 +234,21 @@ class modeABC(metaclass = ABCMeta):
             ''' if any errors/exceptions get raised, code will fall into this except statement where we can ensure nothing gets left running '''
             print(e) # printing exception message
             traceback.print_exc() # printing stack trace 
+            self.errors.append(f'{self}: {e!r}')
             self._except_handler()
 
+        finally: 
+            if profiler is not None: 
+                profiler.stop() 
+                profiler.write(self.profile_filepath(self.current_round if profile_rounds else None)) 
+
+    def profile_filepath(self, round = None): 
+        ''' returns where enter() writes the profiler's samples: next to the output csv file, ending in _profile.folded ( or _round<n>_profile.folded if profiling each round ) '''
+        base = os.path.splitext(self.output_fp)[0] 
+        if round is not None: 
+            base += f'_round{round}' 
+        return base + '_profile.folded' 
+
     #
     # Exiting/Cleanup Functions
     #
@@ -232,7 +257,7 @@ class modeABC(metaclass = ABCMeta):
         Not in use, but potentially use if I decide to change the 
         canbus and rfid listener so they stay active 100% of the time"""
         self.inTimeout = False 
-        self.simulation_lock.acquire() 
+        CLOCK.acquire(self.simulation_lock) 
         self.simulation_lock.release() 
 
     def new_round(self, mode_thread=None): 
@@ -248,19 +273,22 @@ class modeABC(metaclass = ABCMeta):
         ''' called inbetween rounds of the same mode to pause for a inter trial interval '''
         self.inTimeout = False # should cause simulation to exit 
         self.active = False # should cause mode to exit 
+        self.event_manager.publish(self, 'exiting')
 
         # Ensure Simulation Thread ( if it exists ) Cleanly Exits Before we continue 
-        self.simulation_lock.acquire() 
+        CLOCK.acquire(self.simulation_lock) 
         self.simulation_lock.release()
+        self.event_manager.publish(self, 'exited')
 
         # Ensure Mode Thread Cleanly Exits before we continue 
-        if mode_thread is not None: mode_thread.join()
+        if mode_thread is not None: CLOCK.join(mode_thread)
 
         ''' Inter-Trial Time Pauses Here '''
         self.event_manager.new_countdown(event_description = f'Inter-Trial Interval', duration = self.ITI, primary_countdown = True)
 
         self.inTimeout=True 
         self.active = True 
+        self.event_manager.publish(self, 'timeout_started')
 
     def exit(self): 
         """
@@ -270,10 +298,13 @@ class modeABC(metaclass = ABCMeta):
         print(f"{self} finished its Timeout Period and is now Exiting")
         self.inTimeout = False # Should cause simulation to exit 
         self.active = False 
+        self.event_manager.publish(self, 'exiting')
 
         # Waits on Sim to reach clean exiting point # 
-        self.simulation_lock.acquire() # if sim is running, wait for lock to ensure that it exits cleanly
+        CLOCK.acquire(self.simulation_lock) # if sim is running, wait for lock to ensure that it exits cleanly
         self.simulation_lock.release() # immediately release so next sim can use it 
+        self.event_manager.publish(self, 'exited')
+        self.event_manager.dump_metrics() 
 
         return 
     
@@ -285,10 +316,13 @@ class modeABC(metaclass = ABCMeta):
         """
         self.inTimeout = False # Should cause simulation to exit 
         self.active = False 
+        self.event_manager.publish(self, 'exiting')
 
         # Waits on Sim to reach clean exiting point # 
-        self.simulation_lock.acquire() # if sim is running, wait for lock to ensure that it exits cleanly
+        CLOCK.acquire(self.simulation_lock) # if sim is running, wait for lock to ensure that it exits cleanly
         self.simulation_lock.release() # immediately release so next sim can use it 
+        self.event_manager.publish(self, 'exited')
+        self.event_manager.dump_metrics() 
         # Deactivate Interactables and Event Manager
         self.map.deactivate_interactables(clear_threshold_queue = True) # empties the interactable's threshold event queue and sets active = False
         self.event_manager.deactivate() # Stop Event Tracking for this Mode 
@@ -296,8 +330,7 @@ class modeABC(metaclass = ABCMeta):
     def _interrupt_handler(self, signal, frame): 
         ''' catches interrupt, notifies threads, attempts a clean exit ''' 
         # In a different thread, handle shutting down the event manager. In the calling thread, continue execution to deactivate interactables. 
-        event_interrupt_thread = threading.Thread(target=self.event_manager.interrupt, daemon=True)
-        event_interrupt_thread.start()
+        event_interrupt_thread = start_thread(self.event_manager.interrupt, subsystem = 'mode', owner = self, purpose = 'interrupt', clocked = False)
         print(f'(ModeABC, _interrupt_handler) Deactivating Interactables')
         self.map.deactivate_interactables() # shuts off all of the hardware interactables
         event_interrupt_thread.join()
@@ -312,7 +345,7 @@ class modeABC(metaclass = ABCMeta):
     #
     # Rfid Listener - Retrieves items added to the shared_rfidQ 
     #
-    @threader
+    @threaded('mode', 'rfid_listener')
     def rfidListener(self):
         """This method listens to the rfid queue and waits until something is added there. (running as daemon thread)
         """
@@ -354,7 +387,7 @@ class modeABC(metaclass = ABCMeta):
                     ping = self.shared_rfidQ.get(block = False) # waits to see if anything is added to Queue 
                 except queue.Empty: 
                     ping = None 
-                    time.sleep(.25)
+                    CLOCK.sleep(.25)
 
 
             # Mode Deactivated #
@@ -402,16 +435,7 @@ class modeABC(metaclass = ABCMeta):
         ''' [REQUIRES METHOD OVERRIDE] any tasks for setting up box before run() gets called '''
         raise NameError(f'{__name__} this function should be overriden')
 
-    def threader(func):
-        ''' decorator function to run function on its own daemon thread '''
-        def run(*k, **kw): 
-            t = threading.Thread(target = func, args = k, kwargs=kw, daemon=True)
-            t.name = func.__name__
-            t.start() 
-            return t
-        return run 
-
-    @threader
+    @threaded('mode', 'mode_timeout')
     def countdown_to_exit(self): 
         """[summary] if a mode timeout is specified, this method is called to ensure that as soon as timeout finishes the mode will begin its exit process """
         self.event_manager.new_countdown(event_description = f"Mode_Timeout_Round_{self.current_round}", duration = self.timeout, primary_countdown = True)
@@ -0,0 +1,155 @@
+"""
+Description: Class definition for SamplingProfiler, a statistical profiler that needs nothing but the standard library, so it can run on the Pi during a real session.
+            A daemon thread wakes up every <interval> seconds, reads the current stack of every thread with sys._current_frames(), and counts how many times each stack was seen.
+            The counts are written in the collapsed stack format ( one "thread;outer frame;...;inner frame count" line per stack ), which flamegraph.pl, speedscope and inferno can all turn into a flame graph.
+            Modes opt in with mode.enter(profile = <interval>) ( see ModeABC.enter ), which writes <output file>_profile.folded next to the mode's output csv.
+
+Property of Donaldson Lab at the University of Colorado at Boulder
+"""
+
+# Standard Lib Imports
+import os
+import sys
+import time
+import types
+import threading
+from collections import Counter
+
+# Local Imports
+from .Threads import start_thread
+
+
+# frames that every thread starts with ( threading's bootstrap and the Threads.start_thread wrapper ). Left out of the stacks, since they show up under every thread.
+THREAD_ENTRY = { threading.Thread._bootstrap.__code__, threading.Thread._bootstrap_inner.__code__, threading.Thread.run.__code__ } | { c for c in start_thread.__code__.co_consts if isinstance(c, types.CodeType) }
+
+
+class SamplingProfiler:
+    ''' [Description]
+    samples the stacks of every thread in the process. By default a thread only gets sampled if it used CPU time since the previous sample, so threads that are blocked waiting on a queue, lock or sleep do not bury the busy ones.
+    Sampling runs on real time ( not the experiment CLOCK ), since it measures what the processor is doing.
+    '''
+
+    def __init__(self, interval = 0.005, include_idle = False, max_depth = 128):
+        """
+        Args:
+            interval (float, optional) : seconds between samples
+            include_idle (Boolean, optional) : if True, every thread gets sampled every time, which shows where threads spend their wall clock time ( including waiting ) rather than their CPU time
+            max_depth (int, optional) : stacks deeper than this get cut off at the innermost <max_depth> frames
+        """
+        if interval <= 0:
+            raise Exception(f'(Profiler.py, SamplingProfiler) interval must be greater than 0, but was passed {interval}')
+        self.interval = interval
+        self.include_idle = include_idle
+        self.max_depth = max_depth
+        self.stacks = Counter() # { (thread name, outer frame, ..., inner frame) : number of samples }
+        self.samples = 0 # number of times that the stacks were read
+        self.sampling_time = 0.0 # seconds spent taking samples, to show the profiler's own overhead
+        self.labels = {} # { code object : frame label } so each function only gets formatted once
+        self.cpu_clocks = {} # { thread ident : (cpu clock id, cpu time at the last sample) }
+        self.lock = threading.Lock()
+        self.thread = None
+        self.stopped = threading.Event()
+
+    def __str__(self):
+        return f'SamplingProfiler({self.samples} samples, {len(self.stacks)} stacks)'
+
+    def start(self):
+        ''' [summary] starts sampling on a daemon thread. Does nothing if the profiler is already running. '''
+        if self.thread is not None and self.thread.is_alive():
+            return
+        self.stopped.clear()
+        self.thread = start_thread(self.run, subsystem = 'profiler', owner = self, purpose = 'sampler', clocked = False)
+
+    def stop(self):
+        ''' [summary] stops sampling, and waits for the sampling thread to finish its current sample '''
+        self.stopped.set()
+        if self.thread is not None and self.thread is not threading.current_thread():
+            self.thread.join()
+        self.thread = None
+
+    def run(self):
+        ''' [summary] sampling thread. Sleeps until the next sample is due, so a slow sample does not push every later sample back. '''
+        next_sample = time.monotonic()
+        while not self.stopped.is_set():
+            start = time.monotonic()
+            self.sample()
+            self.sampling_time += time.monotonic() - start
+            next_sample = max(next_sample + self.interval, time.monotonic())
+            self.stopped.wait(next_sample - time.monotonic())
+
+    def label(self, code):
+        ''' [summary] returns the label for a frame, e.g. "run (Box_Dynamic.py:120)" where 120 is the line that the function starts on '''
+        label = self.labels.get(code)
+        if label is None:
+            name = getattr(code, 'co_qualname', code.co_name)
+            label = f'{name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})'.replace(';', ':')
+            self.labels[code] = label
+        return label
+
+    def active(self, ident):
+        ''' [summary] True if thread <ident> used CPU time since the last sample. Threads whose CPU clock cannot be read always count as active. '''
+        try:
+            (clock, last) = self.cpu_clocks.get(ident) or (time.pthread_getcpuclockid(ident), None)
+            cpu = time.clock_gettime(clock)
+        except (AttributeError, OSError):
+            return True
+        self.cpu_clocks[ident] = (clock, cpu)
+        return last is None or cpu > last
+
+    def sample(self):
+        ''' [summary] reads the current stack of every thread ( other than the sampling thread ) and counts it '''
+        frames = sys._current_frames()
+        names = { t.ident: t.name for t in threading.enumerate() }
+        me = threading.get_ident()
+        counted = []
+        for (ident, frame) in frames.items():
+            if ident == me or not ( self.include_idle or self.active(ident) ):
+                continue
+            stack = []
+            while frame is not None and len(stack) < self.max_depth:
+                if frame.f_code not in THREAD_ENTRY:
+                    stack.append(self.label(frame.f_code))
+                frame = frame.f_back
+            stack.append(names.get(ident, f'thread-{ident}').replace(';', ':'))
+            stack.reverse()
+            counted.append(tuple(stack))
+        del frames # frames keep every local variable alive, so drop them right away
+        for ident in [ i for i in self.cpu_clocks if i not in names ]:
+            del self.cpu_clocks[ident] # thread finished
+        with self.lock:
+            self.samples += 1
+            self.stacks.update(counted)
+
+    def collapsed(self, reset = False):
+        '''
+        [summary] returns the samples in the collapsed stack format
+        Args:
+            reset (Boolean, optional) : if True, clears the samples after reading them ( e.g. to profile each round separately )
+        Returns:
+            ([string]) : one "thread;outer frame;...;inner frame count" line per stack, most sampled first
+        '''
+        with self.lock:
+            stacks = self.stacks
+            if reset:
+                (self.stacks, self.samples, self.sampling_time) = (Counter(), 0, 0.0)
+        return [ f'{";".join(stack)} {count}' for (stack, count) in stacks.most_common() ]
+
+    def write(self, filepath, reset = False):
+        '''
+        [summary] writes the samples to <filepath> in the collapsed stack format
+        Args:
+            filepath (string) : where to write the samples, e.g. <output file>_profile.folded
+            reset (Boolean, optional) : if True, clears the samples after writing them
+        Returns:
+            (string | None) : the filepath that was written, or None if it could not be written
+        '''
+        (samples, overhead) = (self.samples, self.sampling_time)
+        lines = self.collapsed(reset = reset)
+        try:
+            with open(filepath, 'w') as file:
+                file.write('\n'.join(lines) + ('\n' if lines else ''))
+        except OSError as e:
+            print(f'(Profiler.py, write) could not write profile to {filepath}: {e}')
+            return None
+        print(f'(Profiler.py, write) {samples} samples ({overhead:.3f}s spent sampling) written to {filepath}')
+        return filepath
@@ -0,0 +1,153 @@
+"""
+Description: Class definition for Scheduler, a single daemon thread that runs callbacks once their delay has passed.
+            Hardware interactables use the shared scheduler to drive their motions ( e.g. stopping a door's servo once the door has had time to open ) rather than having the calling thread sleep or poll until the motion is done.
+            Timers run in real time, like the hardware that they control, regardless of which clock the experiment is using. ClockedScheduler runs its timers on the CLOCK instead, for simulated hardware that has to keep time with the experiment.
+
+Property of Donaldson Lab at the University of Colorado at Boulder
+"""
+
+# Standard Lib Imports
+import time
+import heapq
+import itertools
+import threading
+import concurrent.futures
+
+# Local Imports
+from .Clock import CLOCK
+from .Threads import start_thread
+
+
+def completed_future(result = None):
+    ''' [summary] returns a concurrent.futures.Future that is already finished with <result>, for methods that return a Future but had nothing to wait on '''
+    future = concurrent.futures.Future()
+    future.set_result(result)
+    return future
+
+
+class Timer:
+    ''' [Description] handle for a callback that was scheduled with Scheduler.call_later(). Can be cancelled up until the callback starts running. '''
+
+    def __init__(self, deadline, fn, args):
+        self.deadline = deadline # time.monotonic() that the callback is due at
+        self.fn = fn
+        self.args = args
+        self.cancelled = False
+
+    def __str__(self):
+        return f'Timer({self.fn.__name__}, due in {max(self.deadline - time.monotonic(), 0):.3f}s)'
+
+    def cancel(self):
+        ''' [summary] stops the callback from running, if it has not started yet '''
+        self.cancelled = True
+
+
+class Scheduler:
+    ''' [Description]
+    heap of timers that is run by a single daemon thread. Callbacks run one at a time on the scheduler's thread, so they should only do a small amount of work ( e.g. change a servo speed and resolve a Future ) and must never block.
+    '''
+
+    _shared = None
+    _shared_lock = threading.Lock()
+    clocked = False # if the scheduler's thread gets scheduled by the CLOCK ( see start_thread )
+
+    def __init__(self, name = 'scheduler'):
+        """
+        Args:
+            name (string, optional) : name of the scheduler's thread. The thread gets started the first time that a callback is scheduled.
+        """
+        self.name = name
+        self.timers = [] # heap of (deadline, sequence num, Timer)
+        self.sequence = itertools.count() # tie breaker so timers with the same deadline run in the order that they were scheduled
+        self.cond = threading.Condition()
+        self.thread = None
+
+    def __str__(self):
+        return f'Scheduler({self.name}, {len(self.timers)} timers)'
+
+    @classmethod
+    def shared(cls):
+        ''' [summary] returns the scheduler that is shared by every interactable, creating it on first use '''
+        with cls._shared_lock:
+            if cls._shared is None:
+                cls._shared = cls()
+            return cls._shared
+
+    def call_later(self, delay, fn, *args):
+        '''
+        [summary] schedules fn(*args) to run on the scheduler's thread once <delay> seconds have passed
+        Args:
+            delay (float) : seconds of real time to wait before running the callback
+            fn (function) : the callback
+            args : arguments passed to the callback
+        Returns:
+            (Timer) : handle that can be used to cancel the callback
+        '''
+        timer = Timer(self.now() + max(delay, 0), fn, args)
+        with self.cond:
+            heapq.heappush(self.timers, (timer.deadline, next(self.sequence), timer))
+            if self.thread is None:
+                self.thread = start_thread(self.run, subsystem = 'scheduler', owner = self, purpose = 'timers', clocked = self.clocked) # the shared scheduler runs in real time, like the hardware that it times
+            self.cond.notify()
+        return timer
+
+    def now(self):
+        ''' [summary] the time that timer deadlines are measured in '''
+        return time.monotonic()
+
+    def call_soon(self, fn, *args):
+        ''' [summary] schedules fn(*args) to run on the scheduler's thread as soon as possible '''
+        return self.call_later(0, fn, *args)
+
+    def run(self):
+        ''' [summary] loops forever, waiting until the earliest timer is due and then running its callback '''
+        while True:
+            with self.cond:
+                while len(self.timers) == 0:
+                    self.cond.wait()
+                wait = self.timers[0][0] - time.monotonic()
+                if wait > 0:
+                    self.cond.wait(wait) # woken early if a timer with an earlier deadline gets scheduled
+                    continue
+                (_, _, timer) = heapq.heappop(self.timers)
+            if timer.cancelled:
+                continue
+            try:
+                timer.fn(*timer.args)
+            except Exception as e:
+                print(f'(Scheduler.py, run) {timer.fn.__name__}{timer.args} raised an exception: {e!r}')
+
+
+class ClockedScheduler(Scheduler):
+    ''' [Description]
+    Scheduler whose timers run on the CLOCK rather than in real time, for simulated hardware ( e.g. the SimTroughSensor ). With a VirtualClock its thread takes turns with the rest of the experiment, so the timers fire at the same experiment time on every run.
+    The thread exits whenever it runs out of timers, and gets started again by the next call_later, so it does not outlive the clock that it was started on.
+    '''
+
+    clocked = True
+
+    def __init__(self, name = 'clocked_scheduler'):
+        super().__init__(name)
+
+    def now(self):
+        return CLOCK.monotonic()
+
+    def run(self):
+        ''' [summary] runs each timer's callback once it is due, until there are no timers left '''
+        while True:
+            with self.cond:
+                if len(self.timers) == 0:
+                    self.thread = None
+                    return
+                (deadline, sequence, _) = self.timers[0]
+            # wait through the CLOCK until the earliest timer is due, or until an earlier timer gets scheduled. ( the timer counts as due once the wait times out, rather than comparing the deadline again, which can come up a rounding error short )
+            if deadline > self.now() and CLOCK.wait_until(lambda: self.timers[0][1] != sequence, deadline - self.now()):
+                continue
+            with self.cond:
+                (_, _, timer) = heapq.heappop(self.timers)
+            if timer.cancelled:
+                continue
+            try:
+                timer.fn(*timer.args)
+            except Exception as e:
+                print(f'(Scheduler.py, run) {timer.fn.__name__}{timer.args} raised an exception: {e!r}')
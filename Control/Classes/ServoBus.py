@@ -0,0 +1,253 @@
+"""
+Description: Class definitions for sending servo commands to the PCA9685 servo board ( adafruit_servokit.ServoKit ) from a single thread.
+            Each servo write is its own I2C transaction, so rather than every interactable writing to the ServoKit from whichever thread it is running on, writes get queued on a ServoBus.
+            The ServoBus's worker thread is the only thread that talks to the board. If a channel gets written to again before its last value went out, only the newest value gets sent ( e.g. a door that gets stopped right after it was told to close ).
+            Interactables use a ServoChannel in place of the ServoKit's servo object, so setting servo.angle or servo.throttle works the same as before.
+            FakeServoKit stands in for the ServoKit when there is no servo board ( e.g. for benchmarks ).
+
+Property of Donaldson Lab at the University of Colorado at Boulder
+"""
+
+# Standard Lib Imports
+import time
+import threading
+import concurrent.futures
+
+# Local Imports
+from .Instrumentation import Metrics
+from .Threads import start_thread
+
+
+class FakeServoKit:
+    ''' [Description]
+    stand-in for adafruit_servokit.ServoKit that records the values written to each channel rather than sending them to a servo board. Each write takes <write_latency> seconds, to stand in for the I2C transaction.
+    '''
+
+    class Channel:
+        ''' a single channel on the fake board. Has both an angle and a throttle so it can stand in for a positional or a continuous servo. '''
+        def __init__(self, kit, index):
+            self.kit = kit
+            self.index = index
+            self._angle = None
+            self._throttle = 0
+
+        @property
+        def angle(self):
+            return self._angle
+
+        @angle.setter
+        def angle(self, value):
+            self.kit.write(self, 'angle', value)
+
+        @property
+        def throttle(self):
+            return self._throttle
+
+        @throttle.setter
+        def throttle(self, value):
+            self.kit.write(self, 'throttle', value)
+
+    def __init__(self, channels = 16, write_latency = 0.0003):
+        """
+        Args:
+            channels (int, optional) : number of channels on the fake board
+            write_latency (float, optional) : seconds that each write takes. Defaults to roughly the time of a single write to a PCA9685 over a 400kHz I2C bus.
+        """
+        self.write_latency = write_latency
+        self.channels = [ self.Channel(self, i) for i in range(channels) ]
+        self.servo = self.channels
+        self.continuous_servo = self.channels
+        self.writes = 0 # number of writes that reached the board
+        self.lock = threading.Lock() # a real board would get corrupted writes if two threads wrote at once, so the fake serializes them
+
+    def __str__(self):
+        return f'FakeServoKit({len(self.channels)} channels, {self.writes} writes)'
+
+    def write(self, channel, attr, value):
+        with self.lock:
+            if self.write_latency > 0:
+                time.sleep(self.write_latency)
+            setattr(channel, '_' + attr, value)
+            self.writes += 1
+
+
+class ServoBus:
+    ''' [Description]
+    owns the ServoKit and is the only thing that writes to it. Writes get queued and are sent by a single daemon worker thread, so servo commands from different threads can no longer interleave on the I2C bus.
+    Writes to a ( channel, attribute ) that still has a value waiting to be sent replace that value rather than queueing a second write.
+    '''
+
+    SERVO_TYPES = ('positional', 'continuous')
+
+    class GroupWrite:
+        ''' tracks the writes from a single call to move_group(), and finishes its Future once every one of them has been sent '''
+        def __init__(self, count):
+            self.future = concurrent.futures.Future()
+            self.remaining = count
+            self.error = None
+            if count == 0:
+                self.future.set_result(True)
+
+        def sent(self, error = None):
+            ''' (called by the worker thread) one of the group's writes was sent, or failed with <error> '''
+            if error is not None:
+                self.error = error
+            self.remaining -= 1
+            if self.remaining == 0:
+                if self.error is None: self.future.set_result(True)
+                else: self.future.set_exception(self.error)
+
+    def __init__(self, kit, name = 'servo_bus'):
+        """
+        Args:
+            kit (ServoKit | FakeServoKit) : the servo board. The worker thread gets started the first time that a write is queued.
+            name (string, optional) : name of the worker thread
+        """
+        self.kit = kit
+        self.name = name
+        self.pending = {} # { (servo type, channel, attribute) : (value, [GroupWrite], time.perf_counter() that it was first queued) } writes that have not been sent yet, in the order they were first queued
+        self.channels = {} # { (servo type, channel) : ServoChannel }
+        self.sending = False # True while the worker thread is sending a batch of writes
+        self.cond = threading.Condition()
+        self.thread = None
+
+        self.requested = 0 # number of writes that were queued
+        self.sent = 0 # number of writes that were sent to the board
+        self.coalesced = 0 # number of writes that got replaced by a newer value before they were sent
+        self.metrics = Metrics(name) # how long each write waits in the queue, and how long it takes to send
+
+    def __str__(self):
+        return f'ServoBus({self.sent}/{self.requested} writes sent, {self.coalesced} coalesced)'
+
+    def channel(self, servo_type, pin):
+        '''
+        [summary] returns the ServoChannel for a pin on the board, creating it the first time that the pin is used
+        Args:
+            servo_type (string) : "positional" or "continuous"
+            pin (int) : channel on the servo board
+        Returns:
+            (ServoChannel) : proxy that queues writes to the channel on this bus
+        '''
+        if servo_type not in self.SERVO_TYPES:
+            raise KeyError(f'(ServoBus.py, channel) servo type was passed as {servo_type}, must be either "positional" or "continuous"')
+        key = (servo_type, pin)
+        with self.cond:
+            if key not in self.channels:
+                self._target(servo_type, pin) # raises if the pin does not exist on the board
+                self.channels[key] = ServoChannel(self, servo_type, pin)
+            return self.channels[key]
+
+    def _target(self, servo_type, pin):
+        ''' [summary] returns the ServoKit's own servo object for <pin> '''
+        if servo_type == 'positional':
+            return self.kit.servo[pin]
+        return self.kit.continuous_servo[pin]
+
+    def write(self, servo_type, pin, attr, value):
+        ''' [summary] queues a single write. Returns a Future that finishes once the value ( or a newer value for the same channel ) has been sent to the board. '''
+        return self.move_group([ (servo_type, pin, attr, value) ])
+
+    def move_group(self, moves):
+        '''
+        [summary] queues writes to several channels at once. The whole group gets sent together, in a single pass of the worker thread, so the servos start moving at (nearly) the same time.
+        Args:
+            moves ([ (servo type, pin, attribute, value) ]) : the writes to send, where attribute is "angle" or "throttle"
+        Returns:
+            (Future) : finishes once every write in the group has been sent to the board
+        '''
+        keys = {}
+        for (servo_type, pin, attr, value) in moves:
+            keys[(servo_type, pin, attr)] = value # the last value wins if a group writes to the same channel twice
+        group = self.GroupWrite(len(keys))
+        if len(keys) == 0:
+            return group.future
+        with self.cond:
+            self.requested += len(moves)
+            self.coalesced += len(moves) - len(keys)
+            for (key, value) in keys.items():
+                if key in self.pending:
+                    (_, waiting, queued) = self.pending[key]
+                    self.coalesced += 1
+                else:
+                    (waiting, queued) = ([], time.perf_counter())
+                self.pending[key] = (value, waiting + [group], queued)
+            if self.thread is None:
+                self.thread = start_thread(self.run, subsystem = 'servo_bus', owner = self, purpose = 'writer', clocked = False)
+            self.cond.notify_all()
+        return group.future
+
+    def flush(self, timeout = None):
+        '''
+        [summary] waits until every queued write has been sent to the board
+        Args:
+            timeout (float, optional) : max seconds to wait
+        Returns:
+            (Boolean) : True if every write was sent, False if the timeout was reached first
+        '''
+        with self.cond:
+            return self.cond.wait_for(lambda: len(self.pending) == 0 and not self.sending, timeout = timeout)
+
+    def run(self):
+        ''' [summary] worker thread. Takes every write that is waiting and sends them to the board in the order that they were queued. '''
+        while True:
+            with self.cond:
+                while len(self.pending) == 0:
+                    self.cond.wait()
+                (batch, self.pending) = (self.pending, {})
+                self.sending = True
+
+            self.metrics.gauge('batch_size', len(batch))
+            for ((servo_type, pin, attr), (value, waiting, queued)) in batch.items():
+                error = None
+                start = time.perf_counter()
+                self.metrics.record('servo_queue_wait', start - queued)
+                try:
+                    setattr(self._target(servo_type, pin), attr, value)
+                    self.metrics.record('servo_write', time.perf_counter() - start)
+                except Exception as e:
+                    print(f'(ServoBus.py, run) failed to set the {attr} of {servo_type} servo {pin} to {value}: {e!r}')
+                    error = e
+                with self.cond:
+                    self.sent += 1
+                for group in waiting:
+                    group.sent(error)
+
+            with self.cond:
+                self.sending = False
+                self.cond.notify_all()
+
+
+class ServoChannel:
+    ''' [Description]
+    stands in for the ServoKit's servo object for a single channel. Setting angle or throttle queues the write on the ServoBus and returns right away, and reading them returns the last value that was set.
+    '''
+
+    def __init__(self, bus, servo_type, pin):
+        self.bus = bus
+        self.servo_type = servo_type
+        self.pin = pin
+        self.values = {} # { attribute : last value that was set }
+
+    def __str__(self):
+        return f'ServoChannel({self.servo_type} {self.pin})'
+
+    @property
+    def angle(self):
+        return self.values.get('angle')
+
+    @angle.setter
+    def angle(self, value):
+        self.write('angle', value)
+
+    @property
+    def throttle(self):
+        return self.values.get('throttle')
+
+    @throttle.setter
+    def throttle(self, value):
+        self.write('throttle', value)
+
+    def write(self, attr, value):
+        ''' [summary] queues a write to this channel. Returns a Future that finishes once the write has been sent, for callers that need to wait on it. '''
+        self.values[attr] = value
+        return self.bus.write(self.servo_type, self.pin, attr, value)
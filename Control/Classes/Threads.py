@@ -0,0 +1,161 @@
+"""
+Description: Central factory for the daemon threads that the Control and Simulation packages start, replacing the run_in_thread/threader decorators that each class used to define for itself.
+            Every thread is tagged with the subsystem that started it ( e.g. interactable, event_manager, mode, simulation ), the object that owns it, and its purpose. The module keeps an inventory of live threads
+            and of how much CPU time each one has used, so a snapshot shows which subsystem ( or which interactable's watcher ) is keeping the processor busy during a run.
+
+            @threaded('interactable', 'threshold_watcher')
+            def watch_for_threshold_event(self): ...
+
+Property of Donaldson Lab at the University of Colorado at Boulder
+"""
+
+# Standard Lib Imports
+import time
+import functools
+import threading
+
+# Local Imports
+from .Clock import CLOCK
+
+
+class ThreadRecord:
+    ''' [Description] inventory entry for a single thread started by start_thread() '''
+
+    def __init__(self, thread, subsystem, owner, purpose):
+        self.thread = thread
+        self.subsystem = subsystem
+        self.owner = owner
+        self.purpose = purpose
+        self.started = time.monotonic()
+        self.cpu = 0.0 # CPU seconds used by the thread, as of the last sample
+        self.clock_id = None # per-thread CPU clock, for sampling the thread from other threads ( only on platforms that have time.pthread_getcpuclockid )
+
+    def __str__(self):
+        return f'{self.thread.name} ({self.cpu:.3f}s CPU)'
+
+    def sample(self):
+        ''' [summary] updates self.cpu. A thread can always read its own CPU time, but other threads can only read it if the platform provides a per-thread CPU clock. '''
+        if self.thread is threading.current_thread():
+            self.cpu = time.thread_time()
+        elif self.clock_id is not None and self.thread.is_alive():
+            try: self.cpu = time.clock_gettime(self.clock_id)
+            except OSError: pass # thread finished between checking is_alive and reading its clock
+        return self.cpu
+
+    def as_dict(self):
+        return { 'name': self.thread.name, 'subsystem': self.subsystem, 'owner': self.owner, 'purpose': self.purpose, 'alive': self.thread.is_alive(), 'seconds': time.monotonic() - self.started, 'cpu': self.sample() }
+
+
+LIVE = {} # { id(ThreadRecord) : ThreadRecord } threads that have not finished yet
+FINISHED = {} # { (subsystem, owner, purpose) : [number of finished threads, total CPU seconds] }
+LOCK = threading.Lock()
+
+
+def owner_name(owner):
+    ''' [summary] short name for the object that a thread belongs to. Uses the owner's name attribute ( e.g. an interactable ), the name of its parent ( e.g. an interactable's Button ), or else its class name. '''
+    if owner is None:
+        return None
+    name = getattr(owner, 'name', None)
+    if isinstance(name, str):
+        return name
+    parent = getattr(owner, 'parent', None)
+    if isinstance(getattr(parent, 'name', None), str):
+        return f'{parent.name}.{type(owner).__name__}'
+    return type(owner).__name__
+
+
+def start_thread(target, args = (), kwargs = None, subsystem = 'control', owner = None, purpose = None, daemon = True, clocked = True):
+    '''
+    [summary] creates, registers and starts a thread
+    Args:
+        target (function) : what the thread runs
+        args (tuple, optional) : positional arguments for target
+        kwargs (dict, optional) : keyword arguments for target
+        subsystem (string, optional) : part of the package that the thread belongs to ( e.g. 'interactable', 'event_manager', 'mode', 'simulation' )
+        owner (object, optional) : object that the thread belongs to. Only its name gets kept ( see owner_name ).
+        purpose (string, optional) : what the thread does. Defaults to the target's name.
+        daemon (Boolean, optional) : defaults to True, so the thread never keeps the program from exiting
+        clocked (Boolean, optional) : defaults to True, so the thread takes turns with the other clocked threads when the CLOCK is a VirtualClock. Pass False for threads that run in real time ( e.g. hardware timers, or the terminal printer ).
+    Returns:
+        (threading.Thread) : the started thread
+    '''
+    if kwargs is None: kwargs = {}
+    if purpose is None: purpose = getattr(target, '__name__', 'thread')
+    owner = owner_name(owner)
+    record = None
+
+    def run():
+        record.clock_id = getattr(time, 'pthread_getcpuclockid', lambda ident: None)(threading.get_ident())
+        CLOCK.enter(task)
+        try:
+            return target(*args, **kwargs)
+        finally:
+            cpu = time.thread_time()
+            with LOCK:
+                LIVE.pop(id(record), None)
+                totals = FINISHED.setdefault( (subsystem, owner, purpose), [0, 0.0] )
+                totals[0] += 1
+                totals[1] += cpu
+            CLOCK.leave() # last, so the thread counts as finished before any thread that joins it carries on
+
+    t = threading.Thread(target = run, daemon = daemon)
+    t.name = purpose if owner is None else f'{owner}.{purpose}'
+    record = ThreadRecord(t, subsystem, owner, purpose)
+    with LOCK:
+        LIVE[id(record)] = record # registered before it starts, so a thread that finishes right away still gets counted
+    task = CLOCK.spawn(t) if clocked else None
+    t.start()
+    return t
+
+
+def threaded(subsystem, purpose = None, clocked = True):
+    '''
+    [summary] decorator factory. The decorated function runs on its own daemon thread each time that it is called, and the call returns the thread.
+    If the function is a method, the object that it is called on is recorded as the thread's owner.
+    Args:
+        subsystem (string) : part of the package that the thread belongs to
+        purpose (string, optional) : what the thread does. Defaults to the function's name.
+        clocked (Boolean, optional) : see start_thread
+    '''
+    def decorator(func):
+        @functools.wraps(func)
+        def run(*k, **kw):
+            owner = k[0] if len(k) > 0 and hasattr(k[0], func.__name__) else None
+            return start_thread(func, k, kw, subsystem = subsystem, owner = owner, purpose = purpose or func.__name__, clocked = clocked)
+        return run
+    return decorator
+
+
+#
+# Snapshots
+#
+def snapshot():
+    ''' [summary] returns a dict entry ( see ThreadRecord.as_dict ) for every live thread that was started through this module '''
+    with LOCK:
+        records = list(LIVE.values())
+    return [ r.as_dict() for r in records ]
+
+
+def by_subsystem():
+    '''
+    [summary] totals the threads for each subsystem
+    Returns:
+        (dict) : { subsystem : { 'live': live thread count, 'finished': finished thread count, 'cpu': CPU seconds used by live and finished threads } }
+    '''
+    totals = {}
+    for r in snapshot():
+        t = totals.setdefault(r['subsystem'], { 'live': 0, 'finished': 0, 'cpu': 0.0 })
+        t['live'] += 1
+        t['cpu'] += r['cpu']
+    with LOCK:
+        finished = list(FINISHED.items())
+    for ((subsystem, _, _), (count, cpu)) in finished:
+        t = totals.setdefault(subsystem, { 'live': 0, 'finished': 0, 'cpu': 0.0 })
+        t['finished'] += count
+        t['cpu'] += cpu
+    return totals
+
+
+def busiest(n = 10):
+    ''' [summary] returns the <n> live threads that have used the most CPU time, busiest first '''
+    return sorted(snapshot(), key = lambda r: r['cpu'], reverse = True)[:n]
@@ -6,6 +6,7 @@ from Control.Classes.InteractableABC import rfid
 
 from ..Classes.Map import Map
 from ..Classes.ModeABC import modeABC
+from ..Classes.Clock import CLOCK
 
 from ..Logging.logging_specs import script_log, control_log
 
@@ -43,8 +44,11 @@ class Chamber1Access(modeABC):
         self.map.rfid1.threshold_event_queue.queue.clear()
         self.map.beam1_door1.threshold_event_queue.queue.clear()
 
-        if not self.map.door1.isOpen: self.map.door1.open()
-        if self.map.door2.isOpen: self.map.door2.close()
+        # move both doors at the same time, and wait for both to finish 
+        moves = []
+        if not self.map.door1.isOpen: moves.append(self.map.door1.open())
+        if self.map.door2.isOpen: moves.append(self.map.door2.close())
+        CLOCK.wait_futures(moves)
     
     def run(self): 
         ''' allow only one vole at a time to travel into chamber 2'''
@@ -64,6 +68,7 @@ class Chamber1Access(modeABC):
                 except queue.Empty: pass 
                 if wait is False: 
                     return None # if wait is false then we do not loop because we just check once to see a move occurred 
+                CLOCK.idle() 
             return None # mode deactivated, no move ever completed. 
         
        
@@ -94,9 +99,9 @@ class Chamber1Access(modeABC):
                 
 
                 # Move has occurred; close door1 
-                time.sleep(0.5) # Pause before door close to give vole a chance to finish moving thru... 
+                CLOCK.sleep(0.5) # Pause before door close to give vole a chance to finish moving thru... 
                 print(f'Movement Through Door 1 Detected || Closing Door 1 Now...')
-                self.map.door1.close() # Closing Door
+                CLOCK.result(self.map.door1.close()) # Closing Door; wait for door to finish closing before rechecking the beams
 
 
                 # Beam Recheck 
@@ -107,7 +112,7 @@ class Chamber1Access(modeABC):
                     break 
 
                 # Pause to give vole(s) a chance to trigger RFID ...
-                time.sleep(2)
+                CLOCK.sleep(2)
 
 
                 # RFID Checks
@@ -171,6 +176,7 @@ class Edge12Access(modeABC):
                 except queue.Empty: pass 
                 if wait is False: 
                     return None # if wait is false then we do not loop because we just check once to see a move occurred 
+                CLOCK.idle() 
             return None # mode deactivated, no move ever completed.        
         
 
@@ -196,8 +202,11 @@ class Chamber2Access(modeABC):
         self.map.rfid1.threshold_event_queue.queue.clear()
         self.map.beam1_door1.threshold_event_queue.queue.clear()
 
-        if self.map.door1.isOpen: self.map.door1.close()
-        if not self.map.door2.isOpen: self.map.door2.open()
+        # move both doors at the same time, and wait for both to finish 
+        moves = []
+        if self.map.door1.isOpen: moves.append(self.map.door1.close())
+        if not self.map.door2.isOpen: moves.append(self.map.door2.open())
+        CLOCK.wait_futures(moves)
 
     def run(self): 
         ''' 
@@ -221,6 +230,7 @@ class Chamber2Access(modeABC):
                 except queue.Empty: pass 
                 if wait is False: 
                     return None # if wait is false then we do not loop because we just check once to see a move occurred 
+                CLOCK.idle() 
             return None # mode deactivated, no move ever completed. 
 
 
@@ -230,8 +240,9 @@ class Chamber2Access(modeABC):
         
         # figure out which vole should be in edge12/chamber2
         track_v = None 
+        in_chamber1 = self.map.voles_at(self.map.get_chamber(1))
         for v in self.map.voles: 
-            if v.curr_loc != self.map.get_chamber(1): 
+            if v.tag not in in_chamber1: 
                 if track_v is None: 
                     track_v = v
                 else: 
@@ -253,7 +264,7 @@ class Chamber2Access(modeABC):
                 
 
                 # vole triggered a new beam break; begin closing door2 to start airlock move process 
-                self.map.door2.close() # close door2 behind the vole so it cannot access beam2 again 
+                CLOCK.result(self.map.door2.close()) # close door2 behind the vole so it cannot access beam2 again 
 
                 # Check for new beam2 breaks
                 move = check_for_move(self.map.beam2_door2, wait=False)
@@ -5,6 +5,7 @@ from Control.Classes.InteractableABC import rfid
 
 from ..Classes.Map import Map
 from ..Classes.ModeABC import modeABC
+from ..Classes.Clock import CLOCK
 
 from ..Logging.logging_specs import script_log, control_log
 
@@ -22,9 +23,8 @@ class WaitFiveSecondsBeforeRetractOrClose(modeABC):
         setattr(self, 'lever_door1', self.map.instantiated_interactables['lever_door1'])
 
         door_list = [self.map.door1, self.map.door2, self.map.door3, self.map.door4]
-        for d in door_list: 
-            if d.isOpen: 
-                d.close() # begin with all doors closed!
+        closing = [ d.close() for d in door_list if d.isOpen ] # begin with all doors closed! (doors close at the same time)
+        CLOCK.wait_futures(closing)
 
     def run(self):
 
@@ -37,7 +37,7 @@ class WaitFiveSecondsBeforeRetractOrClose(modeABC):
 
                 # wait 5 seconds and then retract the lever 
 
-                time.sleep(5)
+                CLOCK.sleep(5)
 
                 self.lever_door1.retract() 
 
@@ -45,9 +45,11 @@ class WaitFiveSecondsBeforeRetractOrClose(modeABC):
 
                 # wait 5 seconds and reclose the door 
 
-                time.sleep(10)
+                CLOCK.sleep(10)
                 
-                self.door1.close() 
+                CLOCK.result(self.door1.close()) 
+
+            CLOCK.idle() 
 
 
 class IteratorBox(modeABC): 
@@ -91,6 +93,8 @@ class IteratorBox(modeABC):
                     # increment the required presses everytime a lever's threshold gets met! 
                     l.threshold_condition['goal_value'] += 1 
                     script_log(f'Incrementing Required Presses for {l} to {l.threshold_condition["goal_value"]} ')
+
+            CLOCK.idle() 
         
         # When mode becomes inactive, reset the required presses back to the initial goal value of 1.
         script_log(f'Mode ended -> Resetting the required number of presses to 1 for all levers!') 
@@ -153,6 +157,8 @@ class ReactiveBox(modeABC):
 
         while self.active: 
 
+            CLOCK.idle() # nothing else in this loop waits, so give the other threads a turn on each pass 
+
             # Retract Lever if there is a threshold event! # 
             for l in lever_list: 
                 
@@ -192,13 +198,17 @@ class ReactiveBox(modeABC):
 
                                 vole_passed = False 
                         
+                        if not vole_passed: 
+
+                            CLOCK.idle() 
+                        
                         if vole_passed: 
 
                             # Vole passed through the door 
                             script_log(f'Vole passed through {d}! Closing {d}.')
                             print(f'Vole passed through {d}! Closing {d}.')
 
-                            d.close() 
+                            CLOCK.result(d.close()) 
 
                             # retrieve the rfid pings 
                             for r in doors_rfids: 
@@ -241,7 +251,7 @@ class ReactiveBox(modeABC):
                                         
                                         script_log(f'Vole passed through door1! Closing door1.')
                                         # Vole passed thru door1! Close Door! 
-                                        door1.close() 
+                                        CLOCK.result(door1.close()) 
 
                                         # Remove the threshold events so we don't count it twice 
                                         retrieve_queue_contents(rfid1.threshold_event_queue) # , door1.threshold_event_queue, rfid2.threshold_event_queue)
@@ -255,7 +265,7 @@ class ReactiveBox(modeABC):
                                     if len(rfid1.threshold_event_queue.queue) > 0: 
                                         
                                         # Vole passed thru door1! Close Door! 
-                                        door1.close() 
+                                        CLOCK.result(door1.close()) 
 
                                         # Remove the threshold events so we don't count it twice 
                                         retrieve_queue_contents(rfid2.threshold_event_queue)
@@ -273,7 +283,7 @@ class ReactiveBox(modeABC):
 
                                         script_log(f'Vole passed through door2! Closing door2.')
                                         # Vole passed thru door1! Close Door! 
-                                        door2.close() 
+                                        CLOCK.result(door2.close()) 
 
                                         # Remove the threshold events so we don't count it twice 
                                         retrieve_queue_contents(rfid3.threshold_event_queue)
@@ -287,7 +297,7 @@ class ReactiveBox(modeABC):
                                         
                                         script_log(f'Vole passed through door2! Closing door2.')
                                         # Vole passed thru door1! Close Door! 
-                                        door2.close() 
+                                        CLOCK.result(door2.close()) 
 
                                         # Remove the threshold events so we don't count it twice 
                                         retrieve_queue_contents(rfid4.threshold_event_queue)
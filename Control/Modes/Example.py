@@ -14,6 +14,7 @@ Please Leave This File As Is! If using these modes as a template to create a new
 """
 
 ## (TODO) if any extra packages are needed for defining mode logic, freely place import statements here 
+from ..Classes.Clock import CLOCK
 from ..Classes.ModeABC import modeABC
 ## 
 
@@ -49,10 +50,12 @@ class OpenBox(modeABC):
     
     def setup(self): 
         ''' any tasks to setup before run() gets called '''
+        opening = []
         for (name, i) in self.map.instantiated_interactables.items(): 
             # call open on any door interactable in map. 
             if i.type == 'door': 
-                i.open()
+                opening.append(i.open())
+        CLOCK.wait_futures(opening) # doors open at the same time
    
     def run(self):
         return SimpleBox(timeout=10, rounds=1, ITI = 5, map = self.map, output_fp = self.output_fp) 
@@ -6,6 +6,7 @@ import time
 import queue
 
 from ..Classes.ModeABC import modeABC
+from ..Classes.Clock import CLOCK
 
 from Logging.logging_specs import control_log 
 
@@ -27,7 +28,7 @@ class Lever1(modeABC):
     def run(self):
         ''' control script logic '''
         self.map.lever_door1.extend()
-        time.sleep(10)
+        CLOCK.sleep(10)
         self.map.lever_door1.retract()
 
         try: pressed = self.map.lever_door1.threshold_event_queue.get_nowait() 
@@ -55,7 +56,7 @@ class Lever2(modeABC):
     def run(self):
         ''' control script logic '''
         self.map.lever_door2.extend()
-        time.sleep(10)
+        CLOCK.sleep(10)
         self.map.lever_door2.retract()
 
 class LeverFood(modeABC): 
@@ -74,7 +75,7 @@ class LeverFood(modeABC):
     def run(self):
         ''' control script logic '''
         self.map.lever_food.extend()
-        time.sleep(10)
+        CLOCK.sleep(10)
         self.map.lever_food.retract()
 
 
@@ -103,9 +104,9 @@ class DoorTests(modeABC):
                 door_lst.append(item) 
         
         for d in door_lst:         
-            d.open()
-            time.sleep(8)
-            d.close()
+            CLOCK.result(d.open())
+            CLOCK.sleep(8)
+            CLOCK.result(d.close())
 
 
 
@@ -143,7 +144,7 @@ class LeverDoorConnectionTests(modeABC):
                 
                 try: event = lever1.threshold_event_queue.get_nowait() # loops until something is added. If nothing is ever added, then will just exit once timeout ends ( can add a timeout arg to this call if needed )
                 except queue.Empty: pass 
-                time.sleep(.5)
+                CLOCK.sleep(.5)
 
             if event is None:  # timed out before lever threshold event
 
@@ -13,6 +13,7 @@ from tkinter import Button
 from ..Classes.EventManager import EventManager
 from ..Classes.Map import Map
 from ..Classes.ModeABC import modeABC
+from ..Classes.Clock import CLOCK
 
 from ..Classes.InteractableABC import interactableABC
 Button = interactableABC.Button # button class (nested w/in interactableABC)
@@ -41,12 +42,12 @@ class EventManagerTests(modeABC):
     def run(self): 
 
         print(f'(SoftwareTesting.py, EventManagerTests, run())')
-        time.sleep(3)
+        CLOCK.sleep(3)
         print('\n')
         self.event_manager.new_countdown('Countdown', 10)
-        self.event_manager.new_timestamp('Event_1', time=time.time())
-        time.sleep(1)
-        self.event_manager.new_timestamp('Event_2', time=time.time())
+        self.event_manager.new_timestamp('Event_1', time=CLOCK.time())
+        CLOCK.sleep(1)
+        self.event_manager.new_timestamp('Event_2', time=CLOCK.time())
         print('All Done')
         return 
         
@@ -4,6 +4,7 @@ import time
 
 from ..Classes.InteractableABC import door, lever
 from ..Classes.ModeABC import modeABC
+from ..Classes.Clock import CLOCK
  
 
 class LeverTest_Control(modeABC):
@@ -38,15 +39,15 @@ class LeverTest_Control(modeABC):
             print(f'Testing {str(l)}.... ')
             inp = input(f'\n | press enter to extend {str(l)} (extended angle is {l.extended_angle}) | \n')
             l.extend()
-            time.sleep(1)
+            CLOCK.sleep(1)
             inp = input(f'\n | press enter to retract {str(l)} (retracted angle is {l.retracted_angle}) | \n')
             suc = l.retract()
-            time.sleep(1)
+            CLOCK.sleep(1)
         
         for l in lever_lst: 
             print(f"extending {str(l)} and will retract if {l.threshold_condition['attribute']} reaches {l.threshold_condition['goal_value']}.")
             l.extend()
-            l.threshold_event_queue.get()
+            CLOCK.get(l.threshold_event_queue)
             l.retract()
 
         print('all done!')
@@ -86,14 +87,14 @@ class DoorTests_Control(modeABC):
         for d in door_lst: 
             print(f'Testing {str(d)}.... ')
             inp = input(f'\n | press enter to open {str(d)} (sets speed to {d.open_speed}) | \n')
-            d.open()
-            time.sleep(1)
+            d.open().result()
+            CLOCK.sleep(1)
             inp = input(f'\n | press enter to close {str(d)} (sets speed to {d.close_speed}) | \n')
-            suc = d.close()
-            time.sleep(1)
+            suc = d.close().result()
+            CLOCK.sleep(1)
             inp = input(f'\n | press enter to stop {str(d)} (sets speed to {d.stop_speed}) | \n')
             d.stop()
-            time.sleep(1)
+            CLOCK.sleep(1)
 
         print('all done')
         return
\ No newline at end of file
@@ -54,7 +54,7 @@ def main():
     for mode in modes: # loop thru specified control scripts and start the experiment
         # Optional (TODO): Comment out call to input_before_continue if you don't want program to wait for User Input in between Modes Executing.
         input_before_continue(f'ready to start running Control Software Mode: {mode}?')
-        mode.enter() 
+        mode.enter() # Optional: mode.enter(profile = 0.005) samples every thread's stack every 5ms and writes a flame graph file next to the mode's output csv 
 
 if __name__ == '__main__': 
     main() 
@@ -0,0 +1,361 @@
+"""
+Description: Class definition for running batches of headless simulations. Each run builds its own Map, Simulation and Control Modes in a separate process,
+            with its own random seed, output directory and virtual clock. Once all of the runs finish, the event tables from each run's output files are aggregated into a summary.
+
+            Run from the repository's root directory: python -m Simulation.Classes.BatchRunner Simulation/Configurations/batch.json [--runs N] [--workers N] [--seed N] [--output_dir DIR] [--trace] [--check_determinism]
+
+Property of Donaldson Lab at the University of Colorado at Boulder
+"""
+
+# Standard Lib Imports
+import os, sys, json, csv, time, random
+import argparse
+import importlib
+import contextlib
+import traceback
+import concurrent.futures
+from collections import Counter
+from datetime import datetime
+cwd = os.getcwd()
+
+
+def load_class(path):
+    ''' [summary] imports and returns a class from its dotted path ( e.g. "Control.Modes.Testing_Hardware.Lever1" ) '''
+    (module_name, class_name) = path.rsplit('.', 1)
+    return getattr(importlib.import_module(module_name), class_name)
+
+
+def read_event_counts(output_fp):
+    ''' [summary] counts how many times each event was recorded in a mode's output csv file
+    Args:
+        output_fp (string) : filepath to the output csv file written by the EventManager
+    Returns:
+        (Counter) : { event description : number of times it was recorded }
+    '''
+    counts = Counter()
+    if not os.path.exists(output_fp):
+        return counts
+    with open(output_fp, newline='') as f:
+        for row in csv.reader(f):
+            if len(row) < 2 or row[1] == 'Event' or row[0] == 'Run Metadata':
+                continue # spacer row, header row or run metadata row
+            counts[row[1]] += 1
+    return counts
+
+
+def finished_rounds(output_fp, mode_name):
+    ''' [summary] returns the rounds that <mode_name> recorded a Mode_Timeout_Round_<n>_Finish row for, i.e. the rounds that ran out their whole timeout
+    Args:
+        output_fp (string) : filepath to the output csv file written by the EventManager
+        mode_name (string) : the mode's name, as written in the Mode Name column
+    Returns:
+        (set) : round numbers
+    '''
+    rounds = set()
+    if not os.path.exists(output_fp):
+        return rounds
+    with open(output_fp, newline='') as f:
+        for row in csv.reader(f):
+            if len(row) > 6 and row[6] == mode_name and row[1].startswith('Mode_Timeout_Round_') and row[1].endswith('_Finish'):
+                rounds.add(int(row[1][len('Mode_Timeout_Round_'):-len('_Finish')]))
+    return rounds
+
+
+def mode_problems(mode, output_fp):
+    ''' [summary] returns a description of everything that kept <mode> from running to completion: errors that it ( or an inner mode ) raised, or a timed mode that never recorded the end of its final round '''
+    problems = list(mode.errors)
+    if mode.timeout is not None and mode.rounds not in finished_rounds(output_fp, str(mode)):
+        problems.append(f'{mode}: no Mode_Timeout_Round_{mode.rounds}_Finish row in {os.path.basename(output_fp)}')
+    return problems
+
+
+def read_event_rows(output_fp):
+    ''' [summary] reads every row of a mode's output csv file, leaving out the Time column ( which starts from the wall clock time that the run started at, so it differs between any two runs )
+    Args:
+        output_fp (string) : filepath to the output csv file written by the EventManager
+    Returns:
+        ([list]) : the rows of the file
+    '''
+    with open(output_fp, newline='') as f:
+        return [ row[:3] + row[4:] for row in csv.reader(f) ]
+
+
+def compare_batches(first_dir, second_dir):
+    '''
+    [summary] compares the output csv files of two batches that were run with the same seeds ( see BatchRunner.check_determinism )
+    Args:
+        first_dir (string) : output directory of the first batch
+        second_dir (string) : output directory of the second batch
+    Returns:
+        ([string]) : a description of each file that differs between the batches. Empty if every file matches.
+    '''
+    def output_files(directory):
+        return sorted( os.path.relpath(os.path.join(root, f), directory) for (root, _, files) in os.walk(directory) for f in files if f.endswith('.csv') )
+
+    differences = []
+    (first, second) = (output_files(first_dir), output_files(second_dir))
+    for fp in sorted(set(first) ^ set(second)):
+        differences.append(f'{fp}: only written by the {"first" if fp in first else "second"} batch')
+    for fp in [ f for f in first if f in second ]:
+        (a, b) = (read_event_rows(os.path.join(first_dir, fp)), read_event_rows(os.path.join(second_dir, fp)))
+        for (n, (row_a, row_b)) in enumerate(zip(a, b)):
+            if row_a != row_b:
+                differences.append(f'{fp}: row {n} differs, {row_a} != {row_b}')
+                break
+        else:
+            if len(a) != len(b):
+                differences.append(f'{fp}: {len(a)} rows != {len(b)} rows')
+    return differences
+
+
+def run_single(spec):
+    '''
+    [summary] runs one simulation from start to finish. Runs in a worker process, so everything that the run needs gets built here from the <spec> dictionary.
+    Args:
+        spec (dict) : { 'run_id', 'seed', 'output_dir', 'config_directory', 'map_file', 'simulation_config', 'virtual_time', 'trace', 'modes':[{ 'mode', 'simulation', 'kwargs' }] }
+    Returns:
+        (dict) : results for the run, including its status, timings and the number of times each event was recorded
+    '''
+    # Local Imports ( imported in the worker so each process has its own clock, map and event manager )
+    from Control.Classes.Clock import CLOCK, VirtualClock
+    from Control.Classes.Map import Map
+    from Simulation.Classes.Simulation import Simulation
+
+    run_dir = spec['output_dir']
+    os.makedirs(run_dir, exist_ok = True)
+
+    random.seed(spec['seed']) # anything that still uses the global generator ( the voles and interactables each get their own stream from the Simulation's seed )
+    if spec.get('virtual_time', True):
+        CLOCK.use(VirtualClock())
+
+    result = { 'run_id': spec['run_id'], 'seed': spec['seed'], 'status': 'completed', 'error': None, 'output_files': [], 'events': {} }
+    real_start = time.time()
+    clock_start = None
+    modes = []
+
+    # everything that the run prints goes to the run's log file rather than the terminal
+    with open(os.path.join(run_dir, 'stdout.log'), 'w') as log, contextlib.redirect_stdout(log):
+        try:
+            map = Map(spec['config_directory'], spec['map_file'], interactive = False)
+
+            pairs = {}
+            for (idx, m) in enumerate(spec['modes']):
+                mode_class = load_class(m['mode'])
+                output_fp = os.path.join(run_dir, f'{idx}_{mode_class.__name__}.csv')
+                modes.append(mode_class(map = map, output_fp = output_fp, **m.get('kwargs', {})))
+                result['output_files'].append(output_fp)
+                if m.get('simulation') is not None:
+                    pairs[mode_class.__name__] = load_class(m['simulation'])
+
+            trace_file = os.path.join(run_dir, 'trace.jsonl') if spec.get('trace', False) else None
+            simulation = Simulation(modes, config_filename = spec['simulation_config'], seed = spec['seed'], trace_file = trace_file)
+            simulation.control_sim_pairs = pairs
+            for m in modes:
+                if m.__class__.__name__ in pairs:
+                    simulation.script_pool.prepare(m, pairs[m.__class__.__name__])
+
+            clock_start = CLOCK.time() # simulation config may have switched clocks, so start timing the experiment now 
+            simulation.run_sim()
+            CLOCK.sleep(1) # Pause Before Starting Modes
+            for mode in modes:
+                mode.enter(profile = spec.get('profile'))
+            map.event_manager.finish() # write any events that are still in the write queue
+            if simulation.recorder is not None: simulation.recorder.close()
+
+            # modes catch their own errors, so the run only completed if every mode recorded the end of its final round without raising anything
+            problems = [ p for (mode, fp) in zip(modes, result['output_files']) for p in mode_problems(mode, fp) ]
+            if len(problems) > 0:
+                result['status'] = 'failed'
+                result['error'] = '\n'.join(problems)
+                print(result['error'])
+
+        except SystemExit as e:
+            # modes call sys.exit() from their exception handlers
+            result['status'] = 'exited'
+            result['error'] = '\n'.join([f'SystemExit({e.code})'] + [ err for mode in modes for err in mode.errors ])
+        except Exception as e:
+            result['status'] = 'failed'
+            result['error'] = traceback.format_exc()
+            print(result['error'])
+
+    result['real_time'] = time.time() - real_start
+    result['detached_threads'] = list(getattr(CLOCK.source, 'detached', [])) # threads that held the VirtualClock for too long, which can make the run impossible to repeat exactly
+    result['experiment_time'] = CLOCK.time() - clock_start if clock_start is not None else None
+
+    counts = Counter()
+    for fp in result['output_files']:
+        counts.update(read_event_counts(fp))
+    result['events'] = dict(counts)
+    return result
+
+
+class BatchRunner:
+    ''' [Description]
+    runs a sequence of Control Modes ( each paired with a Simulation Script ) many times, each time with a different random seed, and summarizes the events that were recorded across all of the runs.
+    Runs execute in parallel across a pool of worker processes. Each worker process only ever runs a single simulation, so that no threads or clock state are left over from a previous run.
+    '''
+
+    def __init__(self, modes, runs = 10, seed = 0, workers = None, map_file = 'map.json', config_directory = None, simulation_config = 'simulation.json', output_dir = None, virtual_time = True, trace = False, profile = None):
+        """
+        [summary] sets up a batch of simulation runs. Nothing runs until run() gets called.
+        Args:
+            modes ([dict]) : ordered list of the modes that each run executes. Each entry is { 'mode': dotted path to the Mode class, 'simulation': dotted path to the SimulationScript class (optional), 'kwargs': { arguments for creating the mode, e.g. timeout, rounds, ITI } }
+            runs (int, optional) : number of simulations to run
+            seed (int, optional) : base seed. run i uses the seed <seed + i>, so a batch can be reproduced
+            workers (int, optional) : number of worker processes. Defaults to the number of cpus.
+            map_file (string, optional) : map configuration file in <config_directory> ( or an absolute filepath )
+            config_directory (string, optional) : directory with the Control configuration files. Defaults to Control/Configurations
+            simulation_config (string, optional) : simulation configuration file in Simulation/Configurations ( or an absolute filepath )
+            output_dir (string, optional) : directory that each run's output files and the summary get written to. Defaults to a new directory in Simulation/Output
+            virtual_time (Boolean, optional) : if True, each run uses a VirtualClock so that the runs finish as quickly as possible
+            trace (Boolean, optional) : if True, each run records its vole actions to trace.jsonl in the run's output directory, so that any run can be replayed ( see Simulation/Classes/Trace.py )
+            profile (float, optional) : if provided, each mode samples the stacks of every thread at this interval ( in real seconds ) and writes a <mode output file>_profile.folded next to its output csv ( see Control/Classes/Profiler.py )
+        """
+        self.modes = modes
+        self.runs = runs
+        self.seed = seed
+        self.workers = workers if workers is not None else os.cpu_count()
+        self.map_file = map_file
+        self.config_directory = config_directory if config_directory is not None else os.path.join(cwd, 'Control', 'Configurations')
+        self.simulation_config = simulation_config
+        if output_dir is None:
+            output_dir = os.path.join(cwd, 'Simulation', 'Output', datetime.now().strftime('batch-%Y.%m.%d-%H.%M.%S'))
+        self.output_dir = output_dir
+        self.virtual_time = virtual_time
+        self.trace = trace
+        self.profile = profile
+        self.results = []
+        self.summary = None
+
+    @classmethod
+    def from_config(cls, config_filepath, **overrides):
+        ''' [summary] creates a BatchRunner from a json configuration file ( see Simulation/Configurations/batch.json ). Any keyword arguments that are not None override the values in the file. '''
+        with open(config_filepath) as f:
+            data = json.load(f)
+        for (key, val) in overrides.items():
+            if val is not None: data[key] = val
+        return cls(**data)
+
+    def run_specs(self):
+        ''' [summary] returns the list of specs that get sent to the worker processes, one per run '''
+        return [ {
+            'run_id': i,
+            'seed': self.seed + i,
+            'output_dir': os.path.join(self.output_dir, f'run_{i:04d}'),
+            'config_directory': self.config_directory,
+            'map_file': self.map_file,
+            'simulation_config': self.simulation_config,
+            'virtual_time': self.virtual_time,
+            'trace': self.trace,
+            'profile': self.profile,
+            'modes': self.modes
+            } for i in range(self.runs) ]
+
+    def run(self):
+        '''
+        [summary] executes every run across the worker processes, then aggregates the results and writes them to summary.json in the output directory
+        Args: None
+        Returns:
+            (dict) : the summary of the batch ( see summarize() )
+        '''
+        os.makedirs(self.output_dir, exist_ok = True)
+        print(f'(BatchRunner.py, run) Running {self.runs} simulations across {self.workers} processes. Output: {self.output_dir}')
+
+        pool_args = { 'max_workers': self.workers }
+        if sys.version_info >= (3, 11):
+            pool_args['max_tasks_per_child'] = 1 # fresh process for each run
+
+        start = time.time()
+        self.results = []
+        with concurrent.futures.ProcessPoolExecutor(**pool_args) as pool:
+            futures = { pool.submit(run_single, spec): spec for spec in self.run_specs() }
+            for f in concurrent.futures.as_completed(futures):
+                spec = futures[f]
+                try:
+                    result = f.result()
+                except Exception as e:
+                    # the worker process itself died
+                    result = { 'run_id': spec['run_id'], 'seed': spec['seed'], 'status': 'crashed', 'error': repr(e), 'output_files': [], 'events': {}, 'real_time': None, 'experiment_time': None }
+                self.results.append(result)
+                print(f'(BatchRunner.py, run) run {result["run_id"]} {result["status"]} ({len(self.results)}/{self.runs})')
+
+        self.results.sort(key = lambda r: r['run_id'])
+        self.summary = self.summarize(self.results, wall_time = time.time() - start)
+
+        with open(os.path.join(self.output_dir, 'summary.json'), 'w') as f:
+            json.dump(self.summary, f, indent = 4)
+        return self.summary
+
+    def check_determinism(self):
+        '''
+        [summary] runs the batch twice with the same seeds ( into the first/ and second/ subdirectories of the output directory ), and compares every output csv file of the first batch with the second
+        Args: None
+        Returns:
+            ([string]) : a description of each file that differs between the two batches ( see compare_batches ). Empty if the batch is repeatable.
+        '''
+        output_dir = self.output_dir
+        try:
+            for name in ('first', 'second'):
+                self.output_dir = os.path.join(output_dir, name)
+                self.run()
+        finally:
+            self.output_dir = output_dir
+        return compare_batches(os.path.join(output_dir, 'first'), os.path.join(output_dir, 'second'))
+
+    def summarize(self, results, wall_time = None):
+        '''
+        [summary] aggregates the per-run event tables
+        Args:
+            results ([dict]) : results returned by run_single
+            wall_time (float, optional) : real seconds that the whole batch took
+        Returns:
+            (dict) : { 'runs', 'completed', 'failed', 'wall_time', 'mean_real_time', 'mean_experiment_time', 'events': { event : { 'runs', 'total', 'mean' } }, 'per_run' }
+        '''
+        completed = [ r for r in results if r['status'] == 'completed' ]
+        events = {}
+        for r in results:
+            for (event, count) in r['events'].items():
+                e = events.setdefault(event, { 'runs': 0, 'total': 0 })
+                e['runs'] += 1
+                e['total'] += count
+        for e in events.values():
+            e['mean'] = e['total'] / len(results) if len(results) > 0 else 0
+
+        def mean(key):
+            vals = [ r[key] for r in results if r.get(key) is not None ]
+            return sum(vals) / len(vals) if len(vals) > 0 else None
+
+        return {
+            'runs': len(results),
+            'completed': len(completed),
+            'failed': [ { 'run_id': r['run_id'], 'seed': r['seed'], 'status': r['status'], 'error': r['error'] } for r in results if r['status'] != 'completed' ],
+            'wall_time': wall_time,
+            'mean_real_time': mean('real_time'),
+            'mean_experiment_time': mean('experiment_time'),
+            'events': dict(sorted(events.items(), key = lambda item: -item[1]['total'])),
+            'per_run': results
+        }
+
+
+if __name__ == '__main__':
+
+    parser = argparse.ArgumentParser(description = 'runs a batch of headless simulations')
+    parser.add_argument('config', help = 'batch configuration file (e.g. Simulation/Configurations/batch.json)')
+    parser.add_argument('--runs', type = int, default = None)
+    parser.add_argument('--workers', type = int, default = None)
+    parser.add_argument('--seed', type = int, default = None)
+    parser.add_argument('--output_dir', default = None)
+    parser.add_argument('--trace', action = 'store_true', default = None, help = 'record a trace of the vole actions in each run')
+    parser.add_argument('--profile', type = float, default = None, help = 'sample every thread\'s stack at this interval ( seconds ) and write a collapsed stack file for each mode')
+    parser.add_argument('--check_determinism', action = 'store_true', help = 'run the batch twice with the same seeds, and exit with an error if any output file differs between the two')
+    args = parser.parse_args()
+
+    runner = BatchRunner.from_config(args.config, runs = args.runs, workers = args.workers, seed = args.seed, output_dir = args.output_dir, trace = args.trace, profile = args.profile)
+    if args.check_determinism:
+        differences = runner.check_determinism()
+        for d in differences:
+            print(f'(BatchRunner.py, check_determinism) {d}')
+        print(f'\n{len(differences)} output files differ between two batches with the same seeds. Output: {runner.output_dir}')
+        sys.exit(1 if len(differences) > 0 else 0)
+    summary = runner.run()
+    print(f'\n{summary["completed"]}/{summary["runs"]} runs completed in {summary["wall_time"]:.1f}s. Summary written to {os.path.join(runner.output_dir, "summary.json")}')
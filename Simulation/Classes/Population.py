@@ -0,0 +1,267 @@
+"""
+Description: Class definition for VolePopulation, which picks random actions for a large group of simulated voles at once.
+            Rather than each SimVole rebuilding its list of possible actions and calling random.choices on its own, the population keeps a table of actions for each vole location,
+            and samples the next action for every vole in a single vectorized step. The chosen actions are then carried out by the SimVoles themselves, so they still go through the Map and the interactables.
+            Uses numpy if it is installed, and otherwise falls back to sampling each vole with bisect.
+
+Property of Donaldson Lab at the University of Colorado at Boulder
+"""
+
+# Standard Lib Imports
+import random
+import bisect
+import itertools
+import threading
+import concurrent.futures
+from collections import deque
+
+# Third Party Imports
+try:
+    import numpy as np
+except Exception as e:
+    print(e)
+    np = None
+
+# Local Imports
+from Control.Classes.Clock import CLOCK
+from Control.Classes.Threads import start_thread
+from .Vole import SimVole
+
+
+class ActionTable:
+    ''' [Description]
+    the actions a vole can take from one location in the map ( a chamber or edge, and the component within it that the vole is sitting at ), along with the cumulative weights for sampling them.
+    Each action is a (SimVole method name, argument) pair from the map's cached action table ( see Map.get_action_table ), so a single table gets shared by every vole at that location.
+    '''
+
+    def __init__(self, map, location, component, weights):
+        """
+        Args:
+            map (Map) : the map that caches the unweighted action tables
+            location (Chamber | Edge) : the location the vole is in
+            component (Component | ComponentSet | None) : the component the vole is sitting at within the location
+            weights (dict) : { (method name, argument) : weight }. Any action that is not in weights gets the probability assigned by the location ( see Chamber.add_action_probabilities ) scaled so that a uniform probability is a weight of 1, or else a weight of 1
+        """
+        self.location = location
+        self.component = component
+        (self.actions, location_p) = map.get_action_table(location, component)
+        self.weights = [ weights.get(a, 1 if p is None else p * len(self.actions)) for (a, p) in zip(self.actions, location_p) ]
+        self.cumulative = list(itertools.accumulate(self.weights))
+        self.total = self.cumulative[-1]
+        if self.total <= 0:
+            raise Exception(f'(Population.py, ActionTable) the action weights for {location.edge_or_chamber}{location.id} must sum to a positive number, but summed to {self.total}')
+
+    def sample(self, rng):
+        ''' [summary] samples a single action using the cumulative weights, in O(log n) '''
+        return self.actions[ bisect.bisect_right(self.cumulative, rng.random() * self.total) ]
+
+
+class VolePopulation:
+    ''' [Description]
+    picks random actions for a group of SimVoles in a single step. Every step samples one action for each active vole, then runs all of the chosen actions concurrently and waits for them to finish.
+    Action tables are built once per location and reused by every vole that passes through that location.
+    '''
+
+    def __init__(self, map, voles = None, seed = None, max_workers = 64):
+        """
+        Args:
+            map (Map) : the map that the voles are moving through
+            voles ([SimVole], optional) : voles in the population. Defaults to every SimVole in the map.
+            seed (int, optional) : seed for sampling actions
+            max_workers (int, optional) : max number of voles that carry out their actions at the same time
+        """
+        self.map = map
+        self.event_manager = map.event_manager
+        self.voles = voles if voles is not None else [ v for v in map.voles if isinstance(v, SimVole) ]
+        self.weights = {} # { (method name, argument) : weight }
+        self.tables = {} # { (location, component) : ActionTable }
+        self.table_rows = {} # { ActionTable : row index in self.cumulative }
+        self.table_version = map.action_table_version # the map's action table version that self.tables were built from
+        self.cumulative = None # (numpy only) matrix of every table's cumulative weights, padded w/ inf so that padding is never chosen
+        self.totals = None # (numpy only) total weight of each row in self.cumulative
+        self.lock = threading.Lock()
+        self.max_workers = max_workers
+        self.executor = None
+
+        if np is not None: self.rng = np.random.default_rng(seed)
+        else: self.rng = random.Random(seed)
+
+    def __str__(self):
+        return f'VolePopulation({len(self.voles)} voles)'
+
+    @classmethod
+    def spawn(cls, map, n, start_chamber, first_tag = None, simulation = None, **kwargs):
+        '''
+        [summary] creates <n> new SimVoles in <start_chamber> and returns a population containing them
+        Args:
+            map (Map) : the map that the voles get added to
+            n (int) : number of voles to create
+            start_chamber (int) : id of the chamber the voles start in
+            first_tag (int, optional) : tag of the first vole. Defaults to one more than the largest existing tag.
+            simulation (Simulation, optional) : when passed, the voles are created by the simulation so that each one gets its own seeded random stream ( see Simulation.rng_stream ), and the population's seed defaults to one drawn from the simulation's seed
+            kwargs : passed on to VolePopulation()
+        Returns:
+            (VolePopulation) : population of the new voles
+        '''
+        if map.get_chamber(start_chamber) is None:
+            raise Exception(f'(Population.py, spawn) cannot place voles in the nonexistent chamber #{start_chamber}')
+        if first_tag is None:
+            first_tag = max( [ v.tag for v in map.voles ] + [0] ) + 1
+        voles = []
+        for tag in range(first_tag, first_tag + n):
+            if simulation is not None:
+                vole = simulation.new_vole(tag, start_chamber, tag)
+                if vole is None:
+                    raise Exception(f'(Population.py, spawn) the simulation could not create a vole with the tag {tag}')
+            else:
+                vole = SimVole(tag, start_chamber, tag, map)
+                map.voles.append(vole)
+            voles.append(vole)
+        if simulation is not None and kwargs.get('seed') is None:
+            kwargs['seed'] = simulation.rng_stream('population', first_tag).getrandbits(64) # recorded w/ the simulation's seed, so the population makes the same draws on a replay
+        return cls(map, voles, **kwargs)
+
+    #
+    # Action Weights
+    #
+    def set_action_weight(self, action, weight):
+        '''
+        [summary] sets the relative weight of an action for every vole in the population ( all actions default to a weight of 1 )
+        Args:
+            action (tuple) : (SimVole method name, argument), e.g. ('attempt_move', 2) or ('sleep', 5)
+            weight (float) : non-negative weight
+        '''
+        if weight < 0:
+            raise Exception(f'(Population.py, set_action_weight) weights cannot be negative, but {action} was passed {weight}')
+        with self.lock:
+            self.weights[action] = weight
+            self._invalidate()
+
+    def invalidate(self):
+        ''' [summary] drops the cached action tables. (NOTE) tables also get dropped automatically whenever the map clears its own action tables. '''
+        with self.lock:
+            self._invalidate()
+
+    def _invalidate(self):
+        ''' (caller holds self.lock) '''
+        self.tables = {}
+        self.table_rows = {}
+        self.cumulative = None
+        self.totals = None
+
+    def table_for(self, vole):
+        ''' [summary] returns the ActionTable for the vole's current location, building it if this is the first vole to be there '''
+        key = (vole.curr_loc, vole.curr_component)
+        with self.lock:
+            if self.table_version != self.map.action_table_version:
+                # map's components or action probabilities changed
+                self._invalidate()
+                self.table_version = self.map.action_table_version
+            table = self.tables.get(key)
+            if table is None:
+                table = ActionTable(self.map, vole.curr_loc, vole.curr_component, self.weights)
+                self.tables[key] = table
+                self.cumulative = None # new row for the matrix
+            return table
+
+    def _build_matrix(self):
+        ''' (numpy only, caller holds self.lock) stacks the cumulative weights of every table into a single matrix '''
+        tables = list(self.tables.values())
+        width = max( len(t.actions) for t in tables )
+        self.cumulative = np.full( (len(tables), width), np.inf )
+        self.totals = np.empty(len(tables))
+        self.table_rows = {}
+        for (row, t) in enumerate(tables):
+            self.cumulative[row, :len(t.cumulative)] = t.cumulative
+            self.totals[row] = t.total
+            self.table_rows[t] = row
+
+    #
+    # Sampling
+    #
+    def sample(self, voles = None):
+        '''
+        [summary] picks the next action for each vole. With numpy, every vole is sampled in one vectorized inverse-CDF step.
+        Args:
+            voles ([SimVole], optional) : voles to sample actions for. Defaults to every active vole in the population.
+        Returns:
+            ([ (SimVole, (method name, argument)) ]) : the chosen action for each vole
+        '''
+        if voles is None:
+            voles = [ v for v in self.voles if v.active ]
+        if len(voles) == 0:
+            return []
+        tables = [ self.table_for(v) for v in voles ]
+
+        if np is None:
+            return [ (v, t.sample(self.rng)) for (v, t) in zip(voles, tables) ]
+
+        with self.lock:
+            if self.cumulative is None:
+                self._build_matrix()
+            rows = np.fromiter( (self.table_rows[t] for t in tables), dtype = np.intp, count = len(tables) )
+            targets = self.rng.random(len(voles)) * self.totals[rows]
+            choices = (self.cumulative[rows] <= targets[:, None]).sum(axis = 1)
+        return [ (v, t.actions[c]) for (v, t, c) in zip(voles, tables, choices) ]
+
+    #
+    # Running Actions
+    #
+    def perform(self, vole, action):
+        ''' [summary] carries out a single action for <vole> '''
+        (name, arg) = action
+        try:
+            if name == 'sleep':
+                CLOCK.sleep(arg)
+            else:
+                getattr(vole, name)(arg)
+        except Exception as e:
+            self.event_manager.print_to_terminal(f'(Population.py, perform) {vole} failed to {name}({arg}): {e}')
+
+    def step(self):
+        '''
+        [summary] samples an action for every active vole, runs them all at the same time, and waits for every vole to finish its action
+        Returns:
+            ([ (SimVole, (method name, argument)) ]) : the actions that were taken
+        '''
+        chosen = self.sample()
+        if len(chosen) == 0:
+            return chosen
+        if CLOCK.isVirtual:
+            # executor threads are not scheduled by the VirtualClock, so the actions get carried out by clocked worker threads instead
+            pending = deque(chosen)
+            def work():
+                while len(pending) > 0:
+                    self.perform(*pending.popleft())
+            workers = [ start_thread(work, subsystem = 'simulation', owner = self, purpose = 'vole_population_worker') for _ in range(min(self.max_workers, len(chosen))) ]
+            for t in workers:
+                CLOCK.join(t)
+            return chosen
+        if self.executor is None:
+            self.executor = concurrent.futures.ThreadPoolExecutor(max_workers = self.max_workers, thread_name_prefix = 'vole_population')
+        futures = [ self.executor.submit(self.perform, v, a) for (v, a) in chosen ]
+        concurrent.futures.wait(futures)
+        return chosen
+
+    def run(self, mode = None, steps = None):
+        '''
+        [summary] keeps stepping the population until <steps> steps have run, or until <mode> exits its timeout
+        Args:
+            mode (ModeABC, optional) : if provided, stops once this mode is no longer active and in its timeout
+            steps (int, optional) : if provided, max number of steps to run
+        Returns:
+            (int) : the number of steps that ran
+        '''
+        count = 0
+        try:
+            while steps is None or count < steps:
+                if mode is not None and not ( mode.active and mode.inTimeout ):
+                    break
+                if len(self.step()) == 0:
+                    break # no active voles
+                count += 1
+        finally:
+            if self.executor is not None:
+                self.executor.shutdown(wait = True)
+                self.executor = None
+        return count
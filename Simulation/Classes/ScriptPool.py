@@ -0,0 +1,86 @@
+"""
+Description: Class definition for SimulationScriptPool, which hands out Simulation Scripts to the Control Modes as they run.
+            Inner modes are created again every round, so rather than creating a new Simulation Script for each new mode instance, scripts are pooled by mode class and reused across rounds.
+            A script is reset for its new mode when it is handed out, and returned to the pool once its mode ends.
+
+Property of Donaldson Lab at the University of Colorado at Boulder
+"""
+
+# Standard Lib Imports
+import threading
+
+
+class SimulationScriptPool:
+    ''' [Description]
+    pool of SimulationScriptABC instances, keyed by ( mode class, script class ). Each mode that is running holds one script from the pool, and gives it back when the mode ends, so the number of scripts only grows with the number of modes that run at the same time, not with the number of rounds.
+    '''
+
+    def __init__(self):
+        self.idle = {} # { (mode class, script class) : [ scripts that are not paired with a running mode ] }
+        self.in_use = {} # { mode : (key, script) } scripts that are paired with a running mode
+        self.created = 0 # number of scripts that the pool has created
+        self.lock = threading.Lock()
+
+    def __str__(self):
+        return f'SimulationScriptPool({len(self.in_use)} in use, {sum(len(s) for s in self.idle.values())} idle)'
+
+    def prepare(self, mode, script_class):
+        '''
+        [summary] creates a script for <mode>'s class ahead of time ( e.g. so any problems in the script's __init__ show up before the experiment starts ), unless an idle one already exists
+        Args:
+            mode (ModeABC) : mode that the script gets created with
+            script_class (class | function) : SimulationScriptABC subclass, or any function that creates a script from a mode ( e.g. a functools.partial )
+        Returns:
+            (SimulationScriptABC) : the idle script
+        '''
+        key = (mode.__class__, script_class)
+        with self.lock:
+            scripts = self.idle.setdefault(key, [])
+            if len(scripts) > 0:
+                return scripts[-1]
+        script = script_class(mode)
+        with self.lock:
+            self.created += 1
+            self.idle[key].append(script)
+        return script
+
+    def acquire(self, mode, script_class):
+        '''
+        [summary] pairs <mode> with a script. Reuses an idle script for the same mode class if there is one ( resetting it for the new mode ), and otherwise creates a new script.
+        Args:
+            mode (ModeABC) : the mode that is starting
+            script_class (class | function) : SimulationScriptABC subclass that runs alongside the mode, or any function that creates one from a mode
+        Returns:
+            (SimulationScriptABC) : the script paired with <mode>
+        '''
+        key = (mode.__class__, script_class)
+        with self.lock:
+            if mode in self.in_use:
+                return self.in_use[mode][1]
+            scripts = self.idle.get(key)
+            script = scripts.pop() if scripts else None
+        if script is None:
+            script = script_class(mode)
+            with self.lock: self.created += 1
+        elif script.mode is not mode:
+            script.reset(mode)
+        with self.lock:
+            self.in_use[mode] = (key, script)
+        return script
+
+    def release(self, mode):
+        '''
+        [summary] called once <mode> ends. Cancels any vole commands that its script left waiting, and returns the script to the pool so the next mode of the same class can reuse it.
+        Args:
+            mode (ModeABC) : the mode that ended
+        Returns:
+            (SimulationScriptABC | None) : the script that was released, or None if the mode did not have one
+        '''
+        with self.lock:
+            (key, script) = self.in_use.pop(mode, (None, None))
+        if script is None:
+            return None
+        script.release()
+        with self.lock:
+            self.idle.setdefault(key, []).append(script)
+        return script
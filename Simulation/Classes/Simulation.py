@@ -9,7 +9,8 @@ Property of Donaldson Lab at the University of Colorado at Boulder
 
 # Standard Lib Imports 
 import threading, time, json, sys
-import random # Do Not Delete. Necessary for lambda function in rfid config file.
+import functools
+import random # Do Not Delete. Necessary for seeding, and for the lambda functions in the simulation config file.
 import os
 cwd = os.getcwd() 
 
@@ -17,15 +18,26 @@ cwd = os.getcwd()
 from Logging.logging_specs import sim_log
 from Simulation.Logging.logging_specs import vole_log, clear_log
 from .Vole import SimVole
+from .ScriptPool import SimulationScriptPool
+from .Trace import TraceRecorder, TraceReplayer
+from .TroughSensor import SimTroughSensor
+from ..Scripts.Replay import TraceReplay
+from Control.Classes.Clock import CLOCK, ScaledClock, VirtualClock
+from Control.Classes.Threads import threaded, start_thread
+from Control.Classes.Scheduler import Scheduler, ClockedScheduler
 
 
 class Simulation: 
 
-    def __init__(self, modes, config_filename = None): 
+    def __init__(self, modes, config_filename = None, seed = None, trace_file = None, replay_file = None): 
 
         """ Class that manages/runs the Simulation package. 
         Args: 
             modes ([ModeABC]) : an ordered list of control modes that will run 
+            config_filename (string, optional) : simulation configuration file in Simulation/Configurations ( or an absolute filepath ). Defaults to simulation.json 
+            seed (int, optional) : seed for every random decision that the voles and simulated interactables make. Overrides the seed in the configuration file. If neither provides a seed, one is generated and recorded in the output file so the run can be replayed. 
+            trace_file (string, optional) : records every vole action to this trace file. Overrides "trace" in the configuration file. 
+            replay_file (string, optional) : rather than running the paired simulation scripts, replays the vole actions from this trace file. Overrides "replay" in the configuration file. 
         """
         
         print(f'\n Simulation Created: {self}')
@@ -36,35 +48,38 @@ class Simulation:
 
         self.event_manager = self.map.event_manager # get event manager object from map 
 
+        self.seed = seed # set by configure_simulation if not passed in 
+
+        self.trace_file = trace_file # set by configure_simulation if not passed in 
+        self.recorder = None # TraceRecorder, if recording a trace 
+        self.replay_file = replay_file # set by configure_simulation if not passed in 
+        self.replayer = None # TraceReplayer, if replaying a trace 
+        self.trough_scheduler = None # runs the simulated trough sensors' edges, if any dispensers have one ( see configure_simulation ) 
+
         if config_filename is None: 
             
-            self.configure_simulation(cwd + '/Simulation/Configurations/simulation.json') # configure sim: updates interactables w/ simulation attributes & instantiates voles 
+            self.configure_simulation(os.path.join(cwd, 'Simulation', 'Configurations', 'simulation.json')) # configure sim: updates interactables w/ simulation attributes & instantiates voles 
 
         else: 
 
-            self.configure_simulation(cwd + '/Simulation/Configurations/' + config_filename)
+            self.configure_simulation(os.path.join(cwd, 'Simulation', 'Configurations', config_filename)) # config_filename can also be an absolute filepath 
 
-        self.simulation_func = {} # dict for pairing a mode with a simulation function ( or list of simulation functions )
+        self.simulation_func = {} # (optional) dict for pairing a specific mode instance with a simulation script instance. Takes priority over control_sim_pairs. 
 
         self.control_sim_pairs = {} # dict (assigned in __main__) that pairs a Mode Name with a Simulation Class
 
+        self.script_pool = SimulationScriptPool() # scripts for the control_sim_pairs get handed out by the pool, which reuses them across rounds rather than creating a new script for each new mode instance 
+
         self.modes = modes # Control modes that will run
 
         self.current_mode = None # contains the Mode object that the control software is currently running. 
 
+        self.lifecycle = self.event_manager.subscribe() # mode lifecycle events ( entered, setup_done, timeout_started, exiting, exited ). The simulation waits on these rather than polling the mode's attributes. 
+
     def __str__(self): 
         return __name__
 
-    def run_in_thread(func): 
-        ''' decorator function to run function on its own thread '''
-        def run(*k, **kw): 
-            t = threading.Thread(target = func, args = k, kwargs=kw, daemon=True)
-            t.name = func.__name__
-            t.start() 
-            return t
-        return run 
-
-    @run_in_thread
+    @threaded('simulation', 'mode_simulation')
     def run_active_mode_sim(self, current_mode): 
 
         ''' called from run_sim() 
@@ -76,31 +91,33 @@ class Simulation:
         '''
 
         #
-        # Wait for Mode's Timeout Interval
-        while not current_mode.inTimeout and current_mode.active: # active mode not in Timeout
-            # while not in timeout portion of mode, loop 
-            time.sleep(0.5)
+        # Wait for Mode's Timeout Interval ( mode publishes 'timeout_started' ) 
+        self.lifecycle.wait_until(lambda: current_mode.inTimeout or not current_mode.active)
 
         # sim_log(f'(Simulation.py, run_active_mode_sim) The current mode ({current_mode}) entered in timeout. Checking for if a simulation should be run. ')
 
         #
         # Check for if simulation function exists for the current mode 
-        if current_mode not in self.simulation_func.keys(): # no simulation function specified for this mode 
+        sim = self.simulation_func.get(current_mode) 
+        if self.replayer is not None: 
+
+            # replaying a trace, so every mode gets paired with the replay script 
+            sim = self.script_pool.acquire(current_mode, self.replay_script)
+
+        elif sim is None: # no simulation script instance specified for this mode 
             
             # Check dictionary to make sure a simulation wasn't specified there 
             if current_mode.__class__.__name__ in self.control_sim_pairs: 
                 
-                # create the simulation and run it!
-                sim = self.control_sim_pairs[current_mode.__class__.__name__]
-                self.simulation_func[current_mode] = sim(self.current_mode)
+                # grab a simulation script from the pool and run it!
+                sim = self.script_pool.acquire(current_mode, self.control_sim_pairs[current_mode.__class__.__name__])
             
             else: 
 
                 # do nothing loop until current mode is inactive 
                 # sim_log(f'(Simulation.py, run_sim) No simulation function for {type(current_mode)}.')
                 print(f'(Simulation.py, run_sim) No simulation function for {type(current_mode)}.')      
-                while current_mode.active: 
-                    time.sleep(0.5)
+                self.lifecycle.wait_until(lambda: not current_mode.active)
                 return 
 
    
@@ -114,11 +131,11 @@ class Simulation:
         for v in self.voles: 
             v.active = True 
 
+        sim.simulation = self # gives the script access to the simulation's seeded random streams 
+
         #
         # Run the Mode's Simulation Function in separate thread. Exit when the running mode becomes inactive or exits its timeout interval. 
         # sim_fn_list = self.simulation_func[current_mode]
-        
-        sim = self.simulation_func[current_mode]
 
         with current_mode.simulation_lock: # grab lock to denote that simulation is running 
             '''for sim_fn in sim_fn_list: 
@@ -128,13 +145,16 @@ class Simulation:
                 sim_thread.start() '''
             if sim is not None: 
                 self.map.event_manager.print_to_terminal(f'\n     (Simulation.py, run_sim) New Simulation Function Running: {sim}')
-                sim_thread = threading.Thread(target = sim.run, daemon=True)
-                sim_thread.name = 'simulations run function'
-                sim_thread.start()
+                sim_done = threading.Event() 
+                def run_sim_script(): 
+                    try: sim.run() 
+                    finally: 
+                        sim_done.set() 
+                        self.lifecycle.put(current_mode, 'simulation_finished') # wake the wait below 
+                sim_thread = start_thread(run_sim_script, subsystem = 'simulation', owner = sim, purpose = 'simulation_script')
 
-                while current_mode.inTimeout and current_mode.active and sim_thread.is_alive(): 
-                    
-                    time.sleep(1)  # let the simulation continue to run while mode is both active and in timeout
+                # let the simulation continue to run while mode is both active and in timeout
+                self.lifecycle.wait_until(lambda: not ( current_mode.inTimeout and current_mode.active ) or sim_done.is_set())
 
                 if current_mode.inTimeout is False or current_mode.active is False: 
                     # mode ended, don't finish running other sim_fn
@@ -158,12 +178,20 @@ class Simulation:
             for v in self.voles: 
                 v.active = False 
 
-            sim_thread.join()
+            # Drop any vole commands that the simulation sent but the voles never got to 
+            cancelled = sim.cancel() 
+            if cancelled > 0: 
+                self.map.event_manager.print_to_terminal(f'(Simulation.py, run_sim) cancelled {cancelled} vole commands that were still waiting when {current_mode} ended.')
+
+            CLOCK.join(sim_thread)
+
+            # Return the script to the pool so the next mode of the same class can reuse it 
+            self.script_pool.release(current_mode) 
             # print(f'RETURNING FROM RUN_ACTIVE_MODE_SIM(). Sim Thread {sim_thread.name} // isAlive:', sim_thread.is_alive())
         
         return sim_thread
         
-    @run_in_thread
+    @threaded('simulation', 'simulation_loop')
     def run_sim(self): 
 
         ''' This Function Runs Continuously Until the Experiment Ends 
@@ -196,8 +224,8 @@ class Simulation:
             self.current_mode = self.get_active_mode() # update the current mode 
 
             while self.current_mode is None: # if no mode is currently active 
-                # wait for a mode to become active 
-                time.sleep(1)
+                # wait for a mode to become active ( mode publishes 'setup_done' ) 
+                self.lifecycle.wait_until(lambda: self.get_active_mode() is not None)
                 self.current_mode = self.get_active_mode() # update the current mode when one becomes active 
 
             # update the map to match the new current mode map; if the current map does not match the previous map, this may cause errors, so we should raise Exception explaining that a different instance of Simulation should get created to run for a different MAP instance 
@@ -212,14 +240,13 @@ class Simulation:
 
             t = self.run_active_mode_sim(self.current_mode)
             t.name = 'run_active_mode_sim'
-            t.join() 
+            CLOCK.join(t) 
 
             
             # print(f'BACK FROM RUNNING THE ACTIVE MODE SIM! THREAD STATE: {t.name}, {t.is_alive}')
 
             # if the current mode is still active, wait here until it finishes so we don't run a mode's simulation more than once. 
-            while self.current_mode.active: 
-                time.sleep(0.5)
+            self.lifecycle.wait_until(lambda: not self.current_mode.active)
 
     def get_active_mode(self): 
         ''' Retrieves the active mode from the event manager. (If a mode is running, it gets registered with the event_manager.)
@@ -257,8 +284,39 @@ class Simulation:
         # closing JSON file
         f.close() 
 
+        ## optional: run the experiment in virtual time, or faster than real time ## 
+        time_scale = data.get('time_scale', 1)
+        if data.get('virtual_time', False): 
+            # the clock jumps ahead to the next event whenever every thread is sleeping, so timeouts, ITIs and vole sleeps finish immediately ( timestamps are still recorded in simulated seconds )
+            if time_scale != 1: 
+                print(f'(Simulation.py, configure_simulation) virtual_time is set, so ignoring the time_scale of {time_scale}.')
+            CLOCK.use(VirtualClock())
+            print(f'(Simulation.py, configure_simulation) Simulation is running in virtual time.')
+        elif time_scale != 1: 
+            # compresses timeouts, ITIs, countdowns and simulated delays by <time_scale>. Hardware interactables still move in real time. 
+            CLOCK.use(ScaledClock(time_scale))
+            print(f'(Simulation.py, configure_simulation) Simulation is running {time_scale}x faster than real time.')
+
+        ## seed the random number generators ## 
+        if self.seed is None: self.seed = data.get('seed')
+        if self.seed is None: self.seed = random.SystemRandom().randrange(2**32) # record a generated seed, so that this run can still be replayed 
+        self.event_manager.set_run_metadata('seed', self.seed)
+        print(f'(Simulation.py, configure_simulation) Simulation random seed: {self.seed}')
+
+        ## optional: record every vole action to a trace file, or replay the actions from one ## 
+        if self.trace_file is None: self.trace_file = data.get('trace')
+        if self.trace_file is not None: 
+            self.recorder = TraceRecorder(self.map, self.trace_file)
+            print(f'(Simulation.py, configure_simulation) Recording vole actions to {self.trace_file}')
+        if self.replay_file is None: self.replay_file = data.get('replay')
+        if self.replay_file is not None: 
+            self.replayer = TraceReplayer.from_file(self.map, self.replay_file)
+            self.replay_script = functools.partial(TraceReplay, replayer = self.replayer)
+            print(f'(Simulation.py, configure_simulation) Replaying {len(self.replayer.entries)} vole actions from {self.replay_file} in place of the simulation scripts')
+
         ## add a simulation boolean attribute to each component that is on an edge in the map ## 
         # if an interactable doesn't exist in the json file, print message and set simulation attribute to be False 
+        trough_specs = [] # [ (dispenser, trough_sensor option) ] 
         for (name, i) in self.map.instantiated_interactables.items(): # loop thru interactable names 
             # check if name was specified in the config file 
             set = False 
@@ -269,9 +327,16 @@ class Simulation:
                     i.isSimulation = interactable_specs['simulate']
                     set = True 
 
+                    # each interactable gets its own random stream, which is also what "random" refers to in its simulate_with_fn 
+                    i.random = self.rng_stream('interactable', name)
+
                     # if provided, set the optional function to call for simulation process
                     if 'simulate_with_fn' in interactable_specs: 
-                        setattr(i, 'simulate_with_fn', eval(interactable_specs['simulate_with_fn']))
+                        setattr(i, 'simulate_with_fn', eval(interactable_specs['simulate_with_fn'], dict(globals(), random = i.random)))
+
+                    # (dispensers only) if provided, the dispenser's trough sensor gets simulated, so its hardware path runs rather than setting its state directly 
+                    if interactable_specs.get('trough_sensor'): 
+                        trough_specs.append( (i, interactable_specs['trough_sensor']) )
             
                     break   
 
@@ -280,6 +345,7 @@ class Simulation:
                 i.messagesReturnedFromSetup+=f'[simulation.json did not contain the interactable {name}. Defaults to True]'
                 # sim_log(f'simulation.json did not contain the interactable {name}. sim defaults to True, so this interactable will be simulated as the simulation runs.')
                 i.isSimulation = True 
+                i.random = self.rng_stream('interactable', name)
             
             ''' if an object is set to be a Simulation, then automatically will set any Button and Servo Objects that it uses to be a simulation also. '''
             if i.isSimulation is True: 
@@ -294,12 +360,34 @@ class Simulation:
                     i.servoObj.servo = None
                     # i.messagesReturnedFromSetup += f' simulating servo.'
 
+        ## optional: simulate dispenser trough sensors ## 
+        for (i, options) in trough_specs: 
+            if not hasattr(i, 'trough'): 
+                raise Exception(f'(Simulation.py, configure_simulation) "trough_sensor" was set for {i.name}, but only dispensers have a trough sensor')
+            if not i.isSimulation: 
+                print(f'(Simulation.py, configure_simulation) ignoring the "trough_sensor" for {i.name}, since its hardware is not being simulated.')
+                continue 
+            if self.trough_scheduler is None: 
+                # the sensors' edges and confirm windows have to run on the experiment's clock in virtual time, or the dispenser would time out before the pellet lands 
+                self.trough_scheduler = ClockedScheduler() if CLOCK.isVirtual else Scheduler.shared()
+            SimTroughSensor(i, scheduler = self.trough_scheduler, **( options if isinstance(options, dict) else {} ))
+            print(f'(Simulation.py, configure_simulation) Simulating the trough sensor for {i.name}')
 
         ## add Voles ## 
         for v in data['voles']: 
             self.new_vole(v['tag'], v['start_chamber'], v['rfid_id'])
         return 
 
+    def rng_stream(self, kind, name): 
+        ''' returns an independent random number generator for a single vole or interactable. The stream only depends on the simulation's seed and the name of its owner, so it makes the same draws no matter how the threads are scheduled. 
+        Args: 
+            kind (string) : 'vole' or 'interactable' 
+            name (int|string) : the vole's tag, or the interactable's name 
+        Returns: 
+            (random.Random) : seeded generator 
+        '''
+        return random.Random(f'{self.seed}:{kind}:{name}')
+
     #
     # Vole Getters and Setters 
     #
@@ -342,6 +430,7 @@ class Simulation:
         if self.get_vole(tag) is not None: 
             # sim_log(f'vole with tag {tag} already exists')
             print(f'you are trying to create a vole with the tag {tag} twice')
+            if not self.map.interactive: return # skip creating this vole 
             inp = input(f'Would you like to skip the creating of this vole and continue running the simulation? If no, the simulation and experiment will stop running immediately. Please enter: "y" or "n". ')
             if inp == 'y': return 
             if inp == 'n': sys.exit(0)
@@ -351,6 +440,7 @@ class Simulation:
         if rfid_id is not None and self.get_vole_by_rfid_id(rfid_id) is not None: 
             # sim_log(f'vole with rfid_id {rfid_id} already exists')
             print(f'you are trying to create a vole with the rfid_id {rfid_id} twice')
+            if not self.map.interactive: return # skip creating this vole 
             inp = input(f'Would you like to skip the creating of this vole and continue running the simulation? If no, the simulation and experiment will stop running immediately. Please enter: "y" or "n". ')
             if inp == 'y': return 
             if inp == 'n': sys.exit(0)
@@ -362,6 +452,8 @@ class Simulation:
             # sim_log(f'trying to place vole {tag} in a nonexistent chamber #{start_chamber}.')
             print(f'trying to place vole {tag} in a nonexistent chamber #{start_chamber}.')
             print(f'existing chambers: ', self.map.graph.keys())
+            if not self.map.interactive: 
+                raise Exception(f'(Simulation.py, new_vole) trying to place vole {tag} in a nonexistent chamber #{start_chamber}. Existing chambers: {list(self.map.graph.keys())}')
             while chmbr is None: 
                 ans = input(f'enter "q" if you would like to exit the experiment, or enter the id of a different chamber to place this vole in.\n')
                 if ans == 'q': exit() 
@@ -371,7 +463,8 @@ class Simulation:
                 except ValueError as e: print(f'invalid input. Must be a number or the letter q. ({e})')            
 
         # Create new Vole 
-        newVole = SimVole(tag, start_chamber, rfid_id, self.map)
+        newVole = SimVole(tag, start_chamber, rfid_id, self.map, rng = self.rng_stream('vole', tag))
+        newVole.recorder = self.recorder 
         self.voles.append(newVole)
         return newVole
     
@@ -388,6 +481,7 @@ class Simulation:
             return 
         else: 
             self.voles.remove(vole)    
+            self.map.remove_vole_position(tag)
     
     
 if __name__ == '__main__': 
@@ -15,6 +15,7 @@ from code import interact
 from Logging.logging_specs import sim_log
 from Simulation.Logging.logging_specs import vole_log, clear_log
 from .Vole import SimVole
+from .VoleActors import VoleActor, VoleScheduler
 
 # Standard Lib Imports 
 import threading, time, json, inspect, random, sys
@@ -33,7 +34,87 @@ class SimulationScriptABC(metaclass=ABCMeta):
         self.mode = mode # the mode that this simulation script is paired with  
         self.map = self.mode.map 
         self.event_manager = self.map.event_manager
+        self.simulation = None # the Simulation running this script, set once the script gets paired with a mode ( see Simulation.run_active_mode_sim ) 
+        self.actors = {} # { vole tag : VoleActor } mailboxes for sending commands to voles, see tell() 
+        self.scheduler = VoleScheduler.shared() # worker threads that carry out the vole commands ( shared across every simulation script ) 
     
+    #
+    # Script Pooling 
+    #
+    def reset(self, mode): 
+        ''' 
+        [summary] reuses this script for a new instance of the same mode ( e.g. an inner mode that was created again for a new round ). Called by the SimulationScriptPool rather than creating a new script. 
+                  Override to clear any state that should not carry over between rounds, and call super().reset(mode). 
+        Args: 
+            mode (ModeABC) : the new mode that this script will run alongside of 
+        '''
+        self.mode = mode 
+        self.map = self.mode.map 
+        self.event_manager = self.map.event_manager 
+        for a in self.actors.values(): 
+            a.mode = mode 
+
+    def release(self): 
+        ''' [summary] called by the SimulationScriptPool once this script's mode ends. Cancels any vole commands that were left waiting. '''
+        self.cancel() 
+
+    #
+    # Vole Commands 
+    #
+    def actor(self, vole): 
+        ''' 
+        [summary] returns the VoleActor for <vole>, creating it the first time that the vole gets sent a command 
+        Args: 
+            vole (SimVole | int) : the vole, or the vole's tag 
+        Returns: 
+            (VoleActor) : the vole's actor 
+        '''
+        if not isinstance(vole, SimVole): 
+            tag = vole
+            vole = self.map.get_vole(tag)
+            if vole is None: 
+                raise Exception(f'(SimulationScriptABC.py, actor) there is no vole with the tag {tag}')
+        actor = self.actors.get(vole.tag)
+        if actor is None: 
+            actor = VoleActor(vole, self.scheduler, self.mode)
+            self.actors[vole.tag] = actor 
+        return actor 
+
+    def tell(self, vole, command, *args): 
+        ''' 
+        [summary] sends a command to a vole, and returns without waiting for the vole to carry it out. Each vole carries out its commands in order, while different voles carry out their commands at the same time. 
+        Args: 
+            vole (SimVole | int) : the vole, or the vole's tag 
+            command (string) : 'attempt_move', 'move_to_interactable', 'simulate_vole_interactable_interaction', 'simulate_move_and_interactable' or 'attempt_random_action'
+            args : arguments for the command 
+        Returns: 
+            (Future) : call .result() on this to wait for the vole to finish the command. Gets cancelled if the mode ends before the command runs. 
+        '''
+        return self.actor(vole).tell(command, *args)
+
+    def join(self, voles = None, timeout = None): 
+        ''' 
+        [summary] waits until the voles have finished ( or had cancelled ) every command they have been sent 
+        Args: 
+            voles ([SimVole | int], optional) : voles to wait on. Defaults to every vole that has been sent a command. 
+            timeout (float, optional) : max seconds to wait on each vole 
+        Returns: 
+            (Boolean) : True if every vole finished its commands 
+        '''
+        actors = self.actors.values() if voles is None else [ self.actor(v) for v in voles ]
+        return all( [ a.join(timeout) for a in actors ] )
+
+    def cancel(self, voles = None): 
+        ''' 
+        [summary] cancels any commands that the voles have not started yet. Simulation calls this once the mode ends. 
+        Args: 
+            voles ([SimVole | int], optional) : voles to cancel the commands of. Defaults to every vole that has been sent a command. 
+        Returns: 
+            (int) : number of commands that got cancelled 
+        '''
+        actors = self.actors.values() if voles is None else [ self.actor(v) for v in voles ]
+        return sum( [ a.cancel() for a in actors ] )
+
     @abstractmethod
     def run(self): 
         ''' override with logic '''
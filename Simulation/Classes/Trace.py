@@ -0,0 +1,233 @@
+"""
+Description: Class definitions for recording and replaying simulated vole behavior.
+            TraceRecorder writes every vole action ( attempt_move, move_to_interactable, move_next_component, update_location, simulate_vole_interactable_interaction ... ) and its outcome to a trace file with one json object per line.
+            TraceReplayer reads a trace back and re-drives the same top-level actions against a fresh Map and set of Control Modes. Replays skip the random choices and the idle time between actions, so a session that showed a control bug can be reproduced without rerunning the whole simulation.
+
+            Trace entries look like: {"seq": 12, "t": 31.5, "vole": 1, "action": "attempt_move", "args": [2], "depth": 0, "mode": "Lever1", "round": 1, "result": true}
+            depth is 0 for the actions that the simulation script asked for, and goes up by one for each action that another action called. Only depth 0 actions get replayed.
+
+Property of Donaldson Lab at the University of Colorado at Boulder
+"""
+
+# Standard Lib Imports
+import json
+import threading
+import itertools
+import functools
+
+# Local Imports
+from Control.Classes.Clock import CLOCK
+from Control.Classes.Threads import start_thread
+
+
+#
+# Encoding Actions
+#
+def encode(map, value):
+    ''' [summary] converts an argument or result of a vole action into something json can store. Interactables, components and locations are stored by name/id so they can be found again in a fresh Map. '''
+    if value is None or isinstance(value, (bool, int, float, str)):
+        return value
+    if isinstance(value, (list, tuple)):
+        return [ encode(map, v) for v in value ]
+    if hasattr(value, 'threshold_condition') and hasattr(value, 'name'): # Interactable
+        return { 'interactable': value.name }
+    if hasattr(value, 'interactableSet'): # ComponentSet ( unordered interactables of a chamber )
+        for c in map.graph.values():
+            if c.unorderedComponent is value:
+                return { 'unordered_component': c.id }
+    elif hasattr(value, 'interactable'): # Component
+        for loc in list(map.graph.values()) + map.edges:
+            components = loc.get_component_list()
+            for (idx, comp) in enumerate(components):
+                if comp is value:
+                    return { 'component': loc.edge_or_chamber, 'id': loc.id, 'index': idx }
+    elif getattr(value, 'edge_or_chamber', None) in ('chamber', 'edge'): # Chamber or Edge
+        return { 'location': value.edge_or_chamber, 'id': value.id }
+    return { 'repr': repr(value) } # cannot be replayed
+
+
+def decode(map, value):
+    ''' [summary] reverses encode(), looking up the interactables, components and locations in <map> '''
+    if isinstance(value, list):
+        return [ decode(map, v) for v in value ]
+    if not isinstance(value, dict):
+        return value
+    if 'interactable' in value:
+        return map.instantiated_interactables[value['interactable']]
+    if 'unordered_component' in value:
+        return map.get_chamber(value['unordered_component']).unorderedComponent
+    if 'component' in value:
+        loc = map.get_chamber(value['id']) if value['component'] == 'chamber' else map.get_edge(value['id'])
+        return loc.get_component_list()[value['index']]
+    if 'location' in value:
+        return map.get_chamber(value['id']) if value['location'] == 'chamber' else map.get_edge(value['id'])
+    raise Exception(f'(Trace.py, decode) cannot replay the value {value["repr"]}, since it was not recorded in a replayable format')
+
+
+#
+# Recording
+#
+class TraceRecorder:
+    ''' [Description]
+    writes vole actions to a trace file. SimVoles that have a recorder ( vole.recorder ) report every call to their @traced methods here.
+    '''
+
+    def __init__(self, map, filepath):
+        """
+        Args:
+            map (Map) : the map the voles are moving through, for encoding interactables and components
+            filepath (string) : trace file to write. Overwritten if it already exists.
+        """
+        self.map = map
+        self.filepath = filepath
+        self.file = open(filepath, 'w', buffering = 1) # line buffered, so the trace is complete up to the last action even if the experiment crashes
+        self.lock = threading.Lock()
+        self.sequence = itertools.count()
+        self.local = threading.local() # call depth for each thread
+        self.count = 0
+
+    def __str__(self):
+        return f'TraceRecorder({self.filepath}, {self.count} actions)'
+
+    def begin(self):
+        ''' [summary] called when a traced action starts. Returns (sequence number, call depth) '''
+        depth = getattr(self.local, 'depth', 0)
+        self.local.depth = depth + 1
+        return (next(self.sequence), depth)
+
+    def end(self, vole, action, args, kwargs, seq, depth, start, result = None, error = None):
+        ''' [summary] called when a traced action finishes. Writes the action to the trace file. '''
+        self.local.depth = depth
+        mode = vole.event_manager.mode
+        entry = {
+            'seq': seq,
+            't': start,
+            'vole': vole.tag,
+            'action': action,
+            'args': encode(self.map, args),
+            'depth': depth,
+            'mode': None if mode is None else mode.__class__.__name__,
+            'round': None if mode is None else mode.current_round,
+            'duration': round(CLOCK.monotonic() - start, 6)
+        }
+        if kwargs: entry['kwargs'] = { k: encode(self.map, v) for (k, v) in kwargs.items() }
+        if error is not None: entry['error'] = error
+        else: entry['result'] = encode(self.map, result)
+        line = json.dumps(entry)
+        with self.lock:
+            if self.file is not None:
+                self.file.write(line + '\n')
+                self.count += 1
+
+    def close(self):
+        with self.lock:
+            if self.file is not None:
+                self.file.close()
+                self.file = None
+
+
+def traced(fn):
+    ''' decorator for SimVole methods. If the vole has a recorder, the call and its outcome get written to the trace. Otherwise the method runs as usual. '''
+    action = fn.__name__
+
+    @functools.wraps(fn)
+    def wrapper(self, *args, **kwargs):
+        recorder = self.recorder
+        if recorder is None:
+            return fn(self, *args, **kwargs)
+        (seq, depth) = recorder.begin()
+        start = CLOCK.monotonic()
+        try:
+            result = fn(self, *args, **kwargs)
+        except Exception as e:
+            recorder.end(self, action, args, kwargs, seq, depth, start, error = repr(e))
+            raise
+        recorder.end(self, action, args, kwargs, seq, depth, start, result = result)
+        return result
+    return wrapper
+
+
+#
+# Replaying
+#
+def load_trace(filepath):
+    ''' [summary] reads a trace file, and returns its entries in the order that the actions started '''
+    with open(filepath) as f:
+        entries = [ json.loads(line) for line in f if line.strip() ]
+    return sorted(entries, key = lambda e: e['seq'])
+
+
+class TraceReplayer:
+    ''' [Description]
+    re-drives the depth 0 actions from a trace against a fresh Map. Each vole replays its own actions in the order it originally took them, with every vole running on its own thread so that voles still act at the same time.
+    Nothing is chosen at random, and the time that voles originally spent sleeping between actions is skipped. The fixed waits after each interaction are cut short once the interactable's threshold is met ( see SimVole.settle ), so a replay takes only as long as the control side needs to respond.
+    '''
+
+    def __init__(self, map, entries):
+        """
+        Args:
+            map (Map) : fresh map, set up with the same configuration files as the recorded run
+            entries ([dict]) : trace entries ( see load_trace )
+        """
+        self.map = map
+        self.entries = [ e for e in entries if e['depth'] == 0 ]
+        self.mismatches = [] # [ (entry, replayed result) ] actions whose outcome differed from the recording
+        self.lock = threading.Lock()
+
+    @classmethod
+    def from_file(cls, map, filepath):
+        return cls(map, load_trace(filepath))
+
+    def entries_for(self, mode = None, round = None):
+        ''' [summary] the actions that were recorded while <mode> ( a mode class name ) was running <round> '''
+        return [ e for e in self.entries if ( mode is None or e['mode'] == mode ) and ( round is None or e['round'] == round ) ]
+
+    def replay_action(self, entry):
+        ''' [summary] performs a single recorded action and compares its outcome against the recording. Returns the replayed result. '''
+        vole = self.map.get_vole(entry['vole'])
+        if vole is None:
+            raise Exception(f'(Trace.py, replay_action) the trace contains vole {entry["vole"]}, which does not exist in the map')
+        args = decode(self.map, entry['args'])
+        kwargs = { k: decode(self.map, v) for (k, v) in entry.get('kwargs', {}).items() }
+        try:
+            result = encode(self.map, getattr(vole, entry['action'])(*args, **kwargs))
+        except Exception as e:
+            result = None
+            if 'error' not in entry:
+                self.map.event_manager.print_to_terminal(f'(Trace.py, replay_action) {vole} raised {e!r} while replaying {entry["action"]}{tuple(entry["args"])}')
+        if result != entry.get('result'):
+            with self.lock:
+                self.mismatches.append( (entry, result) )
+        return result
+
+    def replay(self, mode = None, round = None, until = None):
+        '''
+        [summary] replays the recorded actions, with one thread per vole
+        Args:
+            mode (string, optional) : only replay the actions recorded while this mode class was running
+            round (int, optional) : only replay the actions recorded during this round
+            until (function, optional) : stops replaying once this returns False ( e.g. lambda: mode.active )
+        Returns:
+            ([ (dict, result) ]) : the actions whose replayed outcome did not match the recording
+        '''
+        per_vole = {}
+        for e in self.entries_for(mode, round):
+            per_vole.setdefault(e['vole'], []).append(e)
+
+        def run_vole(entries):
+            vole = self.map.get_vole(entries[0]['vole'])
+            if vole is not None: vole.replaying = True
+            try:
+                for e in entries:
+                    if until is not None and not until():
+                        return
+                    self.replay_action(e)
+            finally:
+                if vole is not None: vole.replaying = False
+
+        threads = []
+        for (tag, entries) in per_vole.items():
+            threads.append(start_thread(run_vole, (entries,), subsystem = 'simulation', owner = self, purpose = f'replay_vole{tag}'))
+        for t in threads:
+            CLOCK.join(t)
+        return self.mismatches
@@ -0,0 +1,70 @@
+"""
+Description: Class definition for SimTroughSensor, which stands in for the GPIO sensor in a dispenser's food trough.
+            Rather than setting the dispenser's state directly, the simulated sensor feeds edges into the dispenser's debouncer the same way the GPIO callback would, including a few bounces each time a pellet lands in or is taken from the trough.
+            This lets the dispenser's hardware path ( dispense, the debounce confirm windows, and the retrieval latency ) run without a Raspberry Pi.
+
+Property of Donaldson Lab at the University of Colorado at Boulder
+"""
+
+# Local Imports
+from Control.Classes.Clock import CLOCK
+from Control.Classes.Scheduler import Scheduler
+
+
+class SimTroughSensor:
+    ''' [Description]
+    simulated trough sensor for a single dispenser. Attaches itself to the dispenser when it is created, so that the dispenser's start() drops a pellet into the trough after <drop_delay> seconds, and sim_vole_retrieval() takes it back out.
+    The dispenser's debouncer gets moved onto the sensor's scheduler, so that its confirm windows are timed on the same clock as the edges being fed to it.
+    Add "trough_sensor" to a dispenser's entry in simulation.json to attach one ( see Simulation.configure_simulation ).
+    '''
+
+    def __init__(self, dispenser, drop_delay = 0.3, bounces = 3, bounce_interval = 0.002, scheduler = None):
+        """
+        Args:
+            dispenser (dispenser) : the dispenser whose sensor is being simulated
+            drop_delay (float, optional) : seconds after the dispenser's servo starts that the pellet lands in the trough. If None, pellets never land ( e.g. to simulate a jammed dispenser ).
+            bounces (int, optional) : number of extra edge pairs that the sensor reads each time its level changes
+            bounce_interval (float, optional) : seconds between each bounce edge. Must be shorter than the dispenser's confirm windows for the bounces to get filtered out.
+            scheduler (Scheduler, optional) : runs the delayed edges and the debouncer's confirm windows. Defaults to the shared scheduler, which runs in real time. Pass a ClockedScheduler when the experiment is running on a VirtualClock.
+        """
+        self.dispenser = dispenser
+        self.drop_delay = drop_delay
+        self.bounces = bounces
+        self.bounce_interval = bounce_interval
+        self.scheduler = scheduler if scheduler is not None else Scheduler.shared()
+        self.level = dispenser.trough.state # current level of the simulated pin
+        self.edges = 0 # number of edges that have been fed to the dispenser
+        dispenser.trough.scheduler = self.scheduler
+        dispenser.sim_sensor = self
+
+    def __str__(self):
+        return f'SimTroughSensor({self.dispenser.name}, pellet present: {self.level})'
+
+    def edge(self, level):
+        ''' [summary] a single edge of the simulated pin '''
+        self.level = level
+        self.edges += 1
+        self.dispenser.trough.feed(level, CLOCK.time())
+
+    def set_level(self, level):
+        '''
+        [summary] changes the simulated pin to <level>, bouncing back and forth <bounces> times before it settles
+        Args:
+            level (Boolean) : True if a pellet is in the trough
+        '''
+        self.edge(level)
+        delay = 0
+        for _ in range(self.bounces):
+            delay += self.bounce_interval
+            self.scheduler.call_later(delay, self.edge, not level)
+            delay += self.bounce_interval
+            self.scheduler.call_later(delay, self.edge, level)
+
+    def servo_started(self):
+        ''' [summary] called by the dispenser's start(). Drops a pellet into the trough once <drop_delay> has passed. '''
+        if self.drop_delay is not None:
+            self.scheduler.call_later(self.drop_delay, self.set_level, True)
+
+    def pellet_taken(self):
+        ''' [summary] a vole took the pellet from the trough '''
+        self.set_level(False)
@@ -9,16 +9,19 @@ Property of Donaldson Lab at the University of Colorado at Boulder
 
 
 # Standard Lib Imports 
-from itertools import count
-import time, random
+from itertools import count, accumulate
+import random
+import bisect
 
 # Local Imports 
 from ..Logging.logging_specs import sim_log, vole_log
+from Control.Classes.Clock import CLOCK
+from .Trace import traced
 
 
 class SimVole: 
 
-    def __init__(self, tag, start_chamber, rfid_id, map): 
+    def __init__(self, tag, start_chamber, rfid_id, map, rng = None): 
         """ initializer for a Simulated Vole 
 
         Args: 
@@ -26,6 +29,7 @@ class SimVole:
             rfid_id (hex | int) : the rfid chip value. This value is used to id voles when CAN Bus signals are recieved. If vole has no chip, then this value can be left blank in config file, in which case it will be set to be the value of the tag. 
             start_chamber (int) : the starting location for the sim vole 
             map (Map) : the map instance getting used by the Simulation and Control package. 
+            rng (random.Random, optional) : random number generator for the vole's decisions. The Simulation gives each vole its own seeded stream ( see Simulation.rng_stream ). Defaults to an unseeded generator. 
         """
 
         self.rfid_id = rfid_id # rfid hex value 
@@ -33,6 +37,9 @@ class SimVole:
         self.map = map 
         self.event_manager = map.event_manager
         self.active = True 
+        self.recorder = None # TraceRecorder that the vole's actions get written to, if the simulation is recording a trace ( see Trace.py ) 
+        self.replaying = False # set by the TraceReplayer while it re-drives this vole's actions, so that the vole skips its fixed waits ( see settle ) 
+        self.random = rng if rng is not None else random.Random() # each vole has its own generator, so voles on different threads do not contend for ( or reorder draws from ) the global generator 
 
         ## Vole Location Information ## 
         self.curr_loc = self.map.get_chamber(start_chamber)
@@ -48,6 +55,10 @@ class SimVole:
 
         self.action_probability_dist = {} # Can assign probabilities to a certain action that the vole takes 
 
+        self.action_tables = {} # { (Chamber|Edge, Component|ComponentSet|None) : (map action table version, [actions], [cumulative weights]) } this vole's weighted copy of the map's action tables, see action_table() 
+
+        self.map.set_vole_position(self, self.curr_loc, self.curr_component) # add vole to the map's occupancy index 
+
         print(f'{self} starting in {self.curr_loc.edge_or_chamber}{self.curr_loc.id}, positioned between interactables: {self.prev_component}, {self.curr_component}')
         # vole_log(f'{self} starting in {self.curr_loc.edge_or_chamber}{self.curr_loc.id}, positioned between interactables: {self.prev_component}, {self.curr_component}')
 
@@ -78,6 +89,7 @@ class SimVole:
         else:  
             return False 
 
+    @traced
     def simulate_move_and_interactable(self, interactable): 
         ''' calls helper functions to simulate a movement to <interactable> and then simulate an interaction with <interactable>.
         first moves to the interactable, and if movement is successful then procedes by calling simulate_vole_interactable_interaction on the interactable 
@@ -95,6 +107,20 @@ class SimVole:
         self.simulate_vole_interactable_interaction(interactable)
         return 
 
+    def settle(self, seconds, reacted): 
+        ''' 
+        [summary] gives the control side time to react after the vole interacts with an interactable. Normally sleeps for the full <seconds>. 
+                  While replaying a trace, only waits until reacted() returns True ( or <seconds> pass ), so the replay does not spend time on fixed sleeps. 
+        Args: 
+            seconds (float) : how long to wait 
+            reacted (function) : returns True once the control side has responded to the interaction 
+        '''
+        if self.replaying: 
+            CLOCK.wait_until(reacted, seconds)
+        else: 
+            CLOCK.sleep(seconds)
+
+    @traced
     def simulate_vole_interactable_interaction(self, interactable): 
         ''' simulates a voles interaction with a simulated or non-simulated hardware interactable. 
         runs through a series of error checks to ensure that the requested simulation is valid. 
@@ -148,6 +174,9 @@ class SimVole:
         #
         # Simulate
         #
+        events = interactable.threshold_event_count # so the replay can tell when the interactable has reacted, see settle 
+        reacted = lambda: interactable.threshold or interactable.threshold_event_count > events 
+
         if interactable.isSimulation: 
 
             # vole_log( f'(Vole{self.tag}, simulate_vole_interactable_interaction) simulating vole{self.tag} interaction with {interactable.name}' ) 
@@ -174,13 +203,13 @@ class SimVole:
                 # sim_log(f"(Vole{self.tag}, attempt_move) {interactable.name}, attribute result: {newattrval}")
             
             # countdown(5, f'simulating vole{self.tag} interaction with {interactable.name}') 
-            time.sleep(2) # gives the threshold listener a chance to react to the simulation
+            self.settle(2, reacted) # gives the threshold listener a chance to react to the simulation
             return 
         
         else:  # component should not be simulated, as the hardware for this component is present. 
             # assumes that there is a person present to perform a lever press, interrupt the rfid reader so it sends a ping, etc. 
             print ( f'\nif testing the hardware for {interactable.name}, take any necessary actions now. \n ')
-            time.sleep(5)
+            self.settle(5, reacted)
             
     
     ##
@@ -204,6 +233,7 @@ class SimVole:
                 return True # edge is connected to destination chamber
         return False  
     
+    @traced
     def update_location(self, newcomponent=None, nxt_edge_or_chmbr_id = None): 
         ''' Updates vole's current component position (what component is the vole positioned at) and current location (edge/chamber vole is in). 
         if current component position is None, then check to see if we need to update the vole's chamber/edge/id location 
@@ -216,17 +246,17 @@ class SimVole:
         '''
         
         # make sure that the current chamber/edge/id reflects the newcomponent 
-        prev_loc = self.curr_loc 
+        new_loc = self.curr_loc 
 
         if newcomponent is None: 
             if nxt_edge_or_chmbr_id is None: 
                 raise Exception(f'(Vole{self.tag}, update_location) If trying to update vole{self.tag} component location to a newcomponent of None, then must specify the argument for next edge or chamber id that vole should be in!')
-            if prev_loc.edge_or_chamber == 'chamber': 
+            if new_loc.edge_or_chamber == 'chamber': 
                 # grab edge 
-                self.curr_loc = self.map.get_edge(nxt_edge_or_chmbr_id)
+                new_loc = self.map.get_edge(nxt_edge_or_chmbr_id)
             else: 
                 # grab chamber 
-                self.curr_loc = self.map.graph[nxt_edge_or_chmbr_id]
+                new_loc = self.map.graph[nxt_edge_or_chmbr_id]
 
 
         else: 
@@ -234,25 +264,25 @@ class SimVole:
             if type(newcomponent) is self.map.Chamber.ComponentSet: 
                 # Unordered Component
                 # new component is a chamber's unordered component set. Grab any interactable from this set. 
-                self.curr_loc = self.map.get_location_object(newcomponent.interactableSet[0])
+                new_loc = self.map.get_location_object(newcomponent.interactableSet[0])
             else: 
                 # Ordered Component
-                self.curr_loc = self.map.get_location_object(newcomponent.interactable) 
+                new_loc = self.map.get_location_object(newcomponent.interactable) 
+
+        # sets new_loc, prev_loc, curr_component and prev_component, and updates the map's occupancy index, all at once 
+        prev_loc = self.map.move_vole(self, new_loc, newcomponent)
         if prev_loc != self.curr_loc: 
             self.event_manager.print_to_terminal(f'Vole {self.tag} traveled from {prev_loc.edge_or_chamber}{prev_loc.id} into {self.curr_loc.edge_or_chamber}{self.curr_loc.id}')
             # vole_log(f'\nVole {self.tag} traveled from {prev_loc.edge_or_chamber}{prev_loc.id} into {self.curr_loc.edge_or_chamber}{self.curr_loc.id}')            
-            self.prev_loc = prev_loc # update the voles previous location
-
-        self.prev_component = self.curr_component 
-        self.curr_component = newcomponent 
 
-        self.event_manager.new_timestamp(f'(Vole{self.tag}, update_location) {self.prev_component} to {self.curr_component}', time.time())
+        self.event_manager.new_timestamp(f'(Vole{self.tag}, update_location) {self.prev_component} to {self.curr_component}', CLOCK.time())
         # vole_log(f'\n(Vole{self.tag}, update_location) {self.prev_component} to {self.curr_component}\n')
 
         location_visual = self.map.draw_location(location = self.curr_loc)
         self.event_manager.print_to_terminal('\n')
         # vole_log(location_visual)
     
+    @traced
     def move_to_interactable(self, goal_interactable): 
         ''' converts interactable to component, and calls the move_to_component function. 
         Args: 
@@ -300,6 +330,7 @@ class SimVole:
             goal_component = interactable_loc.get_component_from_interactable(goal_interactable)
             return self.move_to_component(goal_component)
 
+    @traced
     def move_to_component(self, goal_component, interactable_within_component = None): 
         """ executes steps to simulate a vole moving from throughout map to reach the goal_component. 
         if a vole is sitting in a location with no components, then takes extra steps to get the vole to a loctaion where we can begin compiling a component path. 
@@ -401,6 +432,7 @@ class SimVole:
             
         return component_lst
 
+    @traced
     def move_next_component(self, goal_component, nxt_edge_or_chmbr_id = None): 
         """ 
         [summary] Moves passed the voles current component in order to reach goal_component. 
@@ -468,7 +500,7 @@ class SimVole:
             # vole_log(f'(Vole{self.tag}, move_next_component) Goal interactable and voles current interactable are the same.')
             return True 
         
-        self.event_manager.new_timestamp(f'(Vole{self.tag}, move_next_component) New Move: {str(curr_interactable)}->{str(goal_interactable)}', time.time(), print_to_screen = True)
+        self.event_manager.new_timestamp(f'(Vole{self.tag}, move_next_component) New Move: {str(curr_interactable)}->{str(goal_interactable)}', CLOCK.time(), print_to_screen = True)
         
         if self.prev_component == goal_component: 
             # Case: Vole is Turning Around!
@@ -483,7 +515,7 @@ class SimVole:
 
             # possible that the next component is on an adjacent edge/chamber to the vole's current location 
 
-            if len(self.map.get_component_path(self.curr_component,goal_component)) == 2: 
+            if self.map.components_are_adjacent(self.curr_component, goal_component): 
                 # Valid Move Request: there are no components that stand in between the current component and the goal component
                 pass 
             else: 
@@ -524,7 +556,8 @@ class SimVole:
 
         if not curr_interactable.autonomous: # false threshold, and not autonomous. cannot simulate if not autonomous 
             # DOORs without dependents will fall into this, as they are a barrier and not autonomous, meaning they must be controlled by something else. 
-            self.event_manager.print_to_terminal(f'(Simulation/Vole{self.tag}, move_next_component) Movement from {self.curr_component}->{goal_component} cannot be completed because {self.curr_component} is a barrier but not autonomous, so requires an interaction with its child interactables to operate it.')
+            controllers = [c.name for c in self.map.dependency_graph.controllers_of(curr_interactable)]
+            self.event_manager.print_to_terminal(f'(Simulation/Vole{self.tag}, move_next_component) Movement from {self.curr_component}->{goal_component} cannot be completed because {self.curr_component} is a barrier but not autonomous, so requires an interaction with its child interactables ({controllers}) to operate it.')
             return False 
         
 
@@ -535,7 +568,7 @@ class SimVole:
 
             self.simulate_vole_interactable_interaction(curr_interactable)
             
-            time.sleep(5) 
+            self.settle(5, lambda: curr_interactable.threshold) 
             
             # After simulating, since this autonomous interactable IS a barrier to vole movements, we must confirm that the threshold is True before allowing the vole to move forward. 
             if curr_interactable.threshold: # recheck the threshold 
@@ -549,6 +582,7 @@ class SimVole:
                 self.event_manager.print_to_terminal(f'(Simulation/Vole{self.tag}, move_next_component) Movement from {self.curr_component}->{goal_component} cannot be completed because after simulating {self.curr_component} the threshold is still False.')
                 return False 
 
+    @traced
     def attempt_move( self, destination, validity_check = True ): 
         """
         Attempts simulating a vole's movement into a BORDERING chamber (max step size is 1). <destination> must be the id of a chamber. 
@@ -667,7 +701,7 @@ class SimVole:
                 interactable = component.interactable
                 if not interactable.autonomous: # For a non-autonomous interactable, we care to interact with the interactable if it controls a Parent Interactable.
 
-                    if len(interactable.parents) > 0: 
+                    if self.map.dependency_graph.is_controller(interactable): 
 
                         self.simulate_vole_interactable_interaction(interactable) # If the component has control of some parent component (i.e., has at least one parent that is dependent on this interactable's value), then simulate this component! 
 
@@ -713,6 +747,49 @@ class SimVole:
     #
     # Random Vole 
     #   
+    def bind_action(self, action): 
+        """ converts an action from the map's action table into the function that the vole calls to carry it out 
+        Args: 
+            action (tuple) : (SimVole method name, argument), e.g. ('attempt_move', 2) 
+        Returns: 
+            (tuple) : (function, argument)
+        """
+        (name, arg) = action 
+        if name == 'sleep': 
+            return (CLOCK.sleep, arg)
+        return (getattr(self, name), arg)
+
+    def action_table(self): 
+        """ returns the actions the vole can take from its current location, along with the cumulative weights for choosing between them. 
+            tables come from the map's cache of action tables, and are weighted w/ the vole's action probabilities. Each table only gets rebuilt after the vole's action probabilities change, or after the map clears its action tables. 
+        Args: 
+            None 
+        Returns: 
+            (tuple) : ( [ (function, argument) ], [ cumulative weights ] )
+        """
+        key = (self.curr_loc, self.curr_component)
+        version = self.map.action_table_version 
+        table = self.action_tables.get(key)
+        if table is not None and table[0] == version: 
+            return table[1:]
+
+        (map_actions, location_p) = self.map.get_action_table(self.curr_loc, self.curr_component)
+        actions = [ self.bind_action(a) for a in map_actions ]
+
+        # initialize to a uniform distribution, then override w/ any probabilities assigned by the location or by the vole ( vole probabilities take priority ) 
+        p = 1/len(actions)
+        weights = [] 
+        for (a, loc_p) in zip(actions, location_p): 
+            if a in self.action_probability_dist: weights.append(self.action_probability_dist[a])
+            elif loc_p is not None: weights.append(loc_p)
+            else: weights.append(p)
+        cumulative = list(accumulate(weights))
+        if cumulative[-1] <= 0: 
+            raise Exception(f'(Vole.py, action_table) the action probabilities for {self} in {self.curr_loc.edge_or_chamber}{self.curr_loc.id} must sum to a positive number, but summed to {cumulative[-1]}')
+
+        self.action_tables[key] = (version, actions, cumulative)
+        return (actions, cumulative)
+
     def possible_actions(self): 
         """ creates a list of all possible actions a vole can take given the vole's curent location 
             reference: how to add functions to a list, where we will call the function at a later point in time: https://stackoverflow.com/questions/26881396/how-to-add-a-function-call-to-a-list
@@ -724,51 +801,8 @@ class SimVole:
                         -> possible_actions[0][0](*possible_actions[0][1:])
                         -> possible_actions[1][0](*possible_actions[1][1:])
         """
-        # NOTE: this function has not been updated, so before use will need fixing!! 
-
-        actions = [ (time.sleep,5)  ]  # initialize with option to do nothing, as this action is always available, independent of the vole's current location
-
-        
-        if self.curr_component is not None: 
-            # Add Interactable Interaction Options
-            try: 
-                # Unordered Set in a Chamber; add options to interact w/ any of these interactables
-                for i in self.curr_component.interactableSet: 
-                    actions.append( (self.simulate_vole_interactable_interaction, i ))
-                # Add 
-
-            except AttributeError: 
-                # Ordered Component ; add option to interact w/ this interactable
-                actions.append( (self.simulate_vole_interactable_interaction, self.curr_component.interactable ))        
-        
-        ''' else: # current component is None. 
-            
-            if self.prev_component is None: # Current Edge or Chamber is Empty. 
-                pass 
-            else: 
-                # prev component specified. We are at the end of a locations component list. We can either choose to turn around by navigating back to prev_component, or we can move forward into next chamber/edge 
-                actions.append((self.move_next_component(self.prev_component))) # Adds option for vole to turn around! 
-        '''
-        
-        if self.curr_loc.edge_or_chamber == 'chamber': 
-            # In Chamber
-            # add all move to interactable options
-            for i in self.curr_loc.allChamberInteractables: 
-                actions.append( (self.move_to_interactable, i) )
-
-            # add all possible "move chamber" options 
-            for c_id in self.curr_loc.connections.keys(): # for all of the current chamber's neighboring chambers
-                actions.append( (self.attempt_move, c_id) ) # add adjacent chambers to list of possible moves 
-        else: 
-            # In Edge
-            # add all move to interactable options 
-            for c in self.curr_loc: 
-                actions.append( (self.move_to_interactable, c.interactable) )
-            # add all possible chambers to move into 
-            actions.append( (self.attempt_move, self.curr_loc.v1) )
-            actions.append( (self.attempt_move, self.curr_loc.v2) )
-
-        return actions
+        (actions, _) = self.action_table() 
+        return list(actions)
 
     def attempt_random_action(self): 
         """ calls random_action to chose an action at random (or w/ weighted probabilities), and then executes the chosen function 
@@ -797,26 +831,10 @@ class SimVole:
             ( tuple ) : tuple element containing the randomly chosen function and the arguments that will need to passed when executing the that function. ( function, arguments_for_funciton )
         """
 
-        possible_actions = self.possible_actions()
-        
-        # initialize to a uniform distribution 
-        p = 1/len(possible_actions)
-        p_dist = {} # the probability distribution for the vole's current state. Updates every function call as the vole changes states. 
-        for a in possible_actions:
-            p_dist[a] = p 
+        (actions, cumulative) = self.action_table() 
 
-        ## Check if any of the possible actions were assigned a probability in the vole's action probability distribution. If so, update the probability in p_dist
-        for a in possible_actions: 
-            if a in self.action_probability_dist.keys(): 
-                p_dist[a] = self.action_probability_dist[a]
-        
-        # Normalize the Probabilities 
-        sum_p = sum(p_dist.values())
-        norm_p = {key: value/sum_p for key,value in p_dist.items()} # Divide each probability by sum of probabilties to normalize! 
-            
-        print(norm_p)
-        # Use norm_p to choose an action based on assigned probabilities 
-        action = random.choices( list(norm_p.keys()), weights =list(norm_p.values()), k = 1 )[0] # [0] takes the action from the tuple 
+        # Use the cumulative weights to choose an action based on assigned probabilities 
+        action = actions[ bisect.bisect_right(cumulative, self.random.random() * cumulative[-1]) ]
 
         return action # returns the ( function, arguments ) tuple of the randomly chosen action
 
@@ -835,6 +853,7 @@ class SimVole:
         '''
 
         self.action_probability_dist[action] = probability
+        self.action_tables = {} # rebuild the weighted tables w/ the new probability
 
         
 
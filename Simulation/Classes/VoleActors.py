@@ -0,0 +1,183 @@
+"""
+Description: Class definitions for running simulated vole commands concurrently. Each SimVole gets a VoleActor with its own mailbox of commands, and the VoleActor carries out its commands one at a time, in the order they were sent.
+            Commands from every vole are carried out by a single VoleScheduler that has a fixed number of worker threads, so many voles can move at the same time without creating a new thread for every action.
+
+Property of Donaldson Lab at the University of Colorado at Boulder
+"""
+
+# Standard Lib Imports
+import threading
+import queue
+import concurrent.futures
+from collections import deque
+
+# Local Imports
+from Control.Classes.Clock import CLOCK
+from Control.Classes.Threads import start_thread
+
+
+def cancel_future(future):
+    ''' [summary] cancels a future that has not started running, and notifies anything waiting on it ( concurrent.futures.wait only sees a cancelled future once it has been notified ) '''
+    if future.cancel():
+        future.set_running_or_notify_cancel()
+
+
+class VoleScheduler:
+    ''' [Description]
+    bounded pool of daemon worker threads shared by every VoleActor. Actors that have commands waiting in their mailbox get placed in the ready queue, and each worker takes the next ready actor and runs a single command for it.
+    An actor is only ever in the ready queue once, so each vole carries out its commands in order, and voles take turns so that one busy vole cannot hold up the others.
+    '''
+
+    _shared = None
+    _shared_lock = threading.Lock()
+
+    def __init__(self, max_workers = 16):
+        """
+        Args:
+            max_workers (int, optional) : max number of vole commands that get carried out at the same time. Worker threads are only started as they are needed.
+        """
+        if max_workers < 1:
+            raise Exception(f'(VoleActors.py, VoleScheduler) max_workers must be at least 1, but was passed {max_workers}')
+        self.max_workers = max_workers
+        self.ready = queue.Queue() # actors with at least one command waiting in their mailbox
+        self.workers = []
+        self.idle_workers = 0
+        self.lock = threading.Lock()
+
+    def __str__(self):
+        return f'VoleScheduler({len(self.workers)}/{self.max_workers} workers)'
+
+    @classmethod
+    def shared(cls):
+        ''' [summary] returns the scheduler that is shared by every simulation script, creating it on first use '''
+        with cls._shared_lock:
+            if cls._shared is None:
+                cls._shared = cls()
+            return cls._shared
+
+    def schedule(self, actor):
+        ''' [summary] adds <actor> to the ready queue, and starts another worker thread if every worker is busy and the pool is not full yet '''
+        with self.lock:
+            if self.idle_workers == 0 and len(self.workers) < self.max_workers:
+                self.idle_workers += 1
+                self.workers.append(start_thread(self.run_worker, subsystem = 'simulation', owner = self, purpose = f'vole_actor_worker{len(self.workers)}'))
+        self.ready.put(actor)
+
+    def run_worker(self):
+        ''' [summary] loops forever, running one command at a time for whichever actor is next in the ready queue '''
+        while True:
+            actor = CLOCK.get(self.ready)
+            with self.lock:
+                self.idle_workers -= 1
+            try:
+                actor.run_next()
+            finally:
+                with self.lock:
+                    self.idle_workers += 1
+
+
+class VoleActor:
+    ''' [Description]
+    mailbox of commands for a single SimVole. Commands are sent with tell(), which returns a concurrent.futures.Future that gets the command's return value once the vole has carried it out.
+    Commands are only carried out while the mode they were sent during is active. Once the mode becomes inactive, any commands still waiting in the mailbox get cancelled rather than run.
+    '''
+
+    COMMANDS = ('attempt_move', 'move_to_interactable', 'simulate_vole_interactable_interaction', 'simulate_move_and_interactable', 'attempt_random_action')
+
+    def __init__(self, vole, scheduler = None, mode = None):
+        """
+        Args:
+            vole (SimVole) : the vole that carries out the commands
+            scheduler (VoleScheduler, optional) : scheduler that runs the commands. Defaults to the shared scheduler.
+            mode (ModeABC, optional) : if provided, commands only run while this mode is active
+        """
+        self.vole = vole
+        self.scheduler = scheduler if scheduler is not None else VoleScheduler.shared()
+        self.mode = mode
+        self.mailbox = deque() # (Future, command, args) in the order they were sent
+        self.outstanding = [] # futures that have been sent and not finished yet, for join()
+        self.scheduled = False # True while this actor is in the scheduler's ready queue or running a command
+        self.lock = threading.Lock()
+
+    def __str__(self):
+        return f'VoleActor({self.vole})'
+
+    @property
+    def accepting(self):
+        ''' [summary] commands are only accepted while the vole and its mode are both active '''
+        return self.vole.active and ( self.mode is None or self.mode.active )
+
+    def tell(self, command, *args):
+        '''
+        [summary] adds a command to the vole's mailbox. Returns immediately, without waiting for the vole to carry out the command.
+        Args:
+            command (string) : name of the SimVole method to call ( one of VoleActor.COMMANDS )
+            args : arguments passed to the SimVole method
+        Returns:
+            (Future) : resolves to the method's return value. Gets cancelled if the mode ends before the command runs.
+        '''
+        if command not in self.COMMANDS:
+            raise Exception(f'(VoleActors.py, tell) {command} is not a vole command. Options are: {self.COMMANDS}')
+        future = concurrent.futures.Future()
+        if not self.accepting:
+            cancel_future(future)
+            return future
+        with self.lock:
+            self.mailbox.append( (future, command, args) )
+            self.outstanding = [ f for f in self.outstanding if not f.done() ]
+            self.outstanding.append(future)
+            if self.scheduled:
+                return future
+            self.scheduled = True
+        self.scheduler.schedule(self)
+        return future
+
+    def run_next(self):
+        ''' [summary] called by a scheduler worker. Carries out the next command in the mailbox, then puts the actor back in the ready queue if it has more commands waiting. '''
+        with self.lock:
+            if len(self.mailbox) == 0:
+                self.scheduled = False
+                return
+            (future, command, args) = self.mailbox.popleft()
+
+        if not self.accepting:
+            cancel_future(future)
+            self.cancel() # mode ended; drop everything else that is waiting too
+        elif future.set_running_or_notify_cancel():
+            try:
+                future.set_result( getattr(self.vole, command)(*args) )
+            except Exception as e:
+                self.vole.event_manager.print_to_terminal(f'(VoleActors.py, run_next) {self.vole} failed to {command}{args}: {e}')
+                future.set_exception(e)
+
+        with self.lock:
+            if len(self.mailbox) == 0:
+                self.scheduled = False
+                return
+        self.scheduler.schedule(self)
+
+    def cancel(self):
+        '''
+        [summary] cancels every command that is still waiting in the mailbox. A command that the vole has already started is left to finish.
+        Returns:
+            (int) : the number of commands that got cancelled
+        '''
+        with self.lock:
+            pending = list(self.mailbox)
+            self.mailbox.clear()
+        for (future, _, _) in pending:
+            cancel_future(future)
+        return len(pending)
+
+    def join(self, timeout = None):
+        '''
+        [summary] waits until every command that has been sent to this vole has either finished or been cancelled
+        Args:
+            timeout (float, optional) : max seconds to wait
+        Returns:
+            (Boolean) : True if every command finished, False if the timeout was reached first
+        '''
+        with self.lock:
+            futures = list(self.outstanding)
+        (_, not_done) = CLOCK.wait_futures(futures, timeout)
+        return len(not_done) == 0
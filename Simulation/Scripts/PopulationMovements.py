@@ -0,0 +1,34 @@
+"""
+Description: This is a simualion script file which derives from the abstract class SimulationScriptABC. Each run() method defines what vole movements and interactions we want to simulate.
+Population Simulation Scripts; stress tests a control mode with a large number of simulated voles that all make random decisions at the same time.
+
+Property of Donaldson Lab at the University of Colorado at Boulder
+"""
+
+from ..Classes.SimulationScriptABC import SimulationScriptABC
+from ..Classes.Population import VolePopulation
+
+
+class PopulationRandomMovements(SimulationScriptABC):
+    ''' adds a population of voles to chamber 1, and has every vole take random actions until the control mode's timeout ends '''
+
+    def __init__(self, mode, n = 50, start_chamber = 1, seed = None):
+        super().__init__(mode)
+        self.n = n
+        self.start_chamber = start_chamber
+        self.seed = seed # defaults to a seed drawn from the simulation's seed ( see VolePopulation.spawn )
+        self.population = None
+
+    def run(self):
+
+        """ Write Simulation Logic Here! """
+
+        if self.population is None:
+            # voles are only created the first time this script runs, and then keep their positions across rounds
+            self.population = VolePopulation.spawn(self.map, self.n, self.start_chamber, simulation = self.simulation, seed = self.seed)
+
+        # voles are more likely to move between chambers than to sit still
+        self.population.set_action_weight(('sleep', 5), 0.5)
+
+        steps = self.population.run(mode = self.mode)
+        print(f'(PopulationMovements.py) {self.population} took {steps} steps')
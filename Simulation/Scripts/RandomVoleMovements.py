@@ -11,8 +11,8 @@ Example Simulation Scripts; Use these simulation scripts as a simple outline of
 
 ## (TODO) if any extra packages are needed for defining mode logic, freely place import statements here 
 from ..Classes.SimulationScriptABC import SimulationScriptABC  
+from Control.Classes.Clock import CLOCK
 ##
-import time
 
 class RandomVoleMovements(SimulationScriptABC): 
 
@@ -25,7 +25,7 @@ class RandomVoleMovements(SimulationScriptABC):
 
         ## Set likelihood of vole sleeping to 100% 
         vole1.set_action_probability((vole1.attempt_move,8), 75)
-        vole1.set_action_probability((time.sleep, 2), 1)
+        vole1.set_action_probability((CLOCK.sleep, 2), 1)
 
         for _ in range(0,5): 
             print('new random......\n\n\n\n')
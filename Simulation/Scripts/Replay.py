@@ -0,0 +1,28 @@
+"""
+Description: This is a simualion script file which derives from the abstract class SimulationScriptABC. Each run() method defines what vole movements and interactions we want to simulate.
+Replay Simulation Scripts; rather than deciding what the voles do, replays the vole actions that were recorded in a trace file ( see Simulation/Classes/Trace.py ). 
+The Simulation pairs every mode with this script when simulation.json sets "replay". 
+
+Property of Donaldson Lab at the University of Colorado at Boulder
+"""
+
+from ..Classes.SimulationScriptABC import SimulationScriptABC
+
+
+class TraceReplay(SimulationScriptABC): 
+    ''' replays the actions that the voles took while a mode of the same class was running the same round in the recorded session '''
+
+    def __init__(self, mode, replayer = None): 
+        super().__init__(mode)
+        self.replayer = replayer 
+
+    def run(self): 
+
+        mode = self.mode 
+        mismatches = len(self.replayer.mismatches)
+        self.replayer.replay(mode = mode.__class__.__name__, round = mode.current_round, until = lambda: mode.active and mode.inTimeout)
+
+        mismatches = self.replayer.mismatches[mismatches:]
+        print(f'(Replay.py) replayed {mode} round {mode.current_round}. {len(mismatches)} actions had a different outcome than the recording.')
+        for (entry, result) in mismatches: 
+            print(f'    vole{entry["vole"]} {entry["action"]}{tuple(entry["args"])} recorded: {entry.get("result", entry.get("error"))}, replayed: {result}')
@@ -6,7 +6,15 @@ but rather it is being imported, and it will respond by returning a list of inst
 
 variable modes stores the list of control software modes that we want to run
 modes is accessed by __main__ of Simulation.
+
+modes is only created the first time it gets accessed ( i.e. "from Simulation import modes" ), so the Simulation classes 
+can be imported without building the Map and Modes that are set in Control/__main__.py ( e.g. by the BatchRunner )
 '''
 
-from Control import __main__ as controlPackage 
-modes = controlPackage.main() # retrieve list of Control Modes 
\ No newline at end of file
+def __getattr__(name): 
+    if name == 'modes': 
+        global modes 
+        from Control import __main__ as controlPackage 
+        modes = controlPackage.main() # retrieve list of Control Modes 
+        return modes 
+    raise AttributeError(f'module {__name__} has no attribute {name}')
@@ -70,14 +70,11 @@ def main():
     # this code creates a table so the User can double check all of the control mode / simulation function pairings that are set in the previous "todo" 
     print(f'\n Double Check that the following Control/Simulation Pairings look correct...') 
     data = [ ['Control Mode', 'Simulation Scripts'] ]
-    for m in modes: 
-        if m.__class__.__name__ in CONTROL_SIM_PAIRS: # find each mode in CONTROL_SIM_PAIRS 
-            sim = CONTROL_SIM_PAIRS[m.__class__.__name__]
-            simulation.simulation_func[m] = sim(m) # creates simulation and pairs it with control mode in simulation manager
     simulation.control_sim_pairs = CONTROL_SIM_PAIRS # give copy of dictionary to simulation for runtime creation of modes 
     for m in modes: 
-        if m in simulation.simulation_func.keys(): 
-            data.append( [str(m) + f' ({str(os.path.relpath(inspect.getfile(m.__class__)))})', simulation.simulation_func[m]]) 
+        if m.__class__.__name__ in CONTROL_SIM_PAIRS: # find each mode in CONTROL_SIM_PAIRS 
+            sim = simulation.script_pool.prepare(m, CONTROL_SIM_PAIRS[m.__class__.__name__]) # creates the simulation ahead of time ( one per mode class, reused by every mode of that class ) 
+            data.append( [str(m) + f' ({str(os.path.relpath(inspect.getfile(m.__class__)))})', sim]) 
         else: 
             data.append( [str(m) + f' ({str(os.path.relpath(inspect.getfile(m.__class__)))})'] ) 
     EventManager.draw_table(data, cellwidth=80)
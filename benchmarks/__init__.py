@@ -0,0 +1,8 @@
+"""
+Description: Benchmarks for the Control and Simulation hot paths. Each module can be run on its own ( e.g. python -m benchmarks.rfid ), and defines run(**kwargs) which returns its results as a dict, plus QUICK, the arguments for a shorter run.
+            python -m benchmarks runs the whole suite, each benchmark in its own process, and writes every result to a single json report so that runs from different commits can be compared.
+
+Property of Donaldson Lab at the University of Colorado at Boulder
+"""
+
+SUITE = ( 'map_setup', 'event_manager', 'servo_bus', 'thresholds', 'rfid', 'voles' ) # the order that python -m benchmarks runs them in
@@ -0,0 +1,130 @@
+"""
+Description: Runs the benchmark suite. Each benchmark runs in a fresh process, since the benchmarks leave threads behind and some of them switch the CLOCK to virtual time.
+            Writes a json report with the results of every benchmark along with the commit and machine they were run on. Passing --compare with an earlier report prints how the throughput and latency numbers changed.
+
+            python -m benchmarks [map_setup event_manager ...] [--quick] [--output FILE] [--compare BASELINE] [--list]
+
+Property of Donaldson Lab at the University of Colorado at Boulder
+"""
+
+# Standard Lib Imports
+import os
+import sys
+import json
+import time
+import argparse
+import platform
+import importlib
+import traceback
+import subprocess
+import concurrent.futures
+
+# Local Imports
+from benchmarks import SUITE
+from benchmarks.common import ROOT
+
+
+OUTPUT_DIRECTORY = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'Output')
+COMPARED = ('per_second', 'p50', 'p99') # result keys that --compare reports on
+
+
+def run_benchmark(name, quick):
+    ''' [summary] runs a single benchmark. Called in its own process. '''
+    module = importlib.import_module(f'benchmarks.{name}')
+    kwargs = getattr(module, 'QUICK', {}) if quick else {}
+    start = time.perf_counter()
+    try:
+        results = module.run(**kwargs)
+    except Exception:
+        return { 'status': 'error', 'seconds': time.perf_counter() - start, 'error': traceback.format_exc() }
+    return { 'status': 'ok', 'seconds': time.perf_counter() - start, 'arguments': kwargs, 'results': results }
+
+
+def git_commit():
+    ''' [summary] returns the commit that the benchmarks ran on, or None if it cannot be found '''
+    try:
+        return subprocess.run(['git', 'rev-parse', 'HEAD'], cwd = ROOT, capture_output = True, text = True, check = True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def flatten(results, prefix = ''):
+    ''' [summary] returns { "outer.inner.key" : number } for every number in a nested results dict '''
+    values = {}
+    for (key, value) in results.items():
+        name = f'{prefix}.{key}' if prefix else str(key)
+        if isinstance(value, dict):
+            values.update(flatten(value, name))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            values[name] = value
+    return values
+
+
+def compare(report, baseline):
+    ''' [summary] prints the change in every throughput ( *per_second ) and latency ( p50, p99 ) number between <baseline> and <report> '''
+    for (name, entry) in report['benchmarks'].items():
+        before = baseline.get('benchmarks', {}).get(name)
+        if entry['status'] != 'ok' or before is None or before.get('status') != 'ok':
+            continue
+        print(f'{name}:')
+        (old, new) = (flatten(before['results']), flatten(entry['results']))
+        for key in sorted(k for k in new if k in old and k.endswith(COMPARED)):
+            if old[key] == 0:
+                continue
+            change = (new[key] - old[key]) / old[key] * 100
+            print(f'    {key}: {old[key]:.6g} -> {new[key]:.6g} ({change:+.1f}%)')
+
+
+def main(argv = None):
+    parser = argparse.ArgumentParser(description = 'runs the Control and Simulation benchmarks, and writes the results to a json report')
+    parser.add_argument('benchmarks', nargs = '*', default = list(SUITE), help = f'benchmarks to run ( default: all of {", ".join(SUITE)} )')
+    parser.add_argument('--quick', action = 'store_true', help = "run each benchmark with its QUICK arguments, for a fast check")
+    parser.add_argument('--output', default = None, help = 'where to write the report ( default: benchmarks/Output/benchmarks-<date>.json )')
+    parser.add_argument('--compare', default = None, help = 'an earlier report to compare the results against')
+    parser.add_argument('--list', action = 'store_true', help = 'list the benchmarks and exit')
+    args = parser.parse_args(argv)
+
+    if args.list:
+        print('\n'.join(SUITE))
+        return 0
+    unknown = [ b for b in args.benchmarks if b not in SUITE ]
+    if len(unknown) > 0:
+        parser.error(f'unknown benchmarks {unknown}. Choose from {list(SUITE)}')
+
+    report = {
+        'created': time.strftime('%Y-%m-%d %H:%M:%S'),
+        'commit': git_commit(),
+        'python': sys.version,
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'quick': args.quick,
+        'benchmarks': {}
+        }
+    for name in args.benchmarks:
+        print(f'(benchmarks) running {name}...', flush = True)
+        with concurrent.futures.ProcessPoolExecutor(max_workers = 1) as executor: # new process for every benchmark
+            try:
+                entry = executor.submit(run_benchmark, name, args.quick).result()
+            except concurrent.futures.process.BrokenProcessPool as e:
+                entry = { 'status': 'error', 'seconds': None, 'error': f'benchmark process died: {e}' }
+        report['benchmarks'][name] = entry
+        if entry['status'] == 'ok':
+            print(f'(benchmarks) {name} finished in {entry["seconds"]:.1f}s', flush = True)
+        else:
+            print(f'(benchmarks) {name} failed:\n{entry["error"]}', flush = True)
+
+    output = args.output or os.path.join(OUTPUT_DIRECTORY, time.strftime('benchmarks-%Y.%m.%d-%H.%M.%S.json'))
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok = True)
+    with open(output, 'w') as file:
+        json.dump(report, file, indent = 4)
+    print(f'(benchmarks) report written to {output}')
+
+    if args.compare is not None:
+        with open(args.compare) as file:
+            compare(report, json.load(file))
+
+    return 0 if all( e['status'] == 'ok' for e in report['benchmarks'].values() ) else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
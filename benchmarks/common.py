@@ -0,0 +1,129 @@
+"""
+Description: Shared setup for the benchmarks. Builds a Map from the Control configuration files, a mode that does nothing ( so the EventManager has a mode to timestamp events for ), and a Simulation that marks the interactables as simulated and creates the SimVoles,
+            the same way that a BatchRunner run does. Every benchmark runs on a Linux dev box, using the simulation fallbacks for the GPIO pins, servo board and CAN bus.
+
+Property of Donaldson Lab at the University of Colorado at Boulder
+"""
+
+# Standard Lib Imports
+import io
+import os
+import time
+import tempfile
+import contextlib
+
+# Local Imports
+from Control.Classes.Map import Map
+from Control.Classes.ModeABC import modeABC
+from Control.Classes.Clock import CLOCK, VirtualClock
+from Control.Classes import Threads
+
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__))) # top level of the repository
+CONTROL_CONFIGURATIONS = os.path.join(ROOT, 'Control', 'Configurations')
+SHIPPED_MAPS = ('map.json', 'map_operant.json', 'map_homecage.json')
+
+
+def quiet():
+    ''' [summary] context manager that throws away everything printed to the terminal, so printing does not get timed along with the code being benchmarked '''
+    return contextlib.redirect_stdout(io.StringIO())
+
+
+def summarize(samples):
+    '''
+    [summary] summary statistics for a list of durations ( or any other numbers )
+    Returns:
+        (dict) : count, mean, min, p50, p90, p99 and max. Everything but count is None if there were no samples.
+    '''
+    values = sorted(samples)
+    n = len(values)
+    if n == 0:
+        return { 'count': 0, 'mean': None, 'min': None, 'p50': None, 'p90': None, 'p99': None, 'max': None }
+    pct = lambda p: values[ min(n - 1, int(n * p / 100)) ]
+    return { 'count': n, 'mean': sum(values) / n, 'min': values[0], 'p50': pct(50), 'p90': pct(90), 'p99': pct(99), 'max': values[-1] }
+
+
+def wait_until(condition, timeout = 5, poll = 0.0002):
+    ''' [summary] polls condition() in real time until it returns True. Returns False if <timeout> seconds pass first. With a VirtualClock, waits through the CLOCK instead, so that the threads being waited on get their turn to run. '''
+    if CLOCK.isVirtual:
+        return CLOCK.wait_until(condition, timeout)
+    end = time.perf_counter() + timeout
+    while not condition():
+        if time.perf_counter() > end:
+            return False
+        time.sleep(poll)
+    return True
+
+
+class BenchmarkMode(modeABC):
+    ''' [Description] mode that does nothing, so the EventManager has a mode to record timestamps for while a benchmark drives the interactables directly '''
+
+    def __str__(self):
+        return 'BenchmarkMode'
+
+    def setup(self):
+        pass
+
+    def run(self):
+        pass
+
+
+class Environment:
+    ''' [Description]
+    a Map, a BenchmarkMode and ( optionally ) a Simulation for a single benchmark. start() activates the interactables, the EventManager and the rfid listener the same way that modeABC.enter does, without running any rounds.
+    '''
+
+    def __init__(self, map_file = 'map.json', config_directory = CONTROL_CONFIGURATIONS, simulation_config = 'simulation.json', output_dir = None, virtual_time = False, seed = 0):
+        """
+        Args:
+            map_file (string, optional) : map configuration file in <config_directory> ( or an absolute filepath )
+            config_directory (string, optional) : directory with the Control configuration files
+            simulation_config (string, optional) : simulation configuration file in Simulation/Configurations ( or an absolute filepath ). If None, no Simulation gets created, so the interactables keep their hardware settings.
+            output_dir (string, optional) : where the mode's output csv gets written. Defaults to a new temporary directory.
+            virtual_time (Boolean, optional) : if True, switches the CLOCK to a VirtualClock so that simulated delays finish immediately
+            seed (int, optional) : seed for the Simulation
+        """
+        from Simulation.Classes.Simulation import Simulation # Simulation package is only needed by the benchmarks that simulate voles or interactables
+
+        self.output_dir = output_dir if output_dir is not None else tempfile.mkdtemp(prefix = 'benchmark-')
+        with quiet():
+            self.map = Map(config_directory, map_file, interactive = False)
+            self.mode = BenchmarkMode(map = self.map, output_fp = os.path.join(self.output_dir, 'benchmark.csv'), timeout = None, rounds = 1, ITI = 0)
+            self.simulation = None
+            self.interactables_active = False
+            if simulation_config is not None:
+                self.simulation = Simulation([self.mode], config_filename = simulation_config, seed = seed)
+            if virtual_time:
+                CLOCK.use(VirtualClock()) # after the Simulation, since its configuration file can also set the clock
+
+    def __str__(self):
+        return f'Environment({self.map.config_directory}, {len(self.map.instantiated_interactables)} interactables)'
+
+    def start(self, interactables = True, rfid_listener = True):
+        '''
+        [summary] activates the mode, the EventManager, and ( optionally ) the interactables and the mode's rfid listener
+        Args:
+            interactables (Boolean, optional) : if True, activates every interactable, which starts their threshold watchers
+            rfid_listener (Boolean, optional) : if True, starts the mode's rfidListener, which also gives every rfid its shared_rfidQ
+        '''
+        with quiet():
+            self.mode.startTime = CLOCK.time()
+            self.mode.active = True
+            self.mode.inTimeout = True
+            self.map.event_manager.activate(new_mode = self.mode)
+            self.interactables_active = interactables
+            if interactables:
+                self.map.activate_interactables()
+            if rfid_listener:
+                self.mode.rfidListener()
+
+    def stop(self):
+        ''' [summary] deactivates everything that start() activated '''
+        with quiet():
+            self.mode.inTimeout = False
+            self.mode.active = False
+            if self.interactables_active:
+                self.map.deactivate_interactables()
+            self.map.canbus.stop_listen()
+            wait_until(lambda: not any( t['subsystem'] == 'interactable' for t in Threads.snapshot() )) # watchers print as they exit, so wait for them while the output is still being thrown away
+            self.map.event_manager.deactivate()
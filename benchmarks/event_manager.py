@@ -0,0 +1,100 @@
+"""
+Description: EventManager benchmark. Times EventManager.new_timestamp from several threads at once ( the way interactables timestamp their events ), and how long the write queue takes to get every timestamp into the output csv file.
+            Runs once with print_to_screen off, and once with it on, since each printed timestamp starts its own thread.
+
+            python -m benchmarks.event_manager [--threads 4] [--timestamps 2000] [--printed 200] [--json]
+
+Property of Donaldson Lab at the University of Colorado at Boulder
+"""
+
+# Standard Lib Imports
+import sys
+import time
+import json
+import argparse
+import threading
+
+# Local Imports
+from Control.Classes.Clock import CLOCK
+from Control.Classes import Threads
+from benchmarks.common import Environment, quiet, summarize, wait_until
+
+
+QUICK = { 'timestamps': 500, 'printed': 50 } # arguments for run() when the suite is run with --quick
+
+
+def bench_timestamps(event_manager, threads, timestamps, print_to_screen):
+    ''' [summary] <threads> threads each create <timestamps> timestamps. Returns how quickly new_timestamp returned, and how long it took for the csv writer to catch up. '''
+    calls = [ [] for _ in range(threads) ]
+
+    def send(i):
+        for n in range(timestamps):
+            start = time.perf_counter()
+            event_manager.new_timestamp(f'benchmark_event_{i}_{n}', time = CLOCK.time(), print_to_screen = print_to_screen)
+            calls[i].append(time.perf_counter() - start)
+
+    workers = [ threading.Thread(target = send, args = (i,), daemon = True) for i in range(threads) ]
+    with quiet():
+        start = time.perf_counter()
+        for t in workers: t.start()
+        for t in workers: t.join()
+        accepted = time.perf_counter() - start
+        drained = wait_until(lambda: event_manager.write_queue.qsize() == 0, timeout = 60)
+        written = time.perf_counter() - start
+        wait_until(lambda: not any( t['purpose'] == 'print_timestamp' for t in Threads.snapshot() ), timeout = 60) # let the printing threads finish while the output is still being thrown away
+
+    total = threads * timestamps
+    return {
+        'timestamps': total,
+        'new_timestamp_seconds': summarize([ s for c in calls for s in c ]),
+        'timestamps_per_second': total / accepted if accepted > 0 else None,
+        'written_per_second': total / written if drained and written > 0 else None,
+        'write_queue_drained': drained
+        }
+
+
+def run(threads = 4, timestamps = 2000, printed = 200):
+    '''
+    [summary] runs the EventManager benchmarks
+    Args:
+        threads (int, optional) : number of threads creating timestamps at the same time
+        timestamps (int, optional) : number of timestamps each thread creates without printing them
+        printed (int, optional) : number of timestamps each thread creates with print_to_screen on
+    Returns:
+        (dict) : results for 'silent' and 'printed' timestamps, plus the EventManager's csv_write histogram
+    '''
+    env = Environment('map_operant.json', simulation_config = None)
+    env.start(interactables = False, rfid_listener = False)
+    event_manager = env.map.event_manager
+    try:
+        results = {
+            'silent': bench_timestamps(event_manager, threads, timestamps, print_to_screen = False),
+            'printed': bench_timestamps(event_manager, threads, printed, print_to_screen = True)
+            }
+        results['csv_write'] = event_manager.metrics.histogram('csv_write').snapshot()
+        results['csv_write'].pop('buckets', None)
+    finally:
+        env.stop()
+    return results
+
+
+def main(argv = None):
+    parser = argparse.ArgumentParser(description = 'EventManager.new_timestamp throughput')
+    parser.add_argument('--threads', type = int, default = 4, help = 'number of threads creating timestamps')
+    parser.add_argument('--timestamps', type = int, default = 2000, help = 'number of timestamps each thread creates without printing')
+    parser.add_argument('--printed', type = int, default = 200, help = 'number of timestamps each thread creates with print_to_screen on')
+    parser.add_argument('--json', action = 'store_true', help = 'print the results as json')
+    args = parser.parse_args(argv)
+
+    results = run(args.threads, args.timestamps, args.printed)
+    if args.json:
+        print(json.dumps(results, indent = 4))
+        return
+    for kind in ('silent', 'printed'):
+        r = results[kind]
+        written = f'{r["written_per_second"]:.0f}/s written to the csv' if r['written_per_second'] is not None else 'write queue did not drain'
+        print(f'{kind:>7}: {r["timestamps"]} timestamps, {r["timestamps_per_second"]:.0f}/s accepted, {written}, new_timestamp p99 {r["new_timestamp_seconds"]["p99"]*1e6:.0f}us')
+
+
+if __name__ == '__main__':
+    sys.exit(main())
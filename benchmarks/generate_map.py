@@ -0,0 +1,236 @@
+"""
+Description: Generates large maps for scale testing. Writes a directory of configuration files ( map.json, door.json, lever.json, beam.json, rfid.json, optionally dispenser.json, and simulation.json ) that load through Map and Simulation unchanged.
+            Layouts:
+                grid : <rows> x <columns> chambers, with an edge between every pair of neighboring chambers
+                rack : <rows> separate cages ( e.g. the boxes on a rack ), each a line of <columns> chambers
+            Each edge is laid out like the edges in Control/Configurations/map.json: a beam and a door on each side, and an rfid in the middle, along with a lever in each chamber that opens the door on its side.
+            The levers are unordered chamber interactables rather than chamber_interactable references from the edge, since a chamber can only have references at the two ends of its components and a grid chamber can have four edges.
+            Every interactable's configuration is copied from an interactable in the shipped configuration files, with a new name, id and pins. Pins and servo channels wrap around, so the files are only meant for simulated hardware.
+
+            python -m benchmarks.generate_map <output directory> [--layout grid] [--rows 10] [--columns 10] [--voles 2] [--doors_per_edge 2] [--no_beams] [--no_rfids] [--dispensers] [--load]
+            python -m benchmarks.map_setup --config_directory <output directory> --maps map.json --max_pairs 10000
+
+Property of Donaldson Lab at the University of Colorado at Boulder
+"""
+
+# Standard Lib Imports
+import os
+import sys
+import copy
+import json
+import time
+import argparse
+
+# Local Imports
+from benchmarks.common import ROOT, CONTROL_CONFIGURATIONS, Environment
+
+
+SIMULATION_CONFIGURATIONS = os.path.join(ROOT, 'Simulation', 'Configurations')
+LAYOUTS = ('grid', 'rack')
+TEMPLATES = { 'door': 'door1', 'lever': 'lever_door1', 'beam': 'beam1_door1', 'rfid': 'rfid1', 'dispenser': 'food_trough' } # interactable in <type>.json that each generated interactable of that type is copied from
+SIMULATION_TEMPLATES = { 'door': 'door2', 'lever': 'lever_door1', 'beam': 'beam1_door1', 'rfid': 'rfid1', 'dispenser': 'food_trough' } # entry in simulation.json that each generated interactable's simulation entry is copied from
+BUTTON_PINS = tuple(range(2, 28)) # GPIO pins on the Pi
+SERVO_CHANNELS = 16 # channels on the servo board
+
+
+def grid_edges(rows, columns):
+    ''' [summary] returns (chamber ids, [(chamber, neighboring chamber)]) for a grid, where chamber ids count across each row starting from 1 '''
+    chambers = [ r * columns + c + 1 for r in range(rows) for c in range(columns) ]
+    edges = []
+    for r in range(rows):
+        for c in range(columns):
+            cid = r * columns + c + 1
+            if c + 1 < columns: edges.append( (cid, cid + 1) )
+            if r + 1 < rows: edges.append( (cid, cid + columns) )
+    return (chambers, edges)
+
+
+def rack_edges(rows, columns):
+    ''' [summary] returns (chamber ids, [(chamber, neighboring chamber)]) for <rows> separate lines of <columns> chambers '''
+    chambers = [ r * columns + c + 1 for r in range(rows) for c in range(columns) ]
+    edges = [ (r * columns + c + 1, r * columns + c + 2) for r in range(rows) for c in range(columns - 1) ]
+    return (chambers, edges)
+
+
+class Generator:
+    ''' [Description]
+    builds the contents of each configuration file for a generated map. Keeps count of the interactables of each type, so that each one gets a unique id and the pins get handed out in order.
+    '''
+
+    def __init__(self, config_directory = CONTROL_CONFIGURATIONS, simulation_config = os.path.join(SIMULATION_CONFIGURATIONS, 'simulation.json')):
+        """
+        Args:
+            config_directory (string, optional) : directory with the Control configuration files that the interactables get copied from
+            simulation_config (string, optional) : simulation configuration file that the simulation entries get copied from
+        """
+        self.templates = {}
+        for (type, name) in TEMPLATES.items():
+            with open(os.path.join(config_directory, f'{type}.json')) as f:
+                self.templates[type] = json.load(f)[name]
+        with open(simulation_config) as f:
+            entries = { i['name']: i for i in json.load(f)['interactables'] }
+        self.simulation_templates = { type: entries[name] for (type, name) in SIMULATION_TEMPLATES.items() }
+
+        self.configs = { type: {} for type in TEMPLATES } # { type : { interactable name : configuration } }, the contents of each <type>.json
+        self.simulated = [] # entries for the interactables list in simulation.json
+        self.buttons = 0 # number of button pins handed out
+        self.servos = 0 # number of servo channels handed out
+
+    def __str__(self):
+        return f'Generator({", ".join(f"{len(c)} {t}s" for (t, c) in self.configs.items())})'
+
+    def new_interactable(self, type, name, parents = ()):
+        '''
+        [summary] copies the template for <type>, and gives the copy a new id, its own pins and <parents>
+        Returns:
+            (dict) : the new interactable's entry for the map configuration file
+        '''
+        if name in self.configs[type]:
+            raise Exception(f'(generate_map.py, new_interactable) there is already a {type} named {name}')
+        spec = copy.deepcopy(self.templates[type])
+        spec['id'] = len(self.configs[type]) + 1 # rfids are told apart by their id, so every id is unique within its type
+        if 'parents' in spec or len(parents) > 0:
+            spec['parents'] = list(parents)
+        hardware = spec.get('hardware_specs', {})
+        if 'button_specs' in hardware:
+            hardware['button_specs']['button_pin'] = BUTTON_PINS[self.buttons % len(BUTTON_PINS)]
+            self.buttons += 1
+        if 'servo_specs' in hardware:
+            hardware['servo_specs']['servo_pin'] = self.servos % SERVO_CHANNELS
+            self.servos += 1
+        self.configs[type][name] = spec
+
+        simulated = copy.deepcopy(self.simulation_templates[type])
+        simulated['name'] = name
+        self.simulated.append(simulated)
+        return { 'interactable_name': name, 'type': type }
+
+    def new_edge(self, eid, a, b, chambers, doors_per_edge, beams, rfids):
+        '''
+        [summary] creates the interactables for the edge between chamber <a> and chamber <b>. Each chamber gets an unordered lever for the door on its side of the edge ( or for the edge's only door ).
+        Args:
+            eid (int) : id of the edge
+            a (int) : id of the start chamber
+            b (int) : id of the target chamber
+            chambers (dict) : { chamber id : [chamber components] }, which the levers get added to
+        Returns:
+            (dict) : the edge's entry for the map configuration file
+        '''
+        sides = ('a', 'b') if doors_per_edge == 2 else ('a',)
+        doors = { side: f'door_{eid}_{side}' for side in sides }
+        door_for = { 'a': doors['a'], 'b': doors[sides[-1]] } # the door that each chamber's lever opens
+        for (side, cid) in (('a', a), ('b', b)):
+            chambers[cid].append(self.new_interactable('lever', f'lever_{eid}_{side}', parents = [door_for[side]]))
+
+        halves = {}
+        for side in sides:
+            half = []
+            if beams: half.append(self.new_interactable('beam', f'beam_{eid}_{side}'))
+            half.append(self.new_interactable('door', doors[side]))
+            halves[side] = half
+        middle = [ self.new_interactable('rfid', f'rfid_{eid}') ] if rfids else []
+
+        # ordered from chamber a to chamber b, the same way as the edges in map.json
+        components = halves['a'] + middle
+        if doors_per_edge == 2:
+            components += list(reversed(halves['b']))
+        return { 'start_chamber_id': a, 'target_chamber_id': b, 'id': eid, 'type': 'shared', 'components': components }
+
+
+def generate(layout = 'grid', rows = 10, columns = 10, voles = 2, doors_per_edge = 2, beams = True, rfids = True, dispensers = False, config_directory = CONTROL_CONFIGURATIONS):
+    '''
+    [summary] builds the configuration files for a generated map
+    Args:
+        layout (string, optional) : 'grid' or 'rack'
+        rows (int, optional) : rows of chambers ( or number of cages, for a rack )
+        columns (int, optional) : chambers in each row ( or in each cage )
+        voles (int, optional) : number of SimVoles, spread out evenly across the chambers
+        doors_per_edge (int, optional) : 2 for a door on each side of every edge ( like map.json ), or 1 for a single door
+        beams (Boolean, optional) : if True, puts a beam next to every door
+        rfids (Boolean, optional) : if True, puts an rfid in the middle of every edge
+        dispensers (Boolean, optional) : if True, gives every chamber a dispenser and a lever that dispenses from it
+        config_directory (string, optional) : directory with the Control configuration files that the interactables get copied from
+    Returns:
+        (dict) : { filename : contents } for every configuration file
+    '''
+    if layout not in LAYOUTS:
+        raise Exception(f'(generate_map.py, generate) layout was passed as {layout}, must be one of {LAYOUTS}')
+    if rows < 1 or columns < 1:
+        raise Exception(f'(generate_map.py, generate) need at least one row and one column, but was passed {rows}x{columns}')
+    if doors_per_edge not in (1, 2):
+        raise Exception(f'(generate_map.py, generate) doors_per_edge must be 1 or 2, but was passed {doors_per_edge}')
+
+    (chamber_ids, pairs) = (grid_edges if layout == 'grid' else rack_edges)(rows, columns)
+    generator = Generator(config_directory)
+    chambers = { cid: [] for cid in chamber_ids }
+    if dispensers:
+        for cid in chamber_ids:
+            chambers[cid].append(generator.new_interactable('dispenser', f'food_trough_{cid}'))
+            chambers[cid].append(generator.new_interactable('lever', f'lever_food_{cid}', parents = [f'food_trough_{cid}']))
+
+    digits = len(str(max(chamber_ids)))
+    edges = [ generator.new_edge(a * 10**digits + b, a, b, chambers, doors_per_edge, beams, rfids) for (a, b) in pairs ] # edge ids join the two chamber ids, like edge 12 between chambers 1 and 2
+
+    map_config = {
+        'chambers': [ { 'id': cid, 'descriptive_name': f'Chamber {cid}', 'components': components } for (cid, components) in chambers.items() ],
+        'edges': edges,
+        'voles': []
+        }
+    simulation_config = {
+        'virtual_time': False, 'time_scale': 1, 'seed': None, 'trace': None, 'replay': None,
+        'interactables': generator.simulated,
+        'voles': [ { 'tag': tag, 'start_chamber': chamber_ids[ (tag - 1) * len(chamber_ids) // voles ], 'rfid_id': None } for tag in range(1, voles + 1) ]
+        }
+    files = { 'map.json': map_config, 'simulation.json': simulation_config }
+    files.update( { f'{type}.json': config for (type, config) in generator.configs.items() if len(config) > 0 } )
+    return files
+
+
+def write(output_dir, **kwargs):
+    '''
+    [summary] generates a map ( see generate for the arguments ) and writes its configuration files to <output_dir>
+    Returns:
+        (dict) : { filename : number of entries } for every file that was written
+    '''
+    files = generate(**kwargs)
+    os.makedirs(output_dir, exist_ok = True)
+    for (filename, contents) in files.items():
+        with open(os.path.join(output_dir, filename), 'w') as f:
+            json.dump(contents, f, indent = 4)
+    counts = { filename: len(contents) for (filename, contents) in files.items() }
+    counts['map.json'] = len(files['map.json']['chambers'])
+    counts['simulation.json'] = len(files['simulation.json']['interactables'])
+    return counts
+
+
+def load(output_dir):
+    ''' [summary] builds a Map and a Simulation from the files in <output_dir>, the same way that a simulated run would, and returns how long that took '''
+    start = time.perf_counter()
+    env = Environment('map.json', config_directory = output_dir, simulation_config = os.path.join(os.path.abspath(output_dir), 'simulation.json'))
+    return { 'seconds': time.perf_counter() - start, 'chambers': len(env.map.graph), 'edges': len(env.map.edges), 'interactables': len(env.map.instantiated_interactables), 'simulated_voles': sum( type(v).__name__ == 'SimVole' for v in env.simulation.voles ) }
+
+
+def main(argv = None):
+    parser = argparse.ArgumentParser(description = 'generates the configuration files for a large map')
+    parser.add_argument('output_dir', help = 'directory to write the configuration files to')
+    parser.add_argument('--layout', choices = LAYOUTS, default = 'grid', help = 'grid of chambers, or a rack of separate cages')
+    parser.add_argument('--rows', type = int, default = 10, help = 'rows of chambers ( or number of cages, for a rack )')
+    parser.add_argument('--columns', type = int, default = 10, help = 'chambers in each row ( or in each cage )')
+    parser.add_argument('--voles', type = int, default = 2, help = 'number of simulated voles')
+    parser.add_argument('--doors_per_edge', type = int, choices = (1, 2), default = 2, help = 'doors on each edge')
+    parser.add_argument('--no_beams', action = 'store_true', help = 'leave out the beams next to each door')
+    parser.add_argument('--no_rfids', action = 'store_true', help = 'leave out the rfid on each edge')
+    parser.add_argument('--dispensers', action = 'store_true', help = 'give every chamber a dispenser and a lever for it')
+    parser.add_argument('--load', action = 'store_true', help = 'build a Map and Simulation from the generated files, to check that they load')
+    args = parser.parse_args(argv)
+
+    counts = write(args.output_dir, layout = args.layout, rows = args.rows, columns = args.columns, voles = args.voles, doors_per_edge = args.doors_per_edge, beams = not args.no_beams, rfids = not args.no_rfids, dispensers = args.dispensers)
+    for (filename, n) in counts.items():
+        print(f'{os.path.join(args.output_dir, filename)}: {n} {"chambers" if filename == "map.json" else "entries"}')
+    if args.load:
+        r = load(args.output_dir)
+        print(f'loaded {r["chambers"]} chambers, {r["edges"]} edges, {r["interactables"]} interactables and {r["simulated_voles"]} simulated voles in {r["seconds"]:.2f}s')
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,151 @@
+"""
+Description: Map benchmarks. Times building a Map from each configuration file ( which parses the json files, creates every interactable and builds the dependency graph ), and the path queries that simulated voles make on every move:
+            get_chamber_path between every pair of chambers, and get_component_path between every pair of components, first with an empty path cache and then again once the same paths have been cached.
+
+            python -m benchmarks.map_setup [--maps map.json map_operant.json map_homecage.json] [--config_directory Control/Configurations] [--builds 10] [--passes 5] [--max_pairs N] [--json]
+
+            Maps from benchmarks/generate_map.py have far too many pairs to query them all, so --max_pairs times a random sample of the pairs instead ( the same sample on every run ).
+            The component pairs are also capped at the size of the map's path cache, so the second round of queries measures cached paths rather than evictions. The hit rate of each round is recorded along with its timings.
+
+Property of Donaldson Lab at the University of Colorado at Boulder
+"""
+
+# Standard Lib Imports
+import sys
+import time
+import json
+import random
+import argparse
+import tracemalloc
+
+# Local Imports
+from Control.Classes.Map import Map
+from benchmarks.common import CONTROL_CONFIGURATIONS, SHIPPED_MAPS, quiet, summarize
+
+
+QUICK = { 'builds': 3, 'passes': 2 } # arguments for run() when the suite is run with --quick
+
+
+def build_map(config_directory, map_file):
+    ''' [summary] builds a Map without printing anything, and returns it along with the seconds that it took '''
+    with quiet():
+        start = time.perf_counter()
+        map = Map(config_directory, map_file, interactive = False)
+        return (map, time.perf_counter() - start)
+
+
+def bench_build(config_directory, map_file, builds):
+    ''' [summary] builds the map <builds> times, then once more with tracemalloc on to measure how much memory a Map takes '''
+    times = []
+    for _ in range(builds):
+        (map, seconds) = build_map(config_directory, map_file)
+        times.append(seconds)
+
+    tracemalloc.start()
+    (map, _) = build_map(config_directory, map_file)
+    (size, peak) = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return (map, { 'seconds': summarize(times), 'memory_bytes': size, 'peak_memory_bytes': peak, 'chambers': len(map.graph), 'edges': len(map.edges), 'interactables': len(map.instantiated_interactables) })
+
+
+def sample_pairs(items, max_pairs):
+    ''' [summary] returns every ordered pair of <items>, or a random sample of <max_pairs> of them. The sample is seeded, so it is the same on every run. '''
+    pairs = [ (a, b) for a in items for b in items ]
+    if max_pairs is not None and len(pairs) > max_pairs:
+        pairs = random.Random(0).sample(pairs, max_pairs)
+    return pairs
+
+
+def bench_chamber_paths(map, passes, max_pairs = None):
+    ''' [summary] times get_chamber_path between every ordered pair of connected chambers ( chambers with a negative id are islands and have no paths ) '''
+    chambers = [ cid for cid in map.graph if cid >= 0 ]
+    pairs = sample_pairs(chambers, max_pairs)
+    times = []
+    with quiet():
+        for _ in range(passes):
+            for (a, b) in pairs:
+                start = time.perf_counter()
+                map.get_chamber_path(a, b)
+                times.append(time.perf_counter() - start)
+    total = sum(times)
+    return { 'pairs': len(pairs), 'seconds': summarize(times), 'queries_per_second': len(times) / total if total > 0 else None }
+
+
+def bench_component_paths(map, passes, max_pairs = None):
+    '''
+    [summary] times get_component_path between every ordered pair of components. Each pass first runs with an empty path cache ( and component graph ), then again with the same pairs, whose paths were cached by the first run.
+    The pairs are capped at the size of the path cache, so that every path from the first run is still cached for the second. Each run records the fraction of its queries that were found in the cache.
+    Pairs that have no path ( e.g. components in an island chamber ) are counted but not timed.
+    '''
+    components = list(dict.fromkeys( c for loc in list(map.graph.values()) + map.edges for c in loc.get_component_list() )) # a chamber interactable reference is in both its chamber's and its edge's component list
+    with map.component_cache_lock:
+        capacity = map.component_path_capacity()
+    pairs = sample_pairs(components, capacity if max_pairs is None else min(max_pairs, capacity))
+    timings = { 'cold': [], 'cached': [] }
+    hits = { 'cold': 0, 'cached': 0 }
+    unreachable = 0
+    with quiet():
+        for _ in range(passes):
+            map.invalidate_component_paths()
+            for kind in ('cold', 'cached'):
+                for (a, b) in pairs:
+                    hits[kind] += (a, b) in map.component_path_cache
+                    start = time.perf_counter()
+                    try: map.get_component_path(a, b)
+                    except Exception:
+                        if kind == 'cold': unreachable += 1
+                        continue
+                    timings[kind].append(time.perf_counter() - start)
+    results = { 'pairs': len(pairs), 'cache_size': capacity, 'unreachable': unreachable // max(passes, 1) }
+    for (kind, times) in timings.items():
+        total = sum(times)
+        queries = len(pairs) * passes
+        results[kind] = { 'seconds': summarize(times), 'queries_per_second': len(times) / total if total > 0 else None, 'hit_rate': hits[kind] / queries if queries > 0 else None }
+    return results
+
+
+def run(maps = SHIPPED_MAPS, config_directory = CONTROL_CONFIGURATIONS, builds = 10, passes = 5, max_pairs = None):
+    '''
+    [summary] runs the map benchmarks for each map configuration file
+    Args:
+        maps ([string], optional) : map configuration files in <config_directory> ( or absolute filepaths )
+        config_directory (string, optional) : directory with the rest of the Control configuration files ( the interactable type files )
+        builds (int, optional) : number of times each map gets built
+        passes (int, optional) : number of times each set of path queries gets run
+        max_pairs (int, optional) : if set, times a random sample of this many pairs rather than every pair
+    Returns:
+        (dict) : { map file : { 'build', 'chamber_paths', 'component_paths' } }
+    '''
+    results = {}
+    for map_file in maps:
+        (map, build) = bench_build(config_directory, map_file, builds)
+        results[map_file] = { 'build': build, 'chamber_paths': bench_chamber_paths(map, passes, max_pairs), 'component_paths': bench_component_paths(map, passes, max_pairs) }
+    return results
+
+
+def main(argv = None):
+    parser = argparse.ArgumentParser(description = 'Map construction and path query benchmarks')
+    parser.add_argument('--maps', nargs = '+', default = list(SHIPPED_MAPS), help = 'map configuration files to benchmark')
+    parser.add_argument('--config_directory', default = CONTROL_CONFIGURATIONS, help = 'directory with the Control configuration files')
+    parser.add_argument('--builds', type = int, default = 10, help = 'number of times each map gets built')
+    parser.add_argument('--passes', type = int, default = 5, help = 'number of times each set of path queries gets run')
+    parser.add_argument('--max_pairs', type = int, default = None, help = 'time a random sample of this many pairs, rather than every pair ( for generated maps )')
+    parser.add_argument('--json', action = 'store_true', help = 'print the results as json')
+    args = parser.parse_args(argv)
+
+    results = run(args.maps, args.config_directory, args.builds, args.passes, args.max_pairs)
+    if args.json:
+        print(json.dumps(results, indent = 4))
+        return
+    for (map_file, r) in results.items():
+        b = r['build']
+        print(f'{map_file}: {b["chambers"]} chambers, {b["edges"]} edges, {b["interactables"]} interactables. built in {b["seconds"]["p50"]*1000:.2f}ms (p50), {b["peak_memory_bytes"]/1024:.0f}KiB peak')
+        print(f'    get_chamber_path: {r["chamber_paths"]["queries_per_second"]:.0f} queries/s over {r["chamber_paths"]["pairs"]} pairs')
+        for kind in ('cold', 'cached'):
+            c = r['component_paths'][kind]
+            if c['queries_per_second'] is not None:
+                print(f'    get_component_path ({kind}): {c["queries_per_second"]:.0f} queries/s over {r["component_paths"]["pairs"]} pairs, {c["hit_rate"]:.0%} cache hits')
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,104 @@
+"""
+Description: RFID ping benchmark. Pings go onto the mode's shared_rfidQ ( where the CAN Bus listener puts real pings ), and get timed until the mode's rfidListener has passed them to the rfid and the rfid has turned them into a threshold event.
+            Times single pings ( first ping until the Ping object is on the rfid's threshold_event_queue, second ping until it is paired with the first ), and then a burst of pings all queued at once.
+
+            python -m benchmarks.rfid [--rfid rfid1] [--vole 1] [--pings 20] [--burst 100] [--json]
+
+Property of Donaldson Lab at the University of Colorado at Boulder
+"""
+
+# Standard Lib Imports
+import sys
+import time
+import json
+import queue
+import argparse
+
+# Local Imports
+from Control.Classes.Clock import CLOCK
+from benchmarks.common import Environment, quiet, summarize, wait_until
+
+
+QUICK = { 'pings': 5, 'burst': 20 } # arguments for run() when the suite is run with --quick
+
+
+def bench_single(mode, rfid, vole, pings):
+    ''' [summary] sends one ping pair at a time, and times how long each ping takes to get handled '''
+    arrivals = []
+    departures = []
+    with quiet():
+        for _ in range(pings):
+            start = time.perf_counter()
+            mode.shared_rfidQ.put( (vole, rfid.ID, CLOCK.time()) )
+            try: rfid.threshold_event_queue.get(timeout = 5)
+            except queue.Empty: continue
+            arrivals.append(time.perf_counter() - start)
+
+            ping = rfid.ping_history[-1]
+            start = time.perf_counter()
+            mode.shared_rfidQ.put( (vole, rfid.ID, CLOCK.time()) )
+            if wait_until(lambda: ping.ping2 is not None):
+                departures.append(time.perf_counter() - start)
+    return { 'pings': pings, 'ping1_seconds': summarize(arrivals), 'ping2_seconds': summarize(departures) }
+
+
+def bench_burst(mode, rfid, vole, burst):
+    ''' [summary] queues <burst> ping pairs at once, and times how long it takes until every pair has been handled '''
+    history = len(rfid.ping_history)
+    with quiet():
+        start = time.perf_counter()
+        for _ in range(burst):
+            mode.shared_rfidQ.put( (vole, rfid.ID, CLOCK.time()) )
+            mode.shared_rfidQ.put( (vole, rfid.ID, CLOCK.time()) )
+        handled = wait_until(lambda: len(rfid.ping_history) - history == burst and rfid.ping_history[-1].ping2 is not None, timeout = 60)
+        elapsed = time.perf_counter() - start
+        while not rfid.threshold_event_queue.empty(): rfid.threshold_event_queue.get() # nothing else uses the threshold events
+    return { 'pairs': burst, 'handled': handled, 'seconds': elapsed, 'pings_per_second': 2 * burst / elapsed if handled and elapsed > 0 else None }
+
+
+def run(rfid = 'rfid1', vole = 1, pings = 20, burst = 100):
+    '''
+    [summary] runs the rfid benchmarks on map.json, with every interactable simulated
+    Args:
+        rfid (string, optional) : name of the rfid that gets pinged
+        vole (int, optional) : rfid chip id that is sent with each ping ( a SimVole's rfid_id is its tag )
+        pings (int, optional) : number of ping pairs that get timed one at a time
+        burst (int, optional) : number of ping pairs that get queued all at once
+    Returns:
+        (dict) : results for 'single' and 'burst' pings
+    '''
+    env = Environment('map.json')
+    env.start()
+    try:
+        rfid = env.map.instantiated_interactables[rfid]
+        results = { 'single': bench_single(env.mode, rfid, vole, pings), 'burst': bench_burst(env.mode, rfid, vole, burst) }
+    finally:
+        env.stop()
+    return results
+
+
+def main(argv = None):
+    parser = argparse.ArgumentParser(description = 'rfid ping handling latency and throughput')
+    parser.add_argument('--rfid', default = 'rfid1', help = 'name of the rfid that gets pinged')
+    parser.add_argument('--vole', type = int, default = 1, help = 'rfid chip id that is sent with each ping')
+    parser.add_argument('--pings', type = int, default = 20, help = 'number of ping pairs that get timed one at a time')
+    parser.add_argument('--burst', type = int, default = 100, help = 'number of ping pairs that get queued all at once')
+    parser.add_argument('--json', action = 'store_true', help = 'print the results as json')
+    args = parser.parse_args(argv)
+
+    results = run(args.rfid, args.vole, args.pings, args.burst)
+    if args.json:
+        print(json.dumps(results, indent = 4))
+        return
+    s = results['single']
+    for kind in ('ping1', 'ping2'):
+        r = s[f'{kind}_seconds']
+        if r['count'] > 0:
+            print(f'{kind}: {r["count"]} pings handled, p50 {r["p50"]*1000:.1f}ms, max {r["max"]*1000:.1f}ms')
+    b = results['burst']
+    handled = f'{b["pings_per_second"]:.0f} pings/s' if b['handled'] else 'not every ping was handled'
+    print(f'burst: {b["pairs"]} ping pairs in {b["seconds"]:.3f}s, {handled}')
+
+
+if __name__ == '__main__':
+    sys.exit(main())
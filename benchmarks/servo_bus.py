@@ -0,0 +1,110 @@
+"""
+Description: Servo command throughput benchmark. Several threads send servo commands to a FakeServoKit, first by writing to the board directly ( how interactables wrote to the ServoKit before the ServoBus ), and then through a ServoBus.
+            Reports how many commands per second each approach accepts, how many writes actually reached the board, and how long it took for every command to be sent.
+
+            python -m benchmarks.servo_bus [--threads 8] [--commands 500] [--channels 8] [--latency 0.0003] [--json]
+
+Property of Donaldson Lab at the University of Colorado at Boulder
+"""
+
+# Standard Lib Imports
+import sys
+import time
+import json
+import argparse
+import threading
+
+# Local Imports
+from Control.Classes.ServoBus import ServoBus, FakeServoKit
+
+
+QUICK = { 'threads': 4, 'commands': 100 } # arguments for run() when the suite is run with --quick
+
+
+def run_threads(n_threads, target):
+    ''' [summary] runs target(thread index) on <n_threads> threads at once, and returns the seconds it took for all of them to finish '''
+    threads = [ threading.Thread(target = target, args = (i,), daemon = True) for i in range(n_threads) ]
+    start = time.perf_counter()
+    for t in threads: t.start()
+    for t in threads: t.join()
+    return time.perf_counter() - start
+
+
+def bench_direct(threads, commands, channels, latency):
+    ''' [summary] every thread writes straight to the board '''
+    kit = FakeServoKit(channels = channels, write_latency = latency)
+
+    def send(i):
+        for c in range(commands):
+            kit.continuous_servo[(i + c) % channels].throttle = c % 2
+
+    elapsed = run_threads(threads, send)
+    return { 'requested': threads * commands, 'sent': kit.writes, 'accept_seconds': elapsed, 'complete_seconds': elapsed }
+
+
+def bench_bus(threads, commands, channels, latency):
+    ''' [summary] every thread writes to a ServoChannel on a shared ServoBus '''
+    kit = FakeServoKit(channels = channels, write_latency = latency)
+    bus = ServoBus(kit, name = 'benchmark_servo_bus')
+    proxies = [ bus.channel('continuous', pin) for pin in range(channels) ]
+
+    def send(i):
+        for c in range(commands):
+            proxies[(i + c) % channels].throttle = c % 2
+
+    start = time.perf_counter()
+    accepted = run_threads(threads, send)
+    bus.flush()
+    complete = time.perf_counter() - start
+    return { 'requested': bus.requested, 'sent': kit.writes, 'coalesced': bus.coalesced, 'accept_seconds': accepted, 'complete_seconds': complete }
+
+
+def bench_group(threads, commands, channels, latency):
+    ''' [summary] every thread sends each of its commands as a group move across all of the channels, and waits for the group to be sent '''
+    kit = FakeServoKit(channels = channels, write_latency = latency)
+    bus = ServoBus(kit, name = 'benchmark_servo_bus')
+
+    def send(i):
+        for c in range(commands):
+            bus.move_group([ ('continuous', pin, 'throttle', c % 2) for pin in range(channels) ]).result()
+
+    start = time.perf_counter()
+    accepted = run_threads(threads, send)
+    bus.flush()
+    complete = time.perf_counter() - start
+    return { 'requested': bus.requested, 'sent': kit.writes, 'coalesced': bus.coalesced, 'accept_seconds': accepted, 'complete_seconds': complete }
+
+
+def run(threads = 8, commands = 500, channels = 8, latency = 0.0003):
+    '''
+    [summary] runs each of the servo benchmarks
+    Returns:
+        (dict) : { benchmark name : results }, where results include the number of commands per second that were accepted
+    '''
+    results = {}
+    for (name, bench) in (('direct', bench_direct), ('bus', bench_bus), ('group', bench_group)):
+        r = bench(threads, commands, channels, latency)
+        r['commands_per_second'] = r['requested'] / r['accept_seconds'] if r['accept_seconds'] > 0 else None
+        results[name] = r
+    return results
+
+
+def main(argv = None):
+    parser = argparse.ArgumentParser(description = 'servo command throughput, writing to the servo board directly vs through a ServoBus')
+    parser.add_argument('--threads', type = int, default = 8, help = 'number of threads sending commands')
+    parser.add_argument('--commands', type = int, default = 500, help = 'number of commands each thread sends')
+    parser.add_argument('--channels', type = int, default = 8, help = 'number of servo channels that the commands are spread across')
+    parser.add_argument('--latency', type = float, default = 0.0003, help = 'seconds that each write to the fake servo board takes')
+    parser.add_argument('--json', action = 'store_true', help = 'print the results as json')
+    args = parser.parse_args(argv)
+
+    results = run(args.threads, args.commands, args.channels, args.latency)
+    if args.json:
+        print(json.dumps(results, indent = 4))
+        return
+    for (name, r) in results.items():
+        print(f'{name:>7}: {r["requested"]} commands, {r["sent"]} writes sent, {r["commands_per_second"]:.0f} commands/s accepted, all sent after {r["complete_seconds"]:.3f}s')
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,119 @@
+"""
+Description: Threshold event latency benchmark. Changes the state of a simulated beam and lever the way a SimVole does, and times how long it takes for the interactable's threshold watcher to notice the change and put a threshold event on its threshold_event_queue.
+            Also reports the watchers' own threshold_check and callback histograms, so a slow check function or onThreshold callback shows up next to the latency that it causes.
+
+            python -m benchmarks.thresholds [--beam beam1_door1] [--lever lever_door1] [--events 20] [--json]
+
+Property of Donaldson Lab at the University of Colorado at Boulder
+"""
+
+# Standard Lib Imports
+import sys
+import time
+import json
+import queue
+import argparse
+
+# Local Imports
+from benchmarks.common import Environment, quiet, summarize, wait_until
+
+
+QUICK = { 'events': 5 } # arguments for run() when the suite is run with --quick
+
+
+def histograms(interactable):
+    ''' [summary] the interactable's threshold_check and callback histograms, without their buckets '''
+    results = {}
+    for name in ('threshold_check', 'callback'):
+        results[name] = interactable.metrics.histogram(name).snapshot()
+        results[name].pop('buckets', None)
+    return results
+
+
+def time_events(interactable, events, trigger, reset):
+    '''
+    [summary] times <events> threshold events for <interactable>
+    Args:
+        interactable (interactableABC) : an active interactable
+        trigger (function) : changes the interactable's state so that its threshold condition is met
+        reset (function) : returns True once the interactable is ready for the next trigger ( e.g. its onThreshold callback reset its count )
+    Returns:
+        (dict) : number of events that were missed, the seconds from each trigger to its threshold event, and the watcher's histograms
+    '''
+    latencies = []
+    missed = 0
+    with quiet():
+        for _ in range(events):
+            start = time.perf_counter()
+            trigger()
+            try: interactable.threshold_event_queue.get(timeout = 5)
+            except queue.Empty:
+                missed += 1
+                continue
+            latencies.append(time.perf_counter() - start)
+            wait_until(reset)
+    return { 'events': events, 'missed': missed, 'seconds': summarize(latencies), **histograms(interactable) }
+
+
+def bench_beam(beam, events):
+    ''' [summary] breaks the beam, and unbreaks it once the watcher has handled the break ( the beam's callback resets its break count ) '''
+    def trigger():
+        beam.simulate_unbroken()
+        beam.simulate_break()
+    results = time_events(beam, events, trigger, lambda: beam.num_breaks == beam.threshold_condition['initial_value'])
+    with quiet():
+        beam.simulate_unbroken()
+    return results
+
+
+def bench_lever(lever, events):
+    ''' [summary] extends the lever so that its watcher runs, then presses it up to its goal value ( the lever's callback resets its press count ) '''
+    with quiet():
+        lever.isExtended = True
+        lever.activate()
+    goal = lever.threshold_condition['goal_value']
+    return time_events(lever, events, lambda: lever.set_press_count(goal), lambda: lever.num_pressed == lever.threshold_condition['initial_value'])
+
+
+def run(beam = 'beam1_door1', lever = 'lever_door1', events = 20):
+    '''
+    [summary] runs the threshold benchmarks on map.json, with every interactable simulated
+    Args:
+        beam (string, optional) : name of the beam that gets broken
+        lever (string, optional) : name of the lever that gets pressed
+        events (int, optional) : number of threshold events that get timed for each interactable
+    Returns:
+        (dict) : results for the 'beam' and the 'lever'
+    '''
+    env = Environment('map.json')
+    env.start(rfid_listener = False)
+    interactables = env.map.instantiated_interactables
+    try:
+        results = { 'beam': bench_beam(interactables[beam], events), 'lever': bench_lever(interactables[lever], events) }
+    finally:
+        env.stop()
+    return results
+
+
+def main(argv = None):
+    parser = argparse.ArgumentParser(description = 'threshold event latency for a simulated beam and lever')
+    parser.add_argument('--beam', default = 'beam1_door1', help = 'name of the beam that gets broken')
+    parser.add_argument('--lever', default = 'lever_door1', help = 'name of the lever that gets pressed')
+    parser.add_argument('--events', type = int, default = 20, help = 'number of threshold events that get timed for each interactable')
+    parser.add_argument('--json', action = 'store_true', help = 'print the results as json')
+    args = parser.parse_args(argv)
+
+    results = run(args.beam, args.lever, args.events)
+    if args.json:
+        print(json.dumps(results, indent = 4))
+        return
+    for (kind, r) in results.items():
+        s = r['seconds']
+        if s['count'] == 0:
+            print(f'{kind:>5}: no threshold events ({r["missed"]} missed)')
+            continue
+        print(f'{kind:>5}: {s["count"]} threshold events ({r["missed"]} missed), p50 {s["p50"]*1000:.1f}ms, p99 {s["p99"]*1000:.1f}ms, max {s["max"]*1000:.1f}ms')
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,88 @@
+"""
+Description: SimVole movement benchmark. Runs with a VirtualClock, so the simulated delays in each move ( walking between components, breaking beams, waiting on doors ) finish as soon as every thread is idle.
+            Opens every door in map.json, then has a SimVole move back and forth between two chambers, and times each attempt_move in real time ( which is the cost of simulating the move ) along with the experiment time that the move took.
+
+            python -m benchmarks.voles [--vole 1] [--chambers 1 2] [--moves 20] [--json]
+
+Property of Donaldson Lab at the University of Colorado at Boulder
+"""
+
+# Standard Lib Imports
+import sys
+import time
+import json
+import argparse
+
+# Local Imports
+from Control.Classes.Clock import CLOCK
+from benchmarks.common import Environment, quiet, summarize
+
+
+QUICK = { 'moves': 6 } # arguments for run() when the suite is run with --quick
+
+
+def open_doors(map):
+    ''' [summary] opens every simulated door, so that the moves do not depend on the voles pressing levers '''
+    for door in [ i for i in map.instantiated_interactables.values() if type(i).__name__ == 'door' ]:
+        if not door.isOpen:
+            door.sim_open()
+
+
+def bench_moves(vole, chambers, moves):
+    ''' [summary] moves <vole> to each of <chambers> in turn, <moves> times. Each move goes to the chamber after the one that the vole is in ( or to the first chamber, if the vole is somewhere else ). '''
+    real = []
+    virtual = []
+    completed = 0
+    with quiet():
+        for _ in range(moves):
+            here = vole.curr_loc.id if vole.curr_loc.edge_or_chamber == 'chamber' else None
+            destination = chambers[ (chambers.index(here) + 1) % len(chambers) ] if here in chambers else chambers[0]
+            (start, start_virtual) = (time.perf_counter(), CLOCK.monotonic())
+            if vole.attempt_move(destination):
+                completed += 1
+            real.append(time.perf_counter() - start)
+            virtual.append(CLOCK.monotonic() - start_virtual)
+    total = sum(real)
+    return { 'moves': moves, 'completed': completed, 'real_seconds': summarize(real), 'virtual_seconds': summarize(virtual), 'moves_per_second': moves / total if total > 0 else None }
+
+
+def run(vole = 1, chambers = (1, 2), moves = 20):
+    '''
+    [summary] runs the SimVole movement benchmark on map.json, with every interactable simulated and the CLOCK switched to virtual time
+    Args:
+        vole (int, optional) : tag of the SimVole that moves
+        chambers ([int], optional) : chambers that the vole moves between ( each one must border the next )
+        moves (int, optional) : number of moves
+    Returns:
+        (dict) : number of moves that completed, the real and experiment seconds that each move took, and the moves per real second
+    '''
+    env = Environment('map.json', virtual_time = True)
+    env.start()
+    try:
+        with quiet():
+            open_doors(env.map)
+        results = bench_moves(env.simulation.get_vole(vole), list(chambers), moves)
+    finally:
+        env.stop()
+    return results
+
+
+def main(argv = None):
+    parser = argparse.ArgumentParser(description = 'SimVole movement throughput in virtual time')
+    parser.add_argument('--vole', type = int, default = 1, help = 'tag of the SimVole that moves')
+    parser.add_argument('--chambers', type = int, nargs = '+', default = [1, 2], help = 'chambers that the vole moves between')
+    parser.add_argument('--moves', type = int, default = 20, help = 'number of moves')
+    parser.add_argument('--json', action = 'store_true', help = 'print the results as json')
+    args = parser.parse_args(argv)
+
+    results = run(args.vole, args.chambers, args.moves)
+    if args.json:
+        print(json.dumps(results, indent = 4))
+        return
+    print(f'{results["completed"]}/{results["moves"]} moves completed, {results["moves_per_second"]:.1f} moves/s')
+    print(f'    real time per move: p50 {results["real_seconds"]["p50"]*1000:.1f}ms, max {results["real_seconds"]["max"]*1000:.1f}ms')
+    print(f'    experiment time per move: p50 {results["virtual_seconds"]["p50"]:.2f}s, max {results["virtual_seconds"]["max"]:.2f}s')
+
+
+if __name__ == '__main__':
+    sys.exit(main())